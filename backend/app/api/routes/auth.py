@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
@@ -9,10 +9,23 @@ from app.schemas.user import UserCreate, UserInDB
 from app.schemas.token import Token
 from app.core.security import get_password_hash, verify_password, create_access_token
 from app.core.config import settings
+from app.core.rate_limit import client_ip, hashing_slot, login_ip_limiter, login_username_limiter, register_ip_limiter
 
 router = APIRouter()
 
-@router.post("/register", response_model=UserInDB)
+TOO_MANY_ATTEMPTS = "Too many attempts. Please wait before trying again."
+
+def limit_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    """
+    Rejects login bursts per client IP and per username before any query or hashing runs.
+    """
+    login_ip_limiter.enforce(client_ip(request), TOO_MANY_ATTEMPTS)
+    login_username_limiter.enforce(form_data.username.lower(), TOO_MANY_ATTEMPTS)
+
+def limit_registration(request: Request):
+    register_ip_limiter.enforce(client_ip(request), TOO_MANY_ATTEMPTS)
+
+@router.post("/register", response_model=UserInDB, dependencies=[Depends(limit_registration)])
 def register_user(user: UserCreate, db: Session = Depends(get_db)):
     db_user = db.query(User).filter(User.username == user.username).first()
     if db_user:
@@ -22,7 +35,8 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     if db_email:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = get_password_hash(user.password)
+    with hashing_slot():
+        hashed_password = get_password_hash(user.password)
     new_user = User(
         username=user.username,
         email=user.email,
@@ -33,12 +47,15 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     db.refresh(new_user)
     return new_user
 
-@router.post("/token", response_model=Token)
+@router.post("/token", response_model=Token, dependencies=[Depends(limit_login)])
 def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
 ):
     user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if user:
+        with hashing_slot():
+            password_ok = verify_password(form_data.password, user.hashed_password)
+    if not user or not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -49,4 +66,4 @@ def login_for_access_token(
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
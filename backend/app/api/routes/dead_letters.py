@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List
+
+from app.db.session import get_db
+from app.models.user import User
+from app.models.post import PostStatus
+from app.models.post_delivery import DeliveryStatus
+from app.models.dead_letter import DeadLetter
+from app.schemas.dead_letter import DeadLetterInDB
+from app.dependencies import get_current_user_required
+from app.worker.celery_app import celery_app
+from app.worker.tasks import PUBLISH_TASKS, find_delivery, find_post
+from app.services.read_models import draft_posts
+from app.core.status_events import publish_post_status
+
+router = APIRouter()
+
+@router.get("/", response_model=List[DeadLetterInDB])
+def list_dead_letters(
+    include_replayed: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    """
+    Lists the current user's publish tasks that failed for good.
+    """
+    query = db.query(DeadLetter).filter(DeadLetter.user_id == current_user.id)
+    if not include_replayed:
+        query = query.filter(DeadLetter.replayed_at.is_(None))
+    return query.order_by(DeadLetter.created_at.desc()).all()
+
+@router.post("/{dead_letter_id}/replay", response_model=DeadLetterInDB)
+def replay_dead_letter(
+    dead_letter_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    """
+    Re-enqueues a dead-lettered publish task with a fresh retry budget. Only the failed
+    delivery is reset; a post already published to its other accounts stays published.
+    """
+    dead_letter = db.query(DeadLetter).filter(DeadLetter.id == dead_letter_id).first()
+    if not dead_letter or dead_letter.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dead letter not found.")
+    if dead_letter.replayed_at:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Dead letter has already been replayed.")
+
+    post = find_post(db, dead_letter.post_id) if dead_letter.post_id else None
+    channel = next((channel for channel, task in PUBLISH_TASKS.items() if task.name == dead_letter.task_name), None)
+    # task_args is [post_id, account_id], or [post_id] for tasks from before per-account targets
+    account_id = dead_letter.task_args[1] if len(dead_letter.task_args) > 1 else None
+    delivery = find_delivery(db, post, channel, account_id) if post and channel else None
+    if delivery and delivery.status != DeliveryStatus.DELIVERED:
+        delivery.status = DeliveryStatus.PENDING
+    if post and post.status != PostStatus.PUBLISHED:
+        post.status = PostStatus.SCHEDULED
+    dead_letter.replayed_at = datetime.utcnow()
+    db.commit()
+    draft_posts.invalidate(current_user.id)
+    if post:
+        publish_post_status(
+            current_user.id, post.id, channel, delivery.status.value if delivery else post.status.value,
+            post.status.value, "Replayed from the dead-letter queue.", account_id,
+        )
+    db.refresh(dead_letter)
+
+    celery_app.send_task(dead_letter.task_name, args=dead_letter.task_args)
+    return dead_letter
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends
+
+from app.models.user import User
+from app.dependencies import get_current_user_required
+from app.core.cache import cache_stats
+from app.core.rate_limit import rate_limit_stats
+from app.db.routing import replica_status
+from app.worker.circuit_breaker import get_breaker
+from app.worker.routing import PUBLISH_PROVIDERS
+
+router = APIRouter()
+
+@router.get("/circuit-breakers")
+def get_circuit_breakers(current_user: User = Depends(get_current_user_required)):
+    """
+    Returns the shared circuit breaker state and recent call counts for each provider.
+    """
+    return [get_breaker(provider).snapshot() for provider in PUBLISH_PROVIDERS]
+
+
+@router.get("/cache")
+def get_cache_stats(current_user: User = Depends(get_current_user_required)):
+    """
+    Returns hit and miss counts and the hit ratio of each cached read model.
+    """
+    return cache_stats()
+
+@router.get("/replica")
+def get_replica_status(current_user: User = Depends(get_current_user_required)):
+    """
+    Returns whether a read replica is configured, whether reads currently use it, and its lag.
+    """
+    return replica_status()
+
+@router.get("/rate-limits")
+def get_rate_limit_stats(current_user: User = Depends(get_current_user_required)):
+    """
+    Returns admitted and rejected counts for each auth limiter and the password-hashing cap.
+    """
+    return rate_limit_stats()
\ No newline at end of file
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import StreamingResponse
+from typing import Optional
+
+from app.models.user import User
+from app.dependencies import get_current_user_required
+from app.core.status_events import status_event_stream
+
+router = APIRouter()
+
+@router.get("/posts")
+async def post_status_events(
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user_required)
+):
+    """
+    Server-sent events with the status of each of the user's posts and channels as workers
+    process them. Send `Last-Event-ID` when reconnecting to receive the events missed meanwhile.
+    """
+    # The authentication session is closed before streaming starts, so an open
+    # stream holds no database connection.
+    return StreamingResponse(
+        status_event_stream(current_user.id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.db.session import get_db
+from app.models.user import User
+from app.models.social_account import SocialAccount
+from app.models.feed import FeedItem, FeedItemKind, SyncCursor
+from app.models.post import SEARCH_CONFIG
+from app.schemas.feed import FeedPage
+from app.dependencies import get_current_user_required, get_read_db
+from app.api.pagination import decode_cursor, encode_cursor
+
+router = APIRouter()
+
+@router.get("/", response_model=FeedPage)
+def get_feed(
+    q: Optional[str] = None,
+    before: Optional[str] = None,
+    provider: Optional[str] = None,
+    kind: Optional[FeedItemKind] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    """
+    The unified inbound feed across the user's connected accounts, newest first. Pages are
+    keyset-paginated on (posted_at, id), so deep pages cost the same as the first.
+    `q` narrows the feed to items matching a web-style search query.
+    """
+    query = db.query(FeedItem).filter(FeedItem.user_id == current_user.id)
+    if provider:
+        query = query.filter(FeedItem.provider == provider)
+    if kind:
+        query = query.filter(FeedItem.kind == kind)
+    if q:
+        query = query.filter(FeedItem.search_vector.op("@@")(func.websearch_to_tsquery(SEARCH_CONFIG, q)))
+    if before:
+        query = query.filter(tuple_(FeedItem.posted_at, FeedItem.id) < decode_cursor(before, datetime, int))
+
+    items = query.order_by(FeedItem.posted_at.desc(), FeedItem.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(items[limit - 1].posted_at, items[limit - 1].id) if len(items) > limit else None
+    return FeedPage(items=items[:limit], next_cursor=next_cursor)
+
+@router.post("/refresh", status_code=status.HTTP_202_ACCEPTED)
+def refresh_feed(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    """
+    Marks all of the user's feed streams as due, so the next scheduler tick syncs them.
+    """
+    account_ids = db.query(SocialAccount.id).filter(SocialAccount.user_id == current_user.id)
+    updated = (
+        db.query(SyncCursor)
+        .filter(SyncCursor.social_account_id.in_(account_ids))
+        .update({SyncCursor.next_sync_at: datetime.now(timezone.utc)}, synchronize_session=False)
+    )
+    db.commit()
+    return {"detail": f"{updated} feed streams will sync shortly."}
@@ -3,12 +3,14 @@ from sqlalchemy.orm import Session
 import httpx
 from pydantic import BaseModel
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 
 from app.db.session import get_db
 from app.models.user import User
 from app.models.social_account import SocialAccount
 from app.dependencies import get_current_user_required
 from app.core.config import settings
+from app.services.read_models import connected_accounts
 
 router = APIRouter()
 
@@ -17,6 +19,75 @@ class LinkedInConnectRequest(BaseModel):
 
 class DisconnectRequest(BaseModel):
     provider: str
+    # One account (and its organization pages); without it, every account on the provider
+    account_id: Optional[int] = None
+
+ORGANIZATION_ACLS_URL = (
+    "https://api.linkedin.com/v2/organizationAcls?q=roleAssignee&role=ADMINISTRATOR&state=APPROVED"
+    "&projection=(elements*(organization,organization~(localizedName)))"
+)
+
+def _organization_acls_headers(access_token: str) -> dict:
+    return {"Authorization": f"Bearer {access_token}", "X-Restli-Protocol-Version": "2.0.0"}
+
+async def fetch_organizations(client: httpx.AsyncClient, access_token: str) -> Optional[Dict[str, str]]:
+    """
+    The organization pages the member administers, as {organization URN: name}. Returns None
+    when LinkedIn refuses, e.g. because the organization scopes were not granted.
+    """
+    return _parse_organizations(await client.get(ORGANIZATION_ACLS_URL, headers=_organization_acls_headers(access_token)))
+
+def fetch_organizations_sync(client: httpx.Client, access_token: str) -> Optional[Dict[str, str]]:
+    return _parse_organizations(client.get(ORGANIZATION_ACLS_URL, headers=_organization_acls_headers(access_token)))
+
+def _parse_organizations(response: httpx.Response) -> Optional[Dict[str, str]]:
+    if response.status_code != 200:
+        print(f"[LINKEDIN] Could not list organizations ({response.status_code}): {response.text[:200]}")
+        return None
+    return {
+        element["organization"]: (element.get("organization~") or {}).get("localizedName") or element["organization"]
+        for element in response.json().get("elements", [])
+        if element.get("organization")
+    }
+
+def sync_organizations(db: Session, member: SocialAccount, organizations: Optional[Dict[str, str]]) -> List[dict]:
+    """
+    Keeps the member's organization accounts in step with it: every page gets the member's
+    current token, pages the member administers are added, and pages it no longer does are removed.
+    With `organizations` None (the listing failed), only the tokens are updated.
+    Returns the pages that were not added because the user already has them through another
+    of their LinkedIn members, as [{"organization", "name"}].
+    """
+    children = db.query(SocialAccount).filter(SocialAccount.parent_id == member.id).all()
+    for child in children:
+        child.access_token = member.access_token
+        child.expires_at = member.expires_at
+    if organizations is None:
+        return []
+
+    skipped = []
+    known = {child.provider_user_id: child for child in children}
+    for child in children:
+        if child.provider_user_id not in organizations:
+            db.delete(child)
+    for urn, name in organizations.items():
+        if urn in known:
+            known[urn].display_name = name
+            continue
+        if db.query(SocialAccount.id).filter_by(user_id=member.user_id, provider="linkedin", provider_user_id=urn).first():
+            skipped.append({"organization": urn, "name": name})
+            continue
+        db.add(SocialAccount(
+            user_id=member.user_id,
+            provider="linkedin",
+            provider_user_id=urn,
+            account_type="organization",
+            parent_id=member.id,
+            display_name=name,
+            access_token=member.access_token,
+            expires_at=member.expires_at,
+        ))
+    return skipped
 
 @router.post("/connect")
 async def connect_linkedin_account(
@@ -60,8 +131,9 @@ async def connect_linkedin_account(
         
         # This is the correct format required by the ugcPosts API
         linkedin_user_urn = f"urn:li:person:{sub_id}"
+        organizations = await fetch_organizations(client, access_token)
 
-    existing_account = db.query(SocialAccount).filter_by(provider="linkedin", provider_user_id=linkedin_user_urn).first()
+    existing_account = db.query(SocialAccount).filter_by(provider="linkedin", provider_user_id=linkedin_user_urn, parent_id=None).first()
     expires_at = datetime.utcnow() + timedelta(seconds=expires_in) if expires_in else None
 
     if existing_account:
@@ -69,23 +141,57 @@ async def connect_linkedin_account(
              raise HTTPException(status_code=400, detail="This LinkedIn account is already linked to another user.")
         existing_account.access_token = access_token
         existing_account.expires_at = expires_at
+        existing_account.display_name = profile_data.get("name")
+        member = existing_account
     else:
-        new_account = SocialAccount(user_id=current_user.id, provider="linkedin", provider_user_id=linkedin_user_urn, access_token=access_token, expires_at=expires_at)
-        db.add(new_account)
-    
+        member = SocialAccount(user_id=current_user.id, provider="linkedin", provider_user_id=linkedin_user_urn, access_token=access_token, expires_at=expires_at, display_name=profile_data.get("name"))
+        db.add(member)
+        db.flush()
+    skipped = sync_organizations(db, member, organizations)
+
     db.commit()
-    return {"status": "success", "provider": "linkedin"}
+    connected_accounts.invalidate(current_user.id)
+    return {"status": "success", "provider": "linkedin", "organizations": len(organizations or {}), "skipped_organizations": skipped}
+
+@router.post("/organizations/refresh")
+def refresh_organizations(db: Session = Depends(get_db), current_user: User = Depends(get_current_user_required)):
+    """
+    Re-reads the organization pages each connected LinkedIn member administers, with its stored token.
+    Returns the user's accounts and the pages that were skipped.
+    A plain `def`, so FastAPI runs it in the thread pool: the database calls and the
+    accounts read model (whose single-flight wait sleeps) would otherwise block the event loop.
+    """
+    members = db.query(SocialAccount).filter_by(user_id=current_user.id, provider="linkedin", parent_id=None).all()
+    if not members:
+        raise HTTPException(status_code=404, detail="Linkedin account not found.")
+    with httpx.Client() as client:
+        listings = [fetch_organizations_sync(client, member.access_token) for member in members]
+    if all(organizations is None for organizations in listings):
+        raise HTTPException(status_code=502, detail="Could not list your LinkedIn organization pages. Reconnect LinkedIn to grant access.")
+    skipped = []
+    for member, organizations in zip(members, listings):
+        skipped.extend(sync_organizations(db, member, organizations))
+    db.commit()
+    connected_accounts.invalidate(current_user.id)
+    return {"accounts": connected_accounts(db, current_user.id), "skipped_organizations": skipped}
 
 @router.post("/disconnect")
 async def disconnect_account(request: DisconnectRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user_required)):
-    account_to_delete = db.query(SocialAccount).filter_by(user_id=current_user.id, provider=request.provider).first()
-    if not account_to_delete:
+    query = db.query(SocialAccount).filter_by(user_id=current_user.id, provider=request.provider)
+    if request.account_id is not None:
+        query = query.filter(SocialAccount.id == request.account_id)
+    else:
+        query = query.filter(SocialAccount.parent_id.is_(None))
+    accounts_to_delete = query.all()
+    if not accounts_to_delete:
         raise HTTPException(status_code=404, detail=f"{request.provider.capitalize()} account not found.")
-    db.delete(account_to_delete)
+    # Organization pages go with their member account (ON DELETE CASCADE)
+    for account in accounts_to_delete:
+        db.delete(account)
     db.commit()
+    connected_accounts.invalidate(current_user.id)
     return {"status": "success", "detail": f"{request.provider.capitalize()} account has been disconnected."}
 
 @router.get("/accounts")
-async def get_connected_accounts(db: Session = Depends(get_db), current_user: User = Depends(get_current_user_required)):
-    accounts = db.query(SocialAccount).filter_by(user_id=current_user.id).all()
-    return [{"provider": acc.provider} for acc in accounts]
\ No newline at end of file
+def get_connected_accounts(db: Session = Depends(get_db), current_user: User = Depends(get_current_user_required)):
+    return connected_accounts(db, current_user.id)
\ No newline at end of file
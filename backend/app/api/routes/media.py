@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi.responses import FileResponse
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.session import get_db
+from app.models.user import User
+from app.models.media import MediaAsset
+from app.schemas.media import MediaAssetInDB
+from app.dependencies import get_current_user_required
+from app.services.storage import content_key, get_storage
+from app.services.media_variants import RESIZABLE_CONTENT_TYPES, cached_variant
+from app.worker.media_tasks import generate_media_variants
+from app.core.config import settings
+
+router = APIRouter()
+
+ALLOWED_CONTENT_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp", "video/mp4", "video/quicktime"}
+
+@router.post("/", response_model=MediaAssetInDB, status_code=status.HTTP_201_CREATED)
+def upload_media(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    """
+    Stores an image or video attachment. The file is streamed into content-addressed storage
+    in chunks. Re-uploading a file the user already has returns the existing asset.
+    """
+    if file.content_type not in ALLOWED_CONTENT_TYPES:
+        raise HTTPException(status_code=415, detail=f"Unsupported media type: {file.content_type}")
+
+    try:
+        sha256, size = get_storage().put_stream(file.file, max_bytes=settings.MEDIA_MAX_BYTES)
+    except ValueError as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+
+    # Two concurrent uploads of the same file both get here; the second one reuses the first's row
+    # instead of failing on the unique constraint
+    inserted_id = db.execute(
+        pg_insert(MediaAsset)
+        .values(
+            user_id=current_user.id,
+            sha256=sha256,
+            storage_key=content_key(sha256),
+            content_type=file.content_type,
+            size_bytes=size,
+            original_filename=file.filename,
+        )
+        .on_conflict_do_nothing(constraint="uq_media_assets_user_sha256")
+        .returning(MediaAsset.id)
+    ).scalar()
+    db.commit()
+    asset = db.query(MediaAsset).filter_by(user_id=current_user.id, sha256=sha256).one()
+
+    # Render provider variants and the thumbnail now, off the publish path
+    if inserted_id is not None and asset.content_type in RESIZABLE_CONTENT_TYPES:
+        generate_media_variants.delay(asset.id)
+    return asset
+
+@router.get("/{media_id}/thumbnail")
+def get_media_thumbnail(
+    media_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    """
+    Serves the cached thumbnail of an image attachment. Thumbnails are rendered by the
+    `generate_media_variants` task, never on the request path: on a cache miss the task is queued
+    and a 503 with Retry-After is returned. The content never changes for a given asset, so
+    clients may cache it forever.
+    """
+    asset = db.query(MediaAsset).filter(MediaAsset.id == media_id).first()
+    if not asset or asset.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Media not found.")
+    if asset.content_type not in RESIZABLE_CONTENT_TYPES:
+        raise HTTPException(status_code=404, detail="No thumbnail for this media type.")
+    variant = cached_variant(asset, "thumbnail")
+    if not variant:
+        # Not rendered yet, or evicted from the cache since
+        generate_media_variants.delay(asset.id)
+        raise HTTPException(status_code=503, detail="Thumbnail is being generated.", headers={"Retry-After": "5"})
+    return FileResponse(
+        variant.path,
+        media_type=variant.content_type,
+        headers={"Cache-Control": "private, max-age=31536000, immutable", "ETag": f'"{variant.key}"'},
+    )
@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from app.db.partitions import recent_first
+from app.models.user import User
+from app.models.post import Post
+from app.models.post_delivery import PostDelivery
+from app.models.engagement import EngagementRollup
+from app.models.social_account import SocialAccount
+from app.schemas.metrics import ChannelMetrics, MetricsPoint, PostMetrics
+from app.dependencies import get_current_user_required, get_read_db
+
+router = APIRouter()
+
+GRANULARITY_PATTERN = "^(hour|day)$"
+
+@router.get("/posts/{post_id}", response_model=PostMetrics)
+def get_post_metrics(
+    post_id: int,
+    granularity: str = Query("hour", pattern=GRANULARITY_PATTERN),
+    days: int = Query(7, ge=1, le=365),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    """
+    Engagement over time for one post, per delivery (channel and account), read from the
+    hourly/daily rollups.
+    """
+    post = recent_first(db.query(Post).filter(Post.id == post_id), Post.created_at)
+    if not post or post.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found.")
+
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    rows = (
+        db.query(
+            PostDelivery.id, PostDelivery.channel, PostDelivery.provider_post_id, PostDelivery.social_account_id,
+            SocialAccount.display_name, SocialAccount.provider_user_id, EngagementRollup,
+        )
+        .join(EngagementRollup, EngagementRollup.delivery_id == PostDelivery.id)
+        .outerjoin(SocialAccount, SocialAccount.id == PostDelivery.social_account_id)
+        .filter(
+            PostDelivery.post_id == post_id,
+            PostDelivery.post_created_at == post.created_at,
+            EngagementRollup.granularity == granularity,
+            EngagementRollup.bucket_start >= since,
+        )
+        .order_by(PostDelivery.channel, PostDelivery.id, EngagementRollup.bucket_start)
+        .all()
+    )
+
+    series = {}
+    for delivery_id, channel, provider_post_id, account_id, display_name, provider_user_id, rollup in rows:
+        entry = series.setdefault(delivery_id, ChannelMetrics(
+            channel=channel,
+            account_id=account_id,
+            account_name=display_name or provider_user_id,
+            provider_post_id=provider_post_id,
+            points=[],
+        ))
+        entry.points.append(MetricsPoint.model_validate(rollup, from_attributes=True))
+    return PostMetrics(post_id=post_id, granularity=granularity, channels=list(series.values()))
+
+@router.get("/summary", response_model=List[MetricsPoint])
+def get_metrics_summary(
+    granularity: str = Query("day", pattern=GRANULARITY_PATTERN),
+    days: int = Query(30, ge=1, le=365),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    """
+    Total engagement across all of the current user's posts, per bucket, for history charts.
+    """
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    rows = (
+        db.query(
+            EngagementRollup.bucket_start,
+            func.sum(EngagementRollup.likes).label("likes"),
+            func.sum(EngagementRollup.reposts).label("reposts"),
+            func.sum(EngagementRollup.replies).label("replies"),
+            func.sum(EngagementRollup.impressions).label("impressions"),
+        )
+        .join(PostDelivery, PostDelivery.id == EngagementRollup.delivery_id)
+        .join(Post, (Post.id == PostDelivery.post_id) & (Post.created_at == PostDelivery.post_created_at))
+        .filter(
+            Post.user_id == current_user.id,
+            EngagementRollup.granularity == granularity,
+            EngagementRollup.bucket_start >= since,
+        )
+        .group_by(EngagementRollup.bucket_start)
+        .order_by(EngagementRollup.bucket_start)
+        .all()
+    )
+    return [MetricsPoint.model_validate(row, from_attributes=True) for row in rows]
@@ -1,29 +1,73 @@
-from fastapi import APIRouter, Depends, status, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, status, HTTPException, Header, Query
+from sqlalchemy import Float, cast, func, tuple_
+from sqlalchemy.orm import Session, selectinload
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 from app.db.session import get_db
 from app.models.user import User
-from app.models.post import Post, PostStatus
-from app.schemas.post import PostCreate, PostInDB
-from app.dependencies import get_current_user_required
-from app.worker.tasks import publish_to_linkedin
-from app.worker.tasks import publish_to_linkedin, publish_to_twitter
+from app.models.post import Post, PostStatus, SEARCH_CONFIG
+from app.models.post_delivery import PostDelivery, DeliveryStatus
+from app.models.media import MediaAsset, post_media
+from app.models.social_account import SocialAccount
+from app.models.engagement import EngagementRollup, EngagementSample
+from app.models.dead_letter import DeadLetter
+from app.schemas.post import PostCreate, PostCreated, PostDeliveryInDB, PostInDB, PostSearchPage, PostSearchResult
+from app.schemas.preflight import PreflightRequest, PreflightResponse
+from app.dependencies import get_current_user_required, get_read_db
+from app.api.pagination import decode_cursor, encode_cursor
+from app.db.partitions import recent_first
+from app.services.read_models import draft_posts
+from app.services.content_rules import first_error, preflight
+from app.core import idempotency
+from app.core.status_events import publish_post_status
+from app.core.config import settings
+from app.worker.tasks import enqueue_publish
+from app.worker.routing import LANE_BULK, LANE_NOW
 
 
 router = APIRouter()
 
-@router.post("/", response_model=PostInDB, status_code=status.HTTP_201_CREATED)
+def resolve_targets(db: Session, user_id: int, post_data: PostCreate) -> List[SocialAccount]:
+    """
+    The accounts a post goes to: `account_ids`, plus the user's first account on each channel
+    listed in `channels`. All of them are loaded with one query.
+    """
+    account_ids = list(dict.fromkeys(post_data.account_ids or []))
+    channels = [c for c in dict.fromkeys(post_data.channels or []) if c in ("linkedin", "twitter")]
+    if not account_ids and not channels:
+        return []
+    accounts = (
+        db.query(SocialAccount)
+        .filter(SocialAccount.user_id == user_id)
+        .filter(SocialAccount.id.in_(account_ids) | (SocialAccount.provider.in_(channels) & SocialAccount.parent_id.is_(None)))
+        .order_by(SocialAccount.id)
+        .all()
+    )
+    by_id = {account.id: account for account in accounts}
+    if len([account_id for account_id in account_ids if account_id in by_id]) != len(account_ids):
+        raise HTTPException(status_code=400, detail="One or more target accounts were not found.")
+    targets = [by_id[account_id] for account_id in account_ids]
+    for channel in channels:
+        default = next((a for a in accounts if a.provider == channel and a.parent_id is None), None)
+        if default and default not in targets:
+            targets.append(default)
+    return targets
+
+@router.post("/", response_model=PostCreated, status_code=status.HTTP_201_CREATED)
 def create_post(
     post_data: PostCreate,
     action: str, # 'post_now' or 'save_draft'
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user_required)
 ):
     """
     Creates a new post. If action is 'post_now', it triggers publishing tasks.
     If action is 'save_draft', it saves the post with a 'draft' status.
+
+    With an Idempotency-Key header, repeating the same request (a double-submitted
+    form, a client retry) returns the post created the first time instead of a new one.
     """
     if action == "post_now":
         post_status = PostStatus.SCHEDULED # Marked as scheduled to be picked up by worker
@@ -34,35 +78,177 @@ def create_post(
     else:
         raise HTTPException(status_code=400, detail="Invalid action specified.")
 
-    new_post = Post(
-        content=post_data.content,
-        user_id=current_user.id,
-        status=post_status,
-        published_at=published_time
-    )
-    db.add(new_post)
-    db.commit()
-    db.refresh(new_post)
+    # The key is checked before anything else: a replay of an accepted request gets its post
+    # back, instead of being validated again against accounts or media that have since changed.
+    if idempotency_key:
+        request_fingerprint = idempotency.fingerprint({"action": action, **post_data.model_dump()})
+        previous = idempotency.reserve(current_user.id, idempotency_key, request_fingerprint)
+        if previous:
+            if previous["fingerprint"] != request_fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request.")
+            if previous["state"] == idempotency.PENDING:
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still being processed.")
+            existing_post = recent_first(db.query(Post).filter(Post.id == previous["result"], Post.user_id == current_user.id), Post.created_at)
+            if not existing_post:
+                raise HTTPException(status_code=409, detail="The post created with this Idempotency-Key no longer exists.")
+            return existing_post
+
+    try:
+        media_ids = list(dict.fromkeys(post_data.media_ids or []))
+        if media_ids:
+            owned = db.query(MediaAsset.id).filter(MediaAsset.id.in_(media_ids), MediaAsset.user_id == current_user.id).count()
+            if owned != len(media_ids):
+                raise HTTPException(status_code=400, detail="One or more media attachments were not found.")
+
+        targets = resolve_targets(db, current_user.id, post_data) if action == "post_now" else []
 
-    # Trigger async tasks only if posting now and channels are selected
-    if action == "post_now" and post_data.channels:
-        if "linkedin" in post_data.channels:
-            publish_to_linkedin.delay(new_post.id)
-        if "twitter" in post_data.channels:
-            publish_to_twitter.delay(new_post.id)
+        if action == "post_now" and (post_data.account_ids or post_data.channels):
+            # Reject what the provider or the task would reject before anything reaches the queue
+            item = {"content": post_data.content, "account_ids": post_data.account_ids,
+                    "channels": post_data.channels, "media_ids": media_ids}
+            result = preflight(db, current_user.id, [item])[0]
+            if not result["ok"]:
+                raise HTTPException(status_code=422, detail=first_error(result))
 
+        new_post = Post(
+            content=post_data.content,
+            user_id=current_user.id,
+            status=post_status,
+            published_at=published_time
+        )
+        db.add(new_post)
+        db.flush()
+        if media_ids:
+            db.execute(post_media.insert(), [
+                {"post_id": new_post.id, "media_asset_id": media_id, "position": position}
+                for position, media_id in enumerate(media_ids)
+            ])
+
+        for account in targets:
+            new_post.deliveries.append(PostDelivery(channel=account.provider, social_account_id=account.id))
+
+        db.commit()
+    except Exception:
+        # Nothing was stored, so the client may retry with the same key
+        if idempotency_key:
+            idempotency.release(current_user.id, idempotency_key)
+        raise
+
+    # The post exists from here on: a retry with the key must get it back, even if enqueueing
+    # below fails, or it would create and publish a second post
+    if idempotency_key:
+        idempotency.complete(current_user.id, idempotency_key, request_fingerprint, new_post.id)
+
+    db.refresh(new_post)
+    draft_posts.invalidate(current_user.id)
+    for account in targets:
+        publish_post_status(current_user.id, new_post.id, account.provider, DeliveryStatus.PENDING.value,
+                            new_post.status.value, account_id=account.id)
+
+    # Trigger async tasks only if posting now and accounts are selected. A wide fan-out
+    # goes to the bulk lane, so it cannot hold up other users' "Post now" work.
+    if targets:
+        lane = LANE_NOW if len(targets) <= settings.PUBLISH_FANOUT_NOW_LIMIT else LANE_BULK
+        enqueue_publish(new_post.id, [(account.provider, account.id) for account in targets], lane)
     return new_post
 
+@router.post("/preflight", response_model=PreflightResponse)
+def preflight_posts(
+    request: PreflightRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    """
+    Validates up to 100 prospective posts against each channel's rules (length as the provider
+    counts it, media limits) and the readiness of the user's accounts, without creating anything.
+    Used by the composer as the user types, and by bulk imports before they submit.
+    """
+    return {"results": preflight(db, current_user.id, [item.model_dump() for item in request.items])}
+
 @router.get("/drafts", response_model=List[PostInDB])
 def get_draft_posts(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user_required)
 ):
     """
-    Retrieves all posts with the status 'draft' for the current user.
+    Retrieves all posts with the status 'draft' for the current user, served from the read model cache.
+    """
+    return draft_posts(db, current_user.id)
+
+@router.get("/search", response_model=PostSearchPage)
+def search_posts(
+    q: Optional[str] = None,
+    status_filter: Optional[PostStatus] = Query(None, alias="status"),
+    channel: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    sort: str = Query("rank", pattern="^(rank|recent)$"),
+    before: Optional[str] = None,
+    limit: int = Query(25, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    """
+    Full-text search over the current user's posts. `q` takes web-search syntax
+    ("quoted phrases", -excluded, or). Results are ordered by relevance, or by `sort=recent`,
+    and keyset-paginated: pass `next_cursor` back as `before`. Without `q` this lists the
+    filtered posts, newest first.
+    """
+    query = (
+        db.query(Post)
+        .options(selectinload(Post.media), selectinload(Post.deliveries))
+        .filter(Post.user_id == current_user.id)
+    )
+    if status_filter:
+        query = query.filter(Post.status == status_filter)
+    if channel:
+        query = query.filter(Post.deliveries.any(PostDelivery.channel == channel))
+    if created_after:
+        query = query.filter(Post.created_at >= created_after)
+    if created_before:
+        query = query.filter(Post.created_at < created_before)
+
+    if q:
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        query = query.filter(Post.search_vector.op("@@")(ts_query))
+
+    if q and sort == "rank":
+        # ts_rank_cd returns real; as double precision the cursor's float round-trips exactly,
+        # so rows tied on the boundary rank are neither skipped nor repeated
+        rank = cast(func.ts_rank_cd(Post.search_vector, ts_query), Float(53))
+        query = query.add_columns(rank)
+        if before:
+            query = query.filter(tuple_(rank, Post.id) < decode_cursor(before, float, int))
+        rows = query.order_by(rank.desc(), Post.id.desc()).limit(limit + 1).all()
+        items = [PostSearchResult.model_validate(post).model_copy(update={"rank": score}) for post, score in rows[:limit]]
+        next_cursor = encode_cursor(rows[limit - 1][1], rows[limit - 1][0].id) if len(rows) > limit else None
+    else:
+        if before:
+            query = query.filter(tuple_(Post.created_at, Post.id) < decode_cursor(before, datetime, int))
+        posts = query.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit + 1).all()
+        items = [PostSearchResult.model_validate(post) for post in posts[:limit]]
+        next_cursor = encode_cursor(posts[limit - 1].created_at, posts[limit - 1].id) if len(posts) > limit else None
+    return PostSearchPage(items=items, next_cursor=next_cursor)
+
+@router.get("/{post_id}/deliveries", response_model=List[PostDeliveryInDB])
+def get_post_deliveries(
+    post_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    """
+    The publish result of a post for each of its target accounts.
     """
-    drafts = db.query(Post).filter(Post.user_id == current_user.id, Post.status == PostStatus.DRAFT).order_by(Post.created_at.desc()).all()
-    return drafts
+    post = recent_first(db.query(Post).filter(Post.id == post_id, Post.user_id == current_user.id), Post.created_at)
+    if not post:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found.")
+    return (
+        db.query(PostDelivery)
+        .options(selectinload(PostDelivery.social_account))
+        .filter(PostDelivery.post_id == post_id, PostDelivery.post_created_at == post.created_at)
+        .order_by(PostDelivery.id)
+        .all()
+    )
 
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_post(
@@ -73,7 +259,7 @@ def delete_post(
     """
     Deletes a specific post.
     """
-    post_to_delete = db.query(Post).filter(Post.id == post_id).first()
+    post_to_delete = recent_first(db.query(Post).filter(Post.id == post_id), Post.created_at)
 
     if not post_to_delete:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found.")
@@ -81,6 +267,13 @@ def delete_post(
     if post_to_delete.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this post.")
 
+    # These reference the post without a foreign key (posts is partitioned)
+    delivery_ids = [delivery.id for delivery in post_to_delete.deliveries]
+    if delivery_ids:
+        db.query(EngagementSample).filter(EngagementSample.delivery_id.in_(delivery_ids)).delete(synchronize_session=False)
+        db.query(EngagementRollup).filter(EngagementRollup.delivery_id.in_(delivery_ids)).delete(synchronize_session=False)
+    db.query(DeadLetter).filter(DeadLetter.post_id == post_id).delete(synchronize_session=False)
     db.delete(post_to_delete)
     db.commit()
+    draft_posts.invalidate(current_user.id)
     return
\ No newline at end of file
@@ -10,6 +10,7 @@ from app.models.user import User
 from app.models.social_account import SocialAccount
 from app.dependencies import get_current_user_required
 from app.core.config import settings
+from app.services.read_models import connected_accounts
 
 router = APIRouter()
 
@@ -79,6 +80,7 @@ async def connect_twitter_account(
         existing_account.access_token = access_token
         existing_account.refresh_token = refresh_token
         existing_account.expires_at = expires_at
+        existing_account.display_name = profile_data.get("username")
     else:
         new_account = SocialAccount(
             user_id=current_user.id,
@@ -87,9 +89,11 @@ async def connect_twitter_account(
             access_token=access_token,
             refresh_token=refresh_token,
             expires_at=expires_at,
+            display_name=profile_data.get("username"),
         )
         db.add(new_account)
 
     db.commit()
+    connected_accounts.invalidate(current_user.id)
     
     return {"status": "success", "provider": "twitter", "username": profile_data.get("username")}
\ No newline at end of file
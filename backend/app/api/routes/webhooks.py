@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.db.session import get_db
+from app.models.user import User
+from app.models.webhook import WebhookDelivery, WebhookEndpoint
+from app.schemas.webhook import WebhookDeliveryInDB, WebhookEndpointCreate, WebhookEndpointCreated, WebhookEndpointInDB
+from app.dependencies import get_current_user_required
+from app.services.webhooks import EVENT_TYPES, new_secret, validate_endpoint_url
+from app.core.config import settings
+
+router = APIRouter()
+
+def get_owned_endpoint(db: Session, endpoint_id: int, user: User) -> WebhookEndpoint:
+    endpoint = db.query(WebhookEndpoint).filter(WebhookEndpoint.id == endpoint_id).first()
+    if not endpoint or endpoint.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Webhook endpoint not found.")
+    return endpoint
+
+@router.post("/", response_model=WebhookEndpointCreated, status_code=status.HTTP_201_CREATED)
+def create_webhook_endpoint(
+    endpoint_data: WebhookEndpointCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    """
+    Registers an endpoint for publish events. The signing secret is returned only in this response.
+    """
+    unknown = set(endpoint_data.event_types or []) - set(EVENT_TYPES)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown event types: {', '.join(sorted(unknown))}.")
+    try:
+        validate_endpoint_url(endpoint_data.url)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+    endpoint = WebhookEndpoint(
+        user_id=current_user.id,
+        url=endpoint_data.url,
+        secret=new_secret(),
+        event_types=endpoint_data.event_types,
+        max_concurrency=endpoint_data.max_concurrency or settings.WEBHOOK_DEFAULT_MAX_CONCURRENCY,
+    )
+    db.add(endpoint)
+    db.commit()
+    db.refresh(endpoint)
+    return endpoint
+
+@router.get("/", response_model=List[WebhookEndpointInDB])
+def list_webhook_endpoints(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    return db.query(WebhookEndpoint).filter(WebhookEndpoint.user_id == current_user.id).order_by(WebhookEndpoint.id).all()
+
+@router.delete("/{endpoint_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_webhook_endpoint(
+    endpoint_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    """
+    Removes an endpoint; its deliveries are deleted with it.
+    """
+    db.delete(get_owned_endpoint(db, endpoint_id, current_user))
+    db.commit()
+    return
+
+@router.get("/{endpoint_id}/deliveries", response_model=List[WebhookDeliveryInDB])
+def list_webhook_deliveries(
+    endpoint_id: int,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    """
+    Recent delivery attempts to an endpoint, newest first, for debugging a receiver.
+    """
+    endpoint = get_owned_endpoint(db, endpoint_id, current_user)
+    return (
+        db.query(WebhookDelivery)
+        .filter(WebhookDelivery.endpoint_id == endpoint.id)
+        .order_by(WebhookDelivery.id.desc())
+        .limit(min(limit, 200))
+        .all()
+    )
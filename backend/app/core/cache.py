@@ -0,0 +1,131 @@
+"""
+Read-through Redis cache for per-user read models.
+
+A read model is a function `(db, user_id) -> JSON-serializable value`, wrapped with
+`@read_model(name)`. Calls are served from Redis. On a miss, a single caller loads the value
+from Postgres while concurrent callers wait briefly for its result (single-flight), so an
+expired entry never sends a stampede of identical queries to the database.
+
+Invalidation is explicit. Write paths call `<read model>.invalidate(user_id)`, which bumps a
+per-user generation number. An entry is served only while its generation is current, so a
+value loaded concurrently with a write can never be served afterwards.
+
+If Redis is unavailable, reads go straight to the loader.
+"""
+import functools
+import json
+import secrets
+import time
+from typing import Callable, Dict, List
+
+import redis
+
+from app.core.config import settings
+from app.core.redis import redis_client
+
+STATS_KEY = "cache:stats"
+# How long a loader may hold the single-flight lock, and how often waiters poll
+LOCK_TTL_MS = 5000
+WAIT_INTERVAL_SECONDS = 0.02
+
+_RELEASE_LOCK = redis_client.register_script(
+    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+)
+
+READ_MODELS: Dict[str, "ReadModel"] = {}
+
+
+class ReadModel:
+    def __init__(self, name: str, loader: Callable, ttl: int):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        functools.update_wrapper(self, loader)
+
+    def _keys(self, user_id: int):
+        base = f"cache:{self.name}:{user_id}"
+        return f"{base}:gen", f"{base}:data", f"{base}:lock"
+
+    def _record(self, outcome: str):
+        redis_client.hincrby(STATS_KEY, f"{self.name}:{outcome}", 1)
+
+    def __call__(self, db, user_id: int):
+        gen_key, data_key, lock_key = self._keys(user_id)
+        try:
+            generation, stored = redis_client.mget(gen_key, data_key)
+            generation = int(generation or 0)
+            entry = json.loads(stored) if stored else None
+            if entry and entry["gen"] == generation:
+                self._record("hits")
+                return entry["value"]
+            self._record("misses")
+
+            token = secrets.token_hex(8)
+            deadline = time.monotonic() + LOCK_TTL_MS / 1000
+            while not redis_client.set(lock_key, token, nx=True, px=LOCK_TTL_MS):
+                # Another request is loading this value; use its result when it lands
+                if time.monotonic() >= deadline:
+                    return self.loader(db, user_id)
+                time.sleep(WAIT_INTERVAL_SECONDS)
+                generation, stored = redis_client.mget(gen_key, data_key)
+                entry = json.loads(stored) if stored else None
+                if entry and entry["gen"] == int(generation or 0):
+                    return entry["value"]
+        except redis.RedisError as exc:
+            print(f"[CACHE] Redis unavailable for {self.name}, reading from the database: {exc}")
+            return self.loader(db, user_id)
+
+        try:
+            value = self.loader(db, user_id)
+            # Stored under the generation read before loading: a concurrent invalidation
+            # bumps the generation and this entry is never served.
+            redis_client.set(data_key, json.dumps({"gen": generation, "value": value}), ex=self.ttl)
+            return value
+        finally:
+            try:
+                _RELEASE_LOCK(keys=[lock_key], args=[token])
+            except redis.RedisError:
+                pass
+
+    def invalidate(self, *user_ids: int):
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for user_id in user_ids:
+                gen_key, data_key, _ = self._keys(user_id)
+                pipe.incr(gen_key)
+                pipe.expire(gen_key, self.ttl * 2)
+                pipe.delete(data_key)
+            pipe.execute()
+        except redis.RedisError as exc:
+            # Entries still expire after `ttl`; log loudly since reads may be stale until then
+            print(f"[CACHE] Failed to invalidate {self.name} for users {user_ids}: {exc}")
+
+
+def read_model(name: str, ttl: int = None):
+    """
+    Decorator registering a cached per-user read model. See the module docstring.
+    """
+    def decorator(loader: Callable) -> ReadModel:
+        model = ReadModel(name, loader, ttl or settings.READ_MODEL_CACHE_TTL_SECONDS)
+        READ_MODELS[name] = model
+        return model
+    return decorator
+
+
+def cache_stats() -> List[dict]:
+    """
+    Hit and miss counts and hit ratio per read model, since the counters were last reset.
+    While Redis is unavailable the counts are unknown (None).
+    """
+    try:
+        counters = redis_client.hgetall(STATS_KEY)
+    except redis.RedisError as exc:
+        print(f"[CACHE] Stats unavailable: {exc}")
+        return [{"name": name, "hits": None, "misses": None, "hit_ratio": None} for name in READ_MODELS]
+    stats = []
+    for name in READ_MODELS:
+        hits = int(counters.get(f"{name}:hits", 0))
+        misses = int(counters.get(f"{name}:misses", 0))
+        total = hits + misses
+        stats.append({"name": name, "hits": hits, "misses": misses, "hit_ratio": hits / total if total else None})
+    return stats
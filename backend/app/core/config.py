@@ -11,6 +11,122 @@ class Settings:
     CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL")
     CELERY_RESULT_BACKEND: str = os.getenv("CELERY_RESULT_BACKEND")
 
+    # Redis used for shared state (circuit breakers, caches); defaults to the broker
+    REDIS_URL: str = os.getenv("REDIS_URL", os.getenv("CELERY_BROKER_URL"))
+
+    # Auth admission control: sliding-window limits per client IP and per username, and a cap on
+    # concurrent bcrypt operations per process (see README.md, "Auth rate limiting")
+    AUTH_RATE_LIMIT_WINDOW_SECONDS: int = int(os.getenv("AUTH_RATE_LIMIT_WINDOW_SECONDS", 60))
+    AUTH_LOGIN_PER_IP: int = int(os.getenv("AUTH_LOGIN_PER_IP", 20))
+    AUTH_LOGIN_PER_USERNAME: int = int(os.getenv("AUTH_LOGIN_PER_USERNAME", 10))
+    AUTH_REGISTER_PER_IP: int = int(os.getenv("AUTH_REGISTER_PER_IP", 5))
+    AUTH_MAX_CONCURRENT_HASHES: int = int(os.getenv("AUTH_MAX_CONCURRENT_HASHES", 4))
+    AUTH_HASH_WAIT_SECONDS: float = float(os.getenv("AUTH_HASH_WAIT_SECONDS", 2))
+    # Peers allowed to set X-Forwarded-For, as comma-separated networks. Empty trusts no one;
+    # docker-compose.yml sets it to the frontend service's address.
+    TRUSTED_PROXIES: str = os.getenv("TRUSTED_PROXIES", "")
+
+    # Upper bound on how long a cached per-user read model may live without being invalidated
+    READ_MODEL_CACHE_TTL_SECONDS: int = int(os.getenv("READ_MODEL_CACHE_TTL_SECONDS", 300))
+
+    # How long an Idempotency-Key on POST /api/posts/ is remembered
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400))
+    # ... and how long a key stays claimed by a request that has not finished
+    IDEMPOTENCY_PENDING_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_PENDING_TTL_SECONDS", 60))
+
+    # Celery tuning (see README.md, "Queues and routing")
+    CELERY_TASK_SERIALIZER: str = os.getenv("CELERY_TASK_SERIALIZER", "msgpack")
+    CELERY_TASK_COMPRESSION: str = os.getenv("CELERY_TASK_COMPRESSION", "zlib")
+    CELERY_TASK_ACKS_LATE: bool = os.getenv("CELERY_TASK_ACKS_LATE", "true").lower() == "true"
+    CELERY_TASK_REJECT_ON_WORKER_LOST: bool = os.getenv("CELERY_TASK_REJECT_ON_WORKER_LOST", "true").lower() == "true"
+    CELERY_TASK_IGNORE_RESULT: bool = os.getenv("CELERY_TASK_IGNORE_RESULT", "true").lower() == "true"
+    CELERY_WORKER_PREFETCH_MULTIPLIER: int = int(os.getenv("CELERY_WORKER_PREFETCH_MULTIPLIER", 1))
+    CELERY_QUEUE_ORDER_STRATEGY: str = os.getenv("CELERY_QUEUE_ORDER_STRATEGY", "priority")
+    # Must be longer than the longest retry countdown, or late-acked tasks are redelivered early.
+    CELERY_VISIBILITY_TIMEOUT: int = int(os.getenv("CELERY_VISIBILITY_TIMEOUT", 7200))
+
+    # Fan-out publishing: tasks are sent in groups of this many per broker round trip, and a
+    # post to more accounts than PUBLISH_FANOUT_NOW_LIMIT goes to the bulk lane.
+    PUBLISH_ENQUEUE_BATCH_SIZE: int = int(os.getenv("PUBLISH_ENQUEUE_BATCH_SIZE", 100))
+    PUBLISH_FANOUT_NOW_LIMIT: int = int(os.getenv("PUBLISH_FANOUT_NOW_LIMIT", 10))
+
+    # Monthly partitions of posts and post_deliveries. Partitions are created this many months
+    # ahead; older than POST_RETENTION_MONTHS (0 keeps everything) they are archived to gzipped
+    # CSV under POST_ARCHIVE_DIR and dropped. Lookups by id try the last POST_HOT_DAYS first.
+    POST_PARTITION_MONTHS_AHEAD: int = int(os.getenv("POST_PARTITION_MONTHS_AHEAD", 3))
+    POST_RETENTION_MONTHS: int = int(os.getenv("POST_RETENTION_MONTHS", 24))
+    POST_ARCHIVE_DIR: str = os.getenv("POST_ARCHIVE_DIR", "archive")
+    POST_HOT_DAYS: int = int(os.getenv("POST_HOT_DAYS", 45))
+    # Archival waits at most this long for the table locks it needs, then tries again next run
+    POST_ARCHIVE_LOCK_TIMEOUT: str = os.getenv("POST_ARCHIVE_LOCK_TIMEOUT", "5s")
+    POST_PARTITION_JOB_INTERVAL_SECONDS: int = int(os.getenv("POST_PARTITION_JOB_INTERVAL_SECONDS", 24 * 3600))
+
+    # Optional streaming replica for heavy read endpoints (history, search, metrics, feed).
+    # A user's reads stay on the primary for REPLICA_READ_YOUR_WRITES_SECONDS after they write,
+    # and all reads go to the primary while the replica lags more than REPLICA_MAX_LAG_SECONDS.
+    DATABASE_REPLICA_URL: str = os.getenv("DATABASE_REPLICA_URL")
+    REPLICA_READ_YOUR_WRITES_SECONDS: int = int(os.getenv("REPLICA_READ_YOUR_WRITES_SECONDS", 10))
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 5))
+    REPLICA_HEALTH_CHECK_SECONDS: int = int(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", 5))
+
+    # Database connection pool (per process)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+
+    # Worker HTTP settings. The shared client caps how many provider calls a
+    # single worker process keeps in flight; extra tasks wait for a connection.
+    WORKER_MAX_INFLIGHT_REQUESTS: int = int(os.getenv("WORKER_MAX_INFLIGHT_REQUESTS", 200))
+    WORKER_HTTP_TIMEOUT: float = float(os.getenv("WORKER_HTTP_TIMEOUT", 30))
+    WORKER_HTTP_POOL_TIMEOUT: float = float(os.getenv("WORKER_HTTP_POOL_TIMEOUT", 120))
+
+    # Publish retry policy: exponential backoff with full jitter, capped. The cap also bounds
+    # provider Retry-After waits and must stay below CELERY_VISIBILITY_TIMEOUT.
+    PUBLISH_MAX_RETRIES: int = int(os.getenv("PUBLISH_MAX_RETRIES", 6))
+    PUBLISH_RETRY_BASE_DELAY: float = float(os.getenv("PUBLISH_RETRY_BASE_DELAY", 15))
+    PUBLISH_RETRY_MAX_DELAY: float = float(os.getenv("PUBLISH_RETRY_MAX_DELAY", 3600))
+
+    # Engagement metrics ingestion
+    METRICS_INGEST_INTERVAL_SECONDS: int = int(os.getenv("METRICS_INGEST_INTERVAL_SECONDS", 3600))
+    METRICS_LOOKBACK_DAYS: int = int(os.getenv("METRICS_LOOKBACK_DAYS", 30))
+    # Metrics lookups each account may make per minute; batches are spread to stay under it
+    METRICS_REQUESTS_PER_MINUTE: int = int(os.getenv("METRICS_REQUESTS_PER_MINUTE", 10))
+
+    # Inbound feed sync. Each (account, stream) is synced between the min and max interval,
+    # more often while new items keep arriving.
+    FEED_SCHEDULER_TICK_SECONDS: int = int(os.getenv("FEED_SCHEDULER_TICK_SECONDS", 60))
+    FEED_SYNC_MIN_INTERVAL_SECONDS: int = int(os.getenv("FEED_SYNC_MIN_INTERVAL_SECONDS", 300))
+    FEED_SYNC_MAX_INTERVAL_SECONDS: int = int(os.getenv("FEED_SYNC_MAX_INTERVAL_SECONDS", 3600))
+    # Upper bound on pages fetched per stream per run, so a burst cannot drain the rate budget
+    FEED_SYNC_MAX_PAGES: int = int(os.getenv("FEED_SYNC_MAX_PAGES", 5))
+
+    # Outbound webhooks (see README.md, "Webhooks")
+    WEBHOOK_BATCH_SIZE: int = int(os.getenv("WEBHOOK_BATCH_SIZE", 50))
+    WEBHOOK_DEFAULT_MAX_CONCURRENCY: int = int(os.getenv("WEBHOOK_DEFAULT_MAX_CONCURRENCY", 2))
+    WEBHOOK_MAX_IN_FLIGHT: int = int(os.getenv("WEBHOOK_MAX_IN_FLIGHT", 200))
+    WEBHOOK_TIMEOUT_SECONDS: float = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", 10))
+    WEBHOOK_POLL_INTERVAL_SECONDS: float = float(os.getenv("WEBHOOK_POLL_INTERVAL_SECONDS", 1))
+    WEBHOOK_MAX_ATTEMPTS: int = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 12))
+    WEBHOOK_RETRY_BASE_DELAY: float = float(os.getenv("WEBHOOK_RETRY_BASE_DELAY", 10))
+    WEBHOOK_RETRY_MAX_DELAY: float = float(os.getenv("WEBHOOK_RETRY_MAX_DELAY", 3600))
+    # Only for local development against receivers on the compose network or localhost
+    WEBHOOK_ALLOW_PRIVATE_TARGETS: bool = os.getenv("WEBHOOK_ALLOW_PRIVATE_TARGETS", "false").lower() == "true"
+
+    # Live post status updates over server-sent events (see README.md, "Live status updates").
+    # Each user's recent events are kept so a reconnecting client can resume from Last-Event-ID.
+    STATUS_EVENTS_KEEP: int = int(os.getenv("STATUS_EVENTS_KEEP", 200))
+    STATUS_EVENTS_RETENTION_SECONDS: int = int(os.getenv("STATUS_EVENTS_RETENTION_SECONDS", 86400))
+    SSE_HEARTBEAT_SECONDS: float = float(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+
+    # Per-provider circuit breaker (state shared by all workers through Redis)
+    CIRCUIT_WINDOW_SECONDS: int = int(os.getenv("CIRCUIT_WINDOW_SECONDS", 60))
+    CIRCUIT_MIN_CALLS: int = int(os.getenv("CIRCUIT_MIN_CALLS", 20))
+    CIRCUIT_FAILURE_RATE: float = float(os.getenv("CIRCUIT_FAILURE_RATE", 0.5))
+    CIRCUIT_SLOW_CALL_SECONDS: float = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", 10))
+    CIRCUIT_SLOW_CALL_RATE: float = float(os.getenv("CIRCUIT_SLOW_CALL_RATE", 0.5))
+    CIRCUIT_OPEN_SECONDS: int = int(os.getenv("CIRCUIT_OPEN_SECONDS", 60))
+    CIRCUIT_HALF_OPEN_PROBES: int = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", 3))
+    CIRCUIT_DRAIN_SECONDS: int = int(os.getenv("CIRCUIT_DRAIN_SECONDS", 120))
+
     # Public Base URL
     APP_BASE_URL: str = os.getenv("APP_BASE_URL")
 
@@ -20,6 +136,21 @@ class Settings:
     LINKEDIN_REDIRECT_URI: str = os.getenv("LINKEDIN_REDIRECT_URI")
     LINKEDIN_SCOPE: str = os.getenv("LINKEDIN_SCOPE")
 
+    # Media storage: "local" (MEDIA_ROOT on disk) or "s3" (any S3-compatible store; needs boto3)
+    MEDIA_STORAGE_BACKEND: str = os.getenv("MEDIA_STORAGE_BACKEND", "local")
+    MEDIA_ROOT: str = os.getenv("MEDIA_ROOT", "media")
+    MEDIA_MAX_BYTES: int = int(os.getenv("MEDIA_MAX_BYTES", 512 * 1024 * 1024))
+    # Size of each streamed piece, and of each X APPEND segment (X allows up to 5 MB)
+    MEDIA_CHUNK_BYTES: int = int(os.getenv("MEDIA_CHUNK_BYTES", 4 * 1024 * 1024))
+    # Derived image variants (provider sizes, thumbnails), cached on local disk with LRU eviction
+    MEDIA_VARIANT_CACHE_DIR: str = os.getenv("MEDIA_VARIANT_CACHE_DIR", "media_cache")
+    MEDIA_VARIANT_CACHE_MAX_BYTES: int = int(os.getenv("MEDIA_VARIANT_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+    S3_BUCKET: str = os.getenv("S3_BUCKET")
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL")
+    S3_REGION: str = os.getenv("S3_REGION")
+    S3_ACCESS_KEY_ID: str = os.getenv("S3_ACCESS_KEY_ID")
+    S3_SECRET_ACCESS_KEY: str = os.getenv("S3_SECRET_ACCESS_KEY")
+
     # X (Twitter) Settings
     X_CLIENT_ID: str = os.getenv("X_CLIENT_ID")
     X_CLIENT_SECRET: str = os.getenv("X_CLIENT_SECRET")
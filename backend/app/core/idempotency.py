@@ -0,0 +1,61 @@
+"""
+Idempotency keys for POST /api/posts/, stored in Redis.
+
+If Redis is unavailable, requests go through without the check (fail open), like the cache
+and the rate limiters: a brief outage must not stop users from posting.
+"""
+import hashlib
+import json
+from typing import Optional
+
+import redis
+
+from app.core.config import settings
+from app.core.redis import redis_client
+
+PENDING = "pending"
+
+
+def _key(user_id: int, idempotency_key: str) -> str:
+    return f"idempotency:{user_id}:{idempotency_key}"
+
+
+def fingerprint(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def reserve(user_id: int, idempotency_key: str, request_fingerprint: str) -> Optional[dict]:
+    """
+    Claims an idempotency key for this request. Returns None if the key was free,
+    otherwise the stored record: {"state": "pending"|"done", "fingerprint": ..., "result": ...}.
+    A pending claim expires after IDEMPOTENCY_PENDING_TTL_SECONDS, so a request whose result
+    could not be stored blocks retries only briefly.
+    """
+    record = json.dumps({"state": PENDING, "fingerprint": request_fingerprint})
+    try:
+        if redis_client.set(_key(user_id, idempotency_key), record, nx=True, ex=settings.IDEMPOTENCY_PENDING_TTL_SECONDS):
+            return None
+        stored = redis_client.get(_key(user_id, idempotency_key))
+    except redis.RedisError as exc:
+        print(f"[IDEMPOTENCY] Could not check key for user {user_id} ({exc}); allowing request.")
+        return None
+    # The key may have expired between SET and GET; treat it as still in progress.
+    return json.loads(stored) if stored else {"state": PENDING, "fingerprint": request_fingerprint}
+
+
+def complete(user_id: int, idempotency_key: str, request_fingerprint: str, result) -> None:
+    record = json.dumps({"state": "done", "fingerprint": request_fingerprint, "result": result})
+    try:
+        redis_client.set(_key(user_id, idempotency_key), record, ex=settings.IDEMPOTENCY_TTL_SECONDS)
+    except redis.RedisError as exc:
+        print(f"[IDEMPOTENCY] Could not store result for user {user_id}: {exc}")
+
+
+def release(user_id: int, idempotency_key: str) -> None:
+    """
+    Frees a key whose request failed, so the client can retry with the same key.
+    """
+    try:
+        redis_client.delete(_key(user_id, idempotency_key))
+    except redis.RedisError as exc:
+        print(f"[IDEMPOTENCY] Could not release key for user {user_id}: {exc}")
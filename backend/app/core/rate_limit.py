@@ -0,0 +1,165 @@
+"""
+Admission control for expensive, unauthenticated endpoints.
+
+- `SlidingWindowLimiter`: at most `limit` requests per identity (client IP, username) within
+  the last `window` seconds. Each identity has a Redis sorted set of request timestamps, and
+  one Lua call trims it, counts it and records the request atomically.
+- `hashing_slot()`: caps how many bcrypt operations run at once in this process. Bursts queue
+  briefly and are then turned away, so they never take all the CPU.
+
+Both reject with an HTTPException carrying `Retry-After`, before any password is hashed.
+Redis errors fail open: logins keep working if Redis is down.
+"""
+import ipaddress
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple, Union
+
+import redis
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+from app.core.redis import redis_client
+
+STATS_KEY = "ratelimit:stats"
+
+# KEYS[1]: the identity's sorted set. ARGV: now (ms), window (ms), limit, member.
+# Returns {1, 0} when admitted, {0, ms until the oldest request leaves the window} otherwise.
+_SLIDING_WINDOW = redis_client.register_script("""
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('zremrangebyscore', KEYS[1], 0, now - window)
+if redis.call('zcard', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('zadd', KEYS[1], now, ARGV[4])
+    redis.call('pexpire', KEYS[1], window)
+    return {1, 0}
+end
+local oldest = redis.call('zrange', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, tonumber(oldest[2]) + window - now}
+""")
+
+LIMITERS: Dict[str, "SlidingWindowLimiter"] = {}
+
+
+def _record(name: str, outcome: str):
+    try:
+        redis_client.hincrby(STATS_KEY, f"{name}:{outcome}", 1)
+    except redis.RedisError:
+        pass
+
+
+def _too_many_requests(retry_after: float, detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+    )
+
+
+class SlidingWindowLimiter:
+    def __init__(self, name: str, limit: int, window_seconds: int):
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+        LIMITERS[name] = self
+
+    def hit(self, identity: str) -> Tuple[bool, float]:
+        """
+        Records one request by `identity`. Returns (allowed, retry_after_seconds).
+        """
+        try:
+            allowed, wait_ms = _SLIDING_WINDOW(
+                keys=[f"ratelimit:{self.name}:{identity}"],
+                args=[int(time.time() * 1000), self.window_seconds * 1000, self.limit, uuid.uuid4().hex],
+            )
+        except redis.RedisError as exc:
+            print(f"[RATE LIMIT] {self.name} unavailable ({exc}); admitting request.")
+            return True, 0.0
+        _record(self.name, "allowed" if allowed else "rejected")
+        return bool(allowed), wait_ms / 1000
+
+    def enforce(self, identity: str, detail: str):
+        allowed, retry_after = self.hit(identity)
+        if not allowed:
+            raise _too_many_requests(retry_after, detail)
+
+
+login_ip_limiter = SlidingWindowLimiter("login_ip", settings.AUTH_LOGIN_PER_IP, settings.AUTH_RATE_LIMIT_WINDOW_SECONDS)
+login_username_limiter = SlidingWindowLimiter("login_username", settings.AUTH_LOGIN_PER_USERNAME, settings.AUTH_RATE_LIMIT_WINDOW_SECONDS)
+register_ip_limiter = SlidingWindowLimiter("register_ip", settings.AUTH_REGISTER_PER_IP, settings.AUTH_RATE_LIMIT_WINDOW_SECONDS)
+
+
+def _parse_networks(value: str) -> List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]:
+    return [ipaddress.ip_network(part.strip()) for part in value.split(",") if part.strip()]
+
+
+TRUSTED_PROXIES = _parse_networks(settings.TRUSTED_PROXIES)
+
+
+def _is_trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str:
+    """
+    The caller's address. `X-Forwarded-For` is honoured only when it was added by trusted
+    proxies (such as the frontend service), and the first untrusted hop from the right wins.
+    """
+    peer: Optional[str] = request.client.host if request.client else None
+    if not peer or not _is_trusted(peer):
+        return peer or "unknown"
+    forwarded = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(forwarded):
+        if not _is_trusted(hop):
+            return hop
+    return forwarded[0] if forwarded else peer
+
+
+_hash_slots = threading.BoundedSemaphore(settings.AUTH_MAX_CONCURRENT_HASHES)
+
+
+@contextmanager
+def hashing_slot():
+    """
+    Holds one of this process's password-hashing slots, waiting up to AUTH_HASH_WAIT_SECONDS.
+    """
+    if not _hash_slots.acquire(timeout=settings.AUTH_HASH_WAIT_SECONDS):
+        _record("password_hashing", "rejected")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Sign-in is busy right now. Please try again in a moment.",
+            headers={"Retry-After": "1"},
+        )
+    _record("password_hashing", "allowed")
+    try:
+        yield
+    finally:
+        _hash_slots.release()
+
+
+def rate_limit_stats() -> List[dict]:
+    """
+    Admitted and rejected counts per limiter; None (unknown) while Redis is unavailable.
+    """
+    try:
+        counters = redis_client.hgetall(STATS_KEY)
+    except redis.RedisError as exc:
+        print(f"[RATE LIMIT] Stats unavailable: {exc}")
+        counters = None
+    stats = []
+    for name in [*LIMITERS, "password_hashing"]:
+        limiter = LIMITERS.get(name)
+        stats.append({
+            "name": name,
+            "limit": limiter.limit if limiter else settings.AUTH_MAX_CONCURRENT_HASHES,
+            "window_seconds": limiter.window_seconds if limiter else None,
+            "allowed": int(counters.get(f"{name}:allowed", 0)) if counters is not None else None,
+            "rejected": int(counters.get(f"{name}:rejected", 0)) if counters is not None else None,
+        })
+    return stats
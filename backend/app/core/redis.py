@@ -0,0 +1,5 @@
+import redis
+from app.core.config import settings
+
+# Connection pools are created lazily, so importing this module never touches Redis.
+redis_client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
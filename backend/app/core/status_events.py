@@ -0,0 +1,182 @@
+"""
+Live post status updates, delivered to browsers as server-sent events.
+
+Publishing: after committing a status change, callers run `publish_post_status`. One Lua call
+appends the event to the user's capped stream (`status:{user_id}`) and announces it on the
+`post-status` pub/sub channel. The stream id becomes the SSE event id.
+
+Fan-out: each API process holds a single pub/sub connection (`StatusBroadcaster`). It hands
+messages to in-memory queues, one for each open SSE connection of the target user. An idle
+subscriber therefore costs a queue and a suspended coroutine, not a Redis connection or a thread.
+
+Resume: a client that reconnects with `Last-Event-ID` first gets the newer events from the
+stream, then the live ones. A subscriber that falls too far behind, or that was connected
+while the pub/sub link dropped, is disconnected, and the same mechanism fills its gap.
+"""
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+from app.core.redis import redis_client
+
+CHANNEL = "post-status"
+# Events buffered per connection before it is considered too slow and closed
+QUEUE_SIZE = 100
+# Tells EventSource how long to wait before reconnecting
+RECONNECT_MS = 3000
+
+# KEYS[1]: the user's stream. ARGV: max length, retention (s), channel, user id, event JSON.
+_PUBLISH = redis_client.register_script("""
+local id = redis.call('xadd', KEYS[1], 'MAXLEN', '~', ARGV[1], '*', 'data', ARGV[5])
+redis.call('expire', KEYS[1], ARGV[2])
+redis.call('publish', ARGV[3], ARGV[4] .. ' ' .. id .. ' ' .. ARGV[5])
+return id
+""")
+
+
+def _stream_key(user_id: int) -> str:
+    return f"status:{user_id}"
+
+
+def _stream_position(event_id: str) -> Tuple[int, int]:
+    try:
+        milliseconds, sequence = event_id.split("-")
+        return int(milliseconds), int(sequence)
+    except (AttributeError, ValueError):
+        return 0, 0
+
+
+def publish_post_status(user_id: int, post_id: int, channel: Optional[str], status: str, post_status: str,
+                        detail: Optional[str] = None, account_id: Optional[int] = None):
+    """
+    Announces a committed status change. `status` is the delivery status for the target
+    account (or the post's, when `channel` is None). Never raises: live updates are best effort.
+    """
+    event = {
+        "post_id": post_id,
+        "channel": channel,
+        "account_id": account_id,
+        "status": status,
+        "post_status": post_status,
+        "detail": detail,
+        "at": datetime.now(timezone.utc).isoformat(),
+    }
+    try:
+        _PUBLISH(
+            keys=[_stream_key(user_id)],
+            args=[settings.STATUS_EVENTS_KEEP, settings.STATUS_EVENTS_RETENTION_SECONDS, CHANNEL, user_id, json.dumps(event)],
+        )
+    except redis.RedisError as exc:
+        print(f"[LIVE STATUS] Could not publish status of post {post_id} for user {user_id}: {exc}")
+
+
+class Subscription:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        # Set when events were dropped; the connection is closed so the client resumes
+        self.lagging = False
+
+    def offer(self, event_id: str, data: str):
+        try:
+            self.queue.put_nowait((event_id, data))
+        except asyncio.QueueFull:
+            self.lagging = True
+
+
+class StatusBroadcaster:
+    def __init__(self):
+        self._subscriptions: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._redis: Optional[aioredis.Redis] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    def _client(self) -> aioredis.Redis:
+        if self._redis is None:
+            self._redis = aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._redis
+
+    def connection_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[Subscription]:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        subscription = Subscription()
+        self._subscriptions[user_id].add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._subscriptions[user_id].discard(subscription)
+            if not self._subscriptions[user_id]:
+                del self._subscriptions[user_id]
+
+    async def replay(self, user_id: int, after: str) -> List[Tuple[str, str]]:
+        """
+        Events in the user's stream newer than `after`, oldest first.
+        """
+        entries = await self._client().xrange(_stream_key(user_id), min=after, max="+")
+        return [(event_id, fields["data"]) for event_id, fields in entries if event_id != after]
+
+    async def _listen(self):
+        while True:
+            pubsub = self._client().pubsub()
+            try:
+                await pubsub.subscribe(CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    user_id, event_id, data = message["data"].split(" ", 2)
+                    for subscription in list(self._subscriptions.get(int(user_id), ())):
+                        subscription.offer(event_id, data)
+            except (redis.RedisError, OSError) as exc:
+                print(f"[LIVE STATUS] Lost the pub/sub connection ({exc}); reconnecting.")
+                # Anything published meanwhile is in the streams: have every client resume from it
+                for subscriptions in self._subscriptions.values():
+                    for subscription in subscriptions:
+                        subscription.lagging = True
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+
+broadcaster = StatusBroadcaster()
+
+
+def _format(event_id: str, data: str) -> str:
+    return f"id: {event_id}\nevent: status\ndata: {data}\n\n"
+
+
+async def status_event_stream(user_id: int, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    SSE body for one connection: missed events after `last_event_id`, then live events, with
+    a comment line every SSE_HEARTBEAT_SECONDS to keep proxies from closing an idle stream.
+    """
+    async with broadcaster.subscribe(user_id) as subscription:
+        yield f"retry: {RECONNECT_MS}\n\n"
+        last_seen = _stream_position(last_event_id) if last_event_id else (0, 0)
+        if last_event_id:
+            try:
+                for event_id, data in await broadcaster.replay(user_id, last_event_id):
+                    yield _format(event_id, data)
+                    last_seen = max(last_seen, _stream_position(event_id))
+            except redis.RedisError as exc:
+                print(f"[LIVE STATUS] Replay for user {user_id} failed: {exc}")
+
+        while not subscription.lagging:
+            try:
+                event_id, data = await asyncio.wait_for(subscription.queue.get(), timeout=settings.SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            # Already sent during the replay
+            if _stream_position(event_id) <= last_seen:
+                continue
+            last_seen = _stream_position(event_id)
+            yield _format(event_id, data)
@@ -0,0 +1,102 @@
+"""
+Monthly range partitions of `posts` (by `created_at`) and `post_deliveries` (by its post's
+`created_at`, copied into `post_created_at`).
+
+A post and its deliveries always land in partitions for the same month, so a month can be
+archived or restored as a unit (see app/services/post_archive.py). Each table also has a
+DEFAULT partition. It holds drafts and other unfinished posts that were kept back when
+their month was archived, and anything written outside the months that exist.
+
+Partitions are created when the tables are, and then ahead of time by a daily beat task.
+Indexes are per partition, so index size and vacuum work follow the months still attached,
+not the whole history.
+"""
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Tuple
+
+from sqlalchemy import text
+
+from app.core.config import settings
+
+# Partitioned table -> partition key
+PARTITIONED_TABLES = {"posts": "created_at", "post_deliveries": "post_created_at"}
+
+_MONTH_SUFFIX = re.compile(r"_(\d{4})_(\d{2})$")
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def month_bounds(month: date) -> Tuple[str, str]:
+    """
+    The partition range of a month in UTC, as literals for FOR VALUES FROM ... TO.
+    """
+    return f"{month:%Y-%m-%d} 00:00:00+00", f"{add_months(month, 1):%Y-%m-%d} 00:00:00+00"
+
+
+def create_partitions(connection, table: str, first_month: date, months_ahead: int) -> List[str]:
+    """
+    Creates the DEFAULT partition and one partition per month from `first_month` through
+    `months_ahead` months later, skipping those that exist. Returns the names created.
+    """
+    created = []
+    existing = {name for name, _ in attached_partitions(connection, table)}
+    connection.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+    for offset in range(months_ahead + 1):
+        month = add_months(first_month, offset)
+        name = partition_name(table, month)
+        if name in existing:
+            continue
+        start, end = month_bounds(month)
+        connection.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')"))
+        created.append(name)
+    return created
+
+
+def attached_partitions(connection, table: str) -> List[Tuple[str, date]]:
+    """
+    The monthly partitions attached to `table`, oldest first, as (name, month).
+    """
+    rows = connection.execute(text("""
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :table
+    """), {"table": table}).fetchall()
+    partitions = []
+    for (name,) in rows:
+        match = _MONTH_SUFFIX.search(name)
+        if match and name == f"{table}{match.group(0)}":
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partitions_on_create(target, connection, **kw):
+    # `after_create` listener of the partitioned tables: the current month and those ahead
+    this_month = month_start(datetime.now(timezone.utc).date())
+    create_partitions(connection, target.name, this_month, settings.POST_PARTITION_MONTHS_AHEAD)
+
+
+def hot_cutoff() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=settings.POST_HOT_DAYS)
+
+
+def recent_first(query, created_column):
+    """
+    `query.first()`, tried against the partitions of the last POST_HOT_DAYS before all of them.
+    Publishing, retries and the dashboard almost always look up recent posts, and the bound on
+    the partition key lets Postgres skip every older partition.
+    """
+    found = query.filter(created_column >= hot_cutoff()).first()
+    return found if found is not None else query.first()
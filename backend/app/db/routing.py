@@ -0,0 +1,110 @@
+"""
+Routes read-only API sessions to the replica when it is safe to do so.
+
+A request reads from the replica only when all of these hold:
+
+- `DATABASE_REPLICA_URL` is configured;
+- the user has not written in the last REPLICA_READ_YOUR_WRITES_SECONDS (read-your-writes);
+- the replica answered its last health check within REPLICA_MAX_LAG_SECONDS of replay lag.
+
+Otherwise the request reads from the primary. Writes made through an API session whose user
+is known (`session.info["user_id"]`, set by `get_current_user_required`) open the user's
+read-your-writes window when they commit.
+"""
+import threading
+import time
+
+import redis
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis import redis_client
+from app.db.session import SessionLocal, ReplicaSessionLocal, replica_engine
+
+# Seconds of replay lag; 0 when the replica has replayed everything it received
+LAG_QUERY = text("""
+    SELECT COALESCE(
+        CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+             ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END,
+        0)
+""")
+
+_health_lock = threading.Lock()
+_health = {"checked_at": 0.0, "healthy": False, "lag": None}
+
+
+def _recent_write_key(user_id: int) -> str:
+    return f"replica:recent-write:{user_id}"
+
+
+def mark_user_write(user_id: int):
+    try:
+        redis_client.set(_recent_write_key(user_id), 1, ex=settings.REPLICA_READ_YOUR_WRITES_SECONDS)
+    except redis.RedisError as exc:
+        print(f"[DB ROUTING] Could not record write for user {user_id}: {exc}")
+
+
+def wrote_recently(user_id: int) -> bool:
+    try:
+        return bool(redis_client.exists(_recent_write_key(user_id)))
+    except redis.RedisError:
+        # Without the marker we cannot rule out a recent write, so stay on the primary
+        return True
+
+
+def replica_status() -> dict:
+    """
+    Returns the replica's health, probing it at most once per REPLICA_HEALTH_CHECK_SECONDS
+    per process.
+    """
+    if replica_engine is None:
+        return {"configured": False, "healthy": False, "lag": None}
+    now = time.monotonic()
+    if now - _health["checked_at"] >= settings.REPLICA_HEALTH_CHECK_SECONDS and _health_lock.acquire(blocking=False):
+        try:
+            with replica_engine.connect() as connection:
+                lag = float(connection.execute(LAG_QUERY).scalar())
+            _health.update(healthy=lag <= settings.REPLICA_MAX_LAG_SECONDS, lag=lag)
+            if not _health["healthy"]:
+                print(f"[DB ROUTING] Replica is {lag:.1f}s behind; reading from the primary.")
+        except Exception as exc:
+            _health.update(healthy=False, lag=None)
+            print(f"[DB ROUTING] Replica health check failed; reading from the primary: {exc}")
+        finally:
+            _health["checked_at"] = time.monotonic()
+            _health_lock.release()
+    return {"configured": True, "healthy": _health["healthy"], "lag": _health["lag"]}
+
+
+def read_session(user_id: int) -> Session:
+    """
+    Opens a session for a read-only request by `user_id`: on the replica when it is healthy
+    and the user has no recent writes, otherwise on the primary.
+    """
+    if ReplicaSessionLocal is not None and replica_status()["healthy"] and not wrote_recently(user_id):
+        return ReplicaSessionLocal()
+    return SessionLocal()
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _flag_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _flag_bulk_write(orm_execute_state):
+    # Bulk UPDATE/DELETE and Core INSERTs run through Session.execute without a flush
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _clear_write_flag(session):
+    session.info.pop("wrote", None)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _open_read_your_writes_window(session):
+    if session.info.pop("wrote", False) and session.info.get("user_id"):
+        mark_user_write(session.info["user_id"])
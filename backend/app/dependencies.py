@@ -5,6 +5,7 @@ from jose import JWTError, jwt
 from typing import Optional
 
 from app.db.session import get_db
+from app.db.routing import read_session
 from app.models.user import User
 from app.core.config import settings
 from app.schemas.token import TokenData
@@ -29,4 +30,16 @@ def get_current_user_required(token: str = Depends(oauth2_scheme), db: Session =
     user = db.query(User).filter(User.username == token_data.username).first()
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    # Lets the session's commits open this user's read-your-writes window (app/db/routing.py)
+    db.info["user_id"] = user.id
+    return user
+
+def get_read_db(current_user: User = Depends(get_current_user_required)):
+    """
+    Session for read-only endpoints: the replica when it is safe to read from, else the primary.
+    """
+    db = read_session(current_user.id)
+    try:
+        yield db
+    finally:
+        db.close()
\ No newline at end of file
@@ -1,7 +1,7 @@
 from fastapi import FastAPI
-from app.api.routes import auth, users, linkedin, posts, twitter
+from app.api.routes import auth, users, linkedin, posts, twitter, dead_letters, diagnostics, media, metrics, feed, webhooks, events
 from app.db.session import engine
-from app.models import user, social_account, post
+from app.models import user, social_account, post, dead_letter, post_delivery, media as media_models, engagement, feed as feed_models, webhook
 
 # Create database tables on startup
 # Base.metadata.create_all(bind=engine) will create all tables from imported models
@@ -14,6 +14,13 @@ app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(linkedin.router, prefix="/api/linkedin", tags=["linkedin"])
 app.include_router(twitter.router, prefix="/api/twitter", tags=["twitter"]) 
 app.include_router(posts.router, prefix="/api/posts", tags=["posts"])
+app.include_router(media.router, prefix="/api/media", tags=["media"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
+app.include_router(feed.router, prefix="/api/feed", tags=["feed"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
+app.include_router(webhooks.router, prefix="/api/webhooks", tags=["webhooks"])
+app.include_router(dead_letters.router, prefix="/api/dead-letters", tags=["dead-letters"])
+app.include_router(diagnostics.router, prefix="/api/diagnostics", tags=["diagnostics"])
 
 @app.get("/api/health")
 def health_check():
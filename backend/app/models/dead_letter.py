@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class DeadLetter(Base):
+    """
+    A publish task that will not be retried automatically, because it failed permanently,
+    its account needs reconnecting, or it ran out of retries. It can be replayed from the API.
+    """
+    __tablename__ = "dead_letters"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # No foreign key: posts is partitioned, and its key includes created_at. Deleting a post
+    # deletes its dead letters explicitly.
+    post_id = Column(Integer, nullable=True, index=True)
+
+    task_name = Column(String(255), nullable=False)
+    task_args = Column(JSON, nullable=False, default=list)
+
+    error_kind = Column(String(50), nullable=False)
+    error = Column(Text, nullable=True)
+    retries = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    replayed_at = Column(DateTime(timezone=True), nullable=True)
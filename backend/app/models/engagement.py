@@ -0,0 +1,46 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index, PrimaryKeyConstraint
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class EngagementSample(Base):
+    """
+    Raw, append-only engagement counters for a delivered post, one row per ingestion run.
+    Rows are only ever inserted, in time order, so `sampled_at` has a BRIN index: it stays
+    a few pages in size however large the table grows.
+    """
+    __tablename__ = "engagement_samples"
+    __table_args__ = (
+        Index("ix_engagement_samples_sampled_at", "sampled_at", postgresql_using="brin"),
+        Index("ix_engagement_samples_delivery_sampled", "delivery_id", "sampled_at"),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    # No foreign key: post_deliveries is partitioned. Rows go when their post is deleted or archived.
+    delivery_id = Column(Integer, nullable=False)
+    sampled_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    likes = Column(BigInteger, nullable=True)
+    reposts = Column(BigInteger, nullable=True)
+    replies = Column(BigInteger, nullable=True)
+    impressions = Column(BigInteger, nullable=True)
+
+class EngagementRollup(Base):
+    """
+    Hourly and daily engagement per delivery. Counters are cumulative, so each bucket holds
+    the latest sample taken inside it. The metrics API reads only this table.
+    """
+    __tablename__ = "engagement_rollups"
+    __table_args__ = (PrimaryKeyConstraint("delivery_id", "granularity", "bucket_start"),)
+
+    delivery_id = Column(Integer, nullable=False)
+    granularity = Column(String(10), nullable=False)  # "hour" or "day"
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+
+    likes = Column(BigInteger, nullable=True)
+    reposts = Column(BigInteger, nullable=True)
+    replies = Column(BigInteger, nullable=True)
+    impressions = Column(BigInteger, nullable=True)
+    samples = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+ROLLUP_GRANULARITIES = ("hour", "day")
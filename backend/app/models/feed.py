@@ -0,0 +1,70 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Enum, Index, PrimaryKeyConstraint, UniqueConstraint, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.sql import func
+import enum
+from app.db.session import Base
+from app.models.post import SEARCH_CONFIG
+
+class FeedItemKind(str, enum.Enum):
+    TIMELINE = "timeline"
+    MENTION = "mention"
+    COMMENT = "comment"
+
+class FeedItem(Base):
+    """
+    An item pulled in from a connected account: its own posts, mentions of it, and comments
+    on it. Items are upserted by (account, kind, provider id), so fetching one twice is harmless.
+    """
+    __tablename__ = "feed_items"
+    __table_args__ = (
+        UniqueConstraint("social_account_id", "kind", "provider_item_id", name="uq_feed_items_account_kind_item"),
+        # Keyset pagination of a user's feed, newest first
+        Index("ix_feed_items_user_posted", "user_id", "posted_at", "id"),
+        Index("ix_feed_items_user_search", "user_id", "search_vector", postgresql_using="gin"),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    social_account_id = Column(Integer, ForeignKey("social_accounts.id", ondelete="CASCADE"), nullable=False)
+    provider = Column(String(50), nullable=False)
+    kind = Column(Enum(FeedItemKind), nullable=False)
+
+    provider_item_id = Column(String(255), nullable=False)
+    author_id = Column(String(255), nullable=True)
+    author_name = Column(String(255), nullable=True)
+    content = Column(Text, nullable=True)
+    url = Column(String(1024), nullable=True)
+    search_vector = Column(TSVECTOR, Computed(f"to_tsvector('{SEARCH_CONFIG}', coalesce(content, ''))", persisted=True))
+
+    posted_at = Column(DateTime(timezone=True), nullable=False)
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class SyncCursor(Base):
+    """
+    Where the last sync of one (account, kind) stream stopped, and when to sync it next.
+    `cursor` is the provider's high-water mark: the newest tweet id for X (`since_id`), the
+    newest creation time in epoch milliseconds for LinkedIn.
+
+    A run that runs out of pages before reaching `cursor` leaves it in place and records where
+    it stopped in `resume_from` (X: the oldest tweet id fetched, LinkedIn: the next offset), and
+    the high-water mark it saw in `resume_cursor`. The next runs continue from there, and
+    `cursor` only moves to `resume_cursor` once they reach it, so no items are skipped.
+    """
+    __tablename__ = "sync_cursors"
+    __table_args__ = (
+        PrimaryKeyConstraint("social_account_id", "kind"),
+        Index("ix_sync_cursors_next_sync_at", "next_sync_at"),
+    )
+
+    social_account_id = Column(Integer, ForeignKey("social_accounts.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(Enum(FeedItemKind), nullable=False)
+
+    cursor = Column(String(255), nullable=True)
+    resume_from = Column(String(255), nullable=True)
+    resume_cursor = Column(String(255), nullable=True)
+    # Adaptive: shrinks while the stream is active, grows while it is quiet
+    interval_seconds = Column(Integer, nullable=False)
+    next_sync_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_synced_at = Column(DateTime(timezone=True), nullable=True)
+    last_new_items = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
@@ -0,0 +1,79 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Enum, JSON, Table, UniqueConstraint
+from sqlalchemy.orm import foreign, relationship
+from sqlalchemy.sql import func
+import enum
+from app.db.session import Base
+
+# Ordered attachments of a post. `post_id` has no foreign key because posts is partitioned;
+# the ORM removes a post's rows when it deletes the post, and archival moves them with it.
+post_media = Table(
+    "post_media",
+    Base.metadata,
+    Column("post_id", Integer, primary_key=True),
+    Column("media_asset_id", Integer, ForeignKey("media_assets.id", ondelete="CASCADE"), primary_key=True),
+    Column("position", Integer, nullable=False, default=0),
+)
+
+class MediaAsset(Base):
+    """
+    An uploaded image or video. The bytes live in content-addressed storage under `sha256`;
+    uploading the same file again returns the existing asset.
+    """
+    __tablename__ = "media_assets"
+    __table_args__ = (UniqueConstraint("user_id", "sha256", name="uq_media_assets_user_sha256"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    sha256 = Column(String(64), nullable=False, index=True)
+    storage_key = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    size_bytes = Column(BigInteger, nullable=False)
+    original_filename = Column(String(255), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    @property
+    def is_video(self) -> bool:
+        return self.content_type.startswith("video/")
+
+class MediaUploadState(str, enum.Enum):
+    UPLOADING = "uploading"
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+
+class MediaUpload(Base):
+    """
+    The state of one asset's upload to one social account. An asset is uploaded once per
+    account and then reused by every post that attaches it. Progress is saved after each
+    chunk, so an interrupted upload resumes where it stopped.
+    """
+    __tablename__ = "media_uploads"
+    __table_args__ = (UniqueConstraint("media_asset_id", "social_account_id", name="uq_media_uploads_asset_account"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    media_asset_id = Column(Integer, ForeignKey("media_assets.id", ondelete="CASCADE"), nullable=False)
+    social_account_id = Column(Integer, ForeignKey("social_accounts.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    state = Column(Enum(MediaUploadState), default=MediaUploadState.UPLOADING, nullable=False)
+    # X media_id or LinkedIn digital media asset URN
+    provider_media_id = Column(String(255), nullable=True)
+    # Provider-specific resume data: next X segment, LinkedIn upload URL or multipart parts
+    upload_state = Column(JSON, nullable=False, default=dict)
+    # X media ids stop being usable after a while; LinkedIn assets do not expire
+    expires_at = Column(DateTime, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    asset = relationship("MediaAsset")
+
+from .post import Post
+Post.media = relationship(
+    "MediaAsset",
+    secondary=post_media,
+    primaryjoin=Post.id == foreign(post_media.c.post_id),
+    secondaryjoin=MediaAsset.id == foreign(post_media.c.media_asset_id),
+    order_by=post_media.c.position,
+)
@@ -1,30 +1,58 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Computed, Index, DDL, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from datetime import datetime, timezone
 import enum
+from app.db.partitions import create_partitions_on_create
 from app.db.session import Base
 
+# Text search configuration behind every tsvector column and query
+SEARCH_CONFIG = "english"
+
 class PostStatus(str, enum.Enum):
     DRAFT = "draft"
     SCHEDULED = "scheduled"
+    RETRYING = "retrying"
     PUBLISHED = "published"
     FAILED = "failed"
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (
+        # btree_gin lets one GIN index answer "this user's posts matching these words"
+        Index("ix_posts_user_search", "user_id", "search_vector", postgresql_using="gin"),
+        # Keyset pagination of a user's posts, newest first
+        Index("ix_posts_user_created", "user_id", "created_at", "id"),
+        # One partition per month; see app/db/partitions.py
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Postgres requires the partition key in the primary key; `id` alone is still unique
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     content = Column(Text, nullable=False)
     
     status = Column(Enum(PostStatus), default=PostStatus.DRAFT, nullable=False)
     
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set before the insert as well, because it is part of the primary key
+    created_at = Column(DateTime(timezone=True), primary_key=True, nullable=False,
+                        default=lambda: datetime.now(timezone.utc), server_default=func.now())
     scheduled_at = Column(DateTime(timezone=True), nullable=True)
     published_at = Column(DateTime(timezone=True), nullable=True)
 
+    # Maintained by Postgres on every insert and update of `content`
+    search_vector = Column(TSVECTOR, Computed(f"to_tsvector('{SEARCH_CONFIG}', content)", persisted=True))
+
     owner = relationship("User", back_populates="posts")
 
+    @property
+    def channels(self):
+        return list(dict.fromkeys(delivery.channel for delivery in self.deliveries))
+
+event.listen(Post.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS btree_gin"))
+event.listen(Post.__table__, "after_create", create_partitions_on_create)
+
 from .user import User
 User.posts = relationship("Post", back_populates="owner", cascade="all, delete-orphan")
 
@@ -0,0 +1,57 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, ForeignKeyConstraint, Enum, UniqueConstraint, event
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+import enum
+from app.db.partitions import create_partitions_on_create
+from app.db.session import Base
+
+class DeliveryStatus(str, enum.Enum):
+    PENDING = "pending"
+    RETRYING = "retrying"
+    DELIVERED = "delivered"
+    FAILED = "failed"
+
+class PostDelivery(Base):
+    """
+    Publish ledger: one row per (post, target account). A task checks it before calling the
+    provider, so a redelivered or replayed task for an account that already got the post is a
+    no-op. Rows from before per-account targets have no `social_account_id`.
+
+    Partitioned by the post's creation month (`post_created_at`), so a post and its deliveries
+    are always in partitions for the same month.
+    """
+    __tablename__ = "post_deliveries"
+    __table_args__ = (
+        # post_created_at follows from post_id; it is here because unique keys must include the partition key
+        UniqueConstraint("post_id", "post_created_at", "social_account_id", name="uq_post_deliveries_post_account"),
+        ForeignKeyConstraint(["post_id", "post_created_at"], ["posts.id", "posts.created_at"], ondelete="CASCADE"),
+        {"postgresql_partition_by": "RANGE (post_created_at)"},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    post_id = Column(Integer, nullable=False, index=True)
+    post_created_at = Column(DateTime(timezone=True), primary_key=True, nullable=False)
+    channel = Column(String(50), nullable=False)
+    social_account_id = Column(Integer, ForeignKey("social_accounts.id", ondelete="SET NULL"), nullable=True, index=True)
+
+    status = Column(Enum(DeliveryStatus), default=DeliveryStatus.PENDING, nullable=False)
+    # The id the provider assigned to the published post (tweet id, LinkedIn share URN)
+    provider_post_id = Column(String(255), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+
+    post = relationship("Post", back_populates="deliveries")
+    social_account = relationship("SocialAccount")
+
+    @property
+    def account_name(self):
+        return self.social_account.label if self.social_account else None
+
+event.listen(PostDelivery.__table__, "after_create", create_partitions_on_create)
+
+from .post import Post
+from .social_account import SocialAccount
+Post.deliveries = relationship("PostDelivery", back_populates="post", cascade="all, delete-orphan")
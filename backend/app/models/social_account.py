@@ -1,19 +1,23 @@
 from sqlalchemy.types import Text
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
 class SocialAccount(Base):
     __tablename__ = "social_accounts"
+    __table_args__ = (
+        # Per user: an organization page can be connected by each of its administrators
+        UniqueConstraint("user_id", "provider", "provider_user_id", name="uq_social_accounts_user_provider_account"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     
     provider = Column(String(50), nullable=False)
     
     # Increased the length from the default to 255 to ensure
     # the full URN (e.g., "urn:li:person:y3p7QW4Is_") can be stored without truncation.
-    provider_user_id = Column(String(255), nullable=False, unique=True)
+    provider_user_id = Column(String(255), nullable=False)
     
     # Increased length for potentially long access tokens
     access_token = Column(String(1024), nullable=False)
@@ -21,8 +25,19 @@ class SocialAccount(Base):
     refresh_token = Column(Text, nullable=True)
     
     expires_at = Column(DateTime, nullable=True)
+
+    # "member" for a connected login; "organization" for a LinkedIn page that member administers.
+    # Page rows carry a copy of the member's token (kept in step on reconnect) and are removed
+    # with the member account.
+    account_type = Column(String(20), nullable=False, default="member", server_default="member")
+    parent_id = Column(Integer, ForeignKey("social_accounts.id", ondelete="CASCADE"), nullable=True, index=True)
+    display_name = Column(String(255), nullable=True)
     
     owner = relationship("User", back_populates="social_accounts")
 
+    @property
+    def label(self) -> str:
+        return self.display_name or self.provider_user_id
+
 from .user import User
 User.social_accounts = relationship("SocialAccount", back_populates="owner", cascade="all, delete-orphan")
\ No newline at end of file
@@ -0,0 +1,65 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Enum, JSON, Boolean, Index
+from sqlalchemy.sql import func
+import enum
+from app.db.session import Base
+
+class WebhookEndpoint(Base):
+    """
+    A URL a user registered to receive publish events. Requests are signed with `secret`.
+    `failure_count` and `next_attempt_at` implement per-endpoint backoff: while a receiver is
+    failing, the dispatcher stops sending it anything until `next_attempt_at`.
+    """
+    __tablename__ = "webhook_endpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    url = Column(String(2048), nullable=False)
+    secret = Column(String(128), nullable=False)
+    # Event types to send; null means all of them
+    event_types = Column(JSON, nullable=True)
+    max_concurrency = Column(Integer, nullable=False, default=2)
+    is_active = Column(Boolean, nullable=False, default=True)
+
+    failure_count = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class WebhookEvent(Base):
+    """
+    Something that happened to a user's post, written in the same transaction as the change
+    itself, so an event is recorded exactly when its status change is.
+    """
+    __tablename__ = "webhook_events"
+
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    event_type = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class WebhookDeliveryStatus(str, enum.Enum):
+    PENDING = "pending"
+    DELIVERED = "delivered"
+    FAILED = "failed"
+
+class WebhookDelivery(Base):
+    """
+    One event owed to one endpoint. The dispatcher claims due rows, sends them in batches,
+    and reschedules failed ones with backoff until WEBHOOK_MAX_ATTEMPTS.
+    """
+    __tablename__ = "webhook_deliveries"
+    __table_args__ = (
+        Index("ix_webhook_deliveries_due", "status", "next_attempt_at"),
+        Index("ix_webhook_deliveries_endpoint", "endpoint_id", "id"),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    endpoint_id = Column(Integer, ForeignKey("webhook_endpoints.id", ondelete="CASCADE"), nullable=False)
+    event_id = Column(BigInteger, ForeignKey("webhook_events.id", ondelete="CASCADE"), nullable=False)
+
+    status = Column(Enum(WebhookDeliveryStatus), default=WebhookDeliveryStatus.PENDING, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_status_code = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, List, Optional
+
+class DeadLetterInDB(BaseModel):
+    id: int
+    post_id: Optional[int] = None
+    task_name: str
+    task_args: List[Any]
+    error_kind: str
+    error: Optional[str] = None
+    retries: int
+    created_at: datetime
+    replayed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+from app.models.feed import FeedItemKind
+
+class FeedItemInDB(BaseModel):
+    id: int
+    provider: str
+    kind: FeedItemKind
+    provider_item_id: str
+    author_id: Optional[str] = None
+    author_name: Optional[str] = None
+    content: Optional[str] = None
+    url: Optional[str] = None
+    posted_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class FeedPage(BaseModel):
+    items: List[FeedItemInDB]
+    # Pass back as `before` to get the next (older) page; None on the last page
+    next_cursor: Optional[str] = None
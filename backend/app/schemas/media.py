@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+class MediaAssetInDB(BaseModel):
+    id: int
+    sha256: str
+    content_type: str
+    size_bytes: int
+    original_filename: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+class MetricsPoint(BaseModel):
+    bucket_start: datetime
+    likes: Optional[int] = None
+    reposts: Optional[int] = None
+    replies: Optional[int] = None
+    impressions: Optional[int] = None
+
+class ChannelMetrics(BaseModel):
+    # One series per delivery: a post to several accounts on a channel has one for each
+    channel: str
+    account_id: Optional[int] = None
+    account_name: Optional[str] = None
+    provider_post_id: Optional[str] = None
+    points: List[MetricsPoint]
+
+class PostMetrics(BaseModel):
+    post_id: int
+    granularity: str
+    channels: List[ChannelMetrics]
@@ -1,19 +1,51 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import List, Optional
 from app.models.post import PostStatus
+from app.models.post_delivery import DeliveryStatus
+from app.schemas.media import MediaAssetInDB
 
 class PostBase(BaseModel):
     content: str
 
 class PostCreate(PostBase):
+    # Target accounts (ids from /api/linkedin/accounts, which lists X accounts too). A channel in `channels` means the first account on it.
+    account_ids: Optional[List[int]] = []
     channels: Optional[List[str]] = []
+    media_ids: Optional[List[int]] = []
 
 class PostInDB(PostBase):
     id: int
     user_id: int
     status: PostStatus
     created_at: datetime
+    media: List[MediaAssetInDB] = []
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class PostDeliveryInDB(BaseModel):
+    account_id: Optional[int] = Field(None, validation_alias="social_account_id")
+    channel: str
+    account_name: Optional[str] = None
+    status: DeliveryStatus
+    provider_post_id: Optional[str] = None
+    attempts: int
+    last_error: Optional[str] = None
+    delivered_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class PostCreated(PostInDB):
+    deliveries: List[PostDeliveryInDB] = []
+
+class PostSearchResult(PostInDB):
+    published_at: Optional[datetime] = None
+    channels: List[str] = []
+    rank: Optional[float] = None
+
+class PostSearchPage(BaseModel):
+    items: List[PostSearchResult]
+    # Pass back as `before` to get the next page; None on the last page
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class PreflightIssue(BaseModel):
+    code: str
+    message: str
+    # "error" blocks publishing; "warning" does not
+    severity: str
+
+class PreflightItem(BaseModel):
+    content: str
+    # Target accounts; a channel listed on its own means the user's first account on it
+    account_ids: Optional[List[int]] = []
+    channels: List[str] = []
+    media_ids: Optional[List[int]] = []
+
+class PreflightRequest(BaseModel):
+    items: List[PreflightItem] = Field(..., min_length=1, max_length=100)
+
+class ChannelPreflight(BaseModel):
+    # None when the requested account does not exist
+    channel: Optional[str] = None
+    account_id: Optional[int] = None
+    account_name: Optional[str] = None
+    ok: bool
+    # Length as the provider counts it (X: weighted, URLs as 23), and its limit
+    length: int
+    limit: int
+    issues: List[PreflightIssue] = []
+
+class PreflightResult(BaseModel):
+    index: int
+    ok: bool
+    issues: List[PreflightIssue] = []
+    channels: List[ChannelPreflight] = []
+
+class PreflightResponse(BaseModel):
+    results: List[PreflightResult]
@@ -0,0 +1,39 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
+
+class WebhookEndpointCreate(BaseModel):
+    url: str
+    # Defaults to every event type
+    event_types: Optional[List[str]] = None
+    max_concurrency: Optional[int] = Field(None, ge=1, le=10)
+
+class WebhookEndpointInDB(BaseModel):
+    id: int
+    url: str
+    event_types: Optional[List[str]] = None
+    max_concurrency: int
+    is_active: bool
+    failure_count: int
+    next_attempt_at: Optional[datetime] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class WebhookEndpointCreated(WebhookEndpointInDB):
+    # Only returned once, when the endpoint is created
+    secret: str
+
+class WebhookDeliveryInDB(BaseModel):
+    id: int
+    event_id: int
+    status: str
+    attempts: int
+    next_attempt_at: datetime
+    last_status_code: Optional[int] = None
+    last_error: Optional[str] = None
+    delivered_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
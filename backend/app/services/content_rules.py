@@ -0,0 +1,217 @@
+"""
+Per-provider content validation and readiness checks, run before anything is enqueued.
+
+`preflight(db, user_id, items)` checks a batch of prospective posts against the rules of each
+target account's channel. Every issue has a `severity`:
+- "error": the provider would reject the post, or the task could not run (for example no
+  connected account, or an expired token that cannot be refreshed). Posts with errors are not
+  enqueued.
+- "warning": the post will be published, but something is worth knowing.
+
+The X count follows twitter-text (v3 config). Code points in the Latin, general punctuation and
+similar ranges weigh 1. Everything else weighs 2, CJK and emoji included. Each URL counts as 23,
+whatever its length, because X wraps it in t.co. Emoji sequences joined with ZWJ or modified by
+skin tones count once. Counting is in code points after NFC normalisation, so it matches
+what X measures and not `len()` of the raw string.
+"""
+import re
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.media import MediaAsset
+from app.models.social_account import SocialAccount
+
+X_MAX_WEIGHTED_LENGTH = 280
+X_URL_LENGTH = 23
+# (first, last) code point ranges weighing 1; see twitter-text's v3 configuration
+X_LIGHT_RANGES = ((0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037))
+X_MAX_IMAGES = 4
+
+LINKEDIN_MAX_LENGTH = 3000
+LINKEDIN_MAX_IMAGES = 9
+
+# Tokens providers turn into links: explicit URLs, and bare domains with a common TLD
+URL_PATTERN = re.compile(
+    r"(?:https?://[^\s<>\"]+|\b(?:[a-z0-9-]+\.)+(?:com|net|org|io|co|dev|app|ai|me|info|biz|edu|gov|ly|tv|uk|de|fr)\b(?:/[^\s<>\"]*)?)",
+    re.IGNORECASE,
+)
+# Trailing punctuation is not part of a link
+URL_TRAILING = ".,;:!?)]}'\""
+
+ZWJ = 0x200D
+EMOJI_MODIFIERS = set(range(0xFE00, 0xFE10)) | set(range(0x1F3FB, 0x1F400)) | set(range(0xE0020, 0xE0080))
+
+# Tokens expiring this soon are treated as expired, as the publish tasks do
+TOKEN_EXPIRY_MARGIN = timedelta(minutes=5)
+
+SUPPORTED_CHANNELS = ("twitter", "linkedin")
+
+
+def _issue(code: str, message: str, severity: str = "error") -> dict:
+    return {"code": code, "message": message, "severity": severity}
+
+
+def _code_point_weight(code_point: int) -> int:
+    return 1 if any(first <= code_point <= last for first, last in X_LIGHT_RANGES) else 2
+
+
+def x_weighted_length(text: str) -> int:
+    """
+    Length of `text` as X counts it against the 280 limit.
+    """
+    text = unicodedata.normalize("NFC", text)
+    length = 0
+    position = 0
+    for match in URL_PATTERN.finditer(text):
+        url = match.group(0).rstrip(URL_TRAILING)
+        length += _weigh(text[position:match.start()]) + X_URL_LENGTH
+        position = match.start() + len(url)
+    return length + _weigh(text[position:])
+
+
+def _weigh(text: str) -> int:
+    length = 0
+    joined = False
+    for char in text:
+        code_point = ord(char)
+        if code_point == ZWJ:
+            joined = True
+            continue
+        if code_point in EMOJI_MODIFIERS:
+            continue
+        if joined:
+            # Second half of a ZWJ emoji sequence: already counted with the first
+            joined = False
+            continue
+        length += _code_point_weight(code_point)
+    return length
+
+
+def content_issues(channel: str, content: str, media: List[MediaAsset]) -> Tuple[int, int, List[dict]]:
+    """
+    Returns (length, limit, issues) for `content` with `media` on `channel`.
+    """
+    issues = []
+    images = [asset for asset in media if not asset.is_video]
+    videos = [asset for asset in media if asset.is_video]
+
+    if channel == "twitter":
+        length, limit = x_weighted_length(content), X_MAX_WEIGHTED_LENGTH
+        if not content.strip() and not media:
+            issues.append(_issue("empty", "A post needs text or media."))
+        if length > limit:
+            issues.append(_issue("too_long", f"X allows {limit} characters; this post counts as {length}."))
+        if videos and (images or len(videos) > 1):
+            issues.append(_issue("media_mix", "X allows either one video or up to four images."))
+        elif len(images) > X_MAX_IMAGES:
+            issues.append(_issue("too_many_media", f"X allows at most {X_MAX_IMAGES} images per post."))
+    else:
+        length, limit = len(content), LINKEDIN_MAX_LENGTH
+        if not content.strip():
+            issues.append(_issue("empty", "LinkedIn posts need text."))
+        if length > limit:
+            issues.append(_issue("too_long", f"LinkedIn allows {limit} characters; this post has {length}."))
+        if videos and (images or len(videos) > 1):
+            issues.append(_issue("media_mix", "LinkedIn allows either one video or up to nine images."))
+        elif len(images) > LINKEDIN_MAX_IMAGES:
+            issues.append(_issue("too_many_media", f"LinkedIn allows at most {LINKEDIN_MAX_IMAGES} images per post."))
+    return length, limit, issues
+
+
+def account_issues(channel: str, account: Optional[SocialAccount]) -> List[dict]:
+    name = "X" if channel == "twitter" else "LinkedIn"
+    if not account:
+        return [_issue("not_connected", f"No {name} account is connected.")]
+    if not account.expires_at or account.expires_at > datetime.utcnow() + TOKEN_EXPIRY_MARGIN:
+        return []
+    if channel == "twitter" and account.refresh_token:
+        # The publish task refreshes it first; only a rejected refresh token would fail
+        return [_issue("token_refresh", "The X token has expired and will be refreshed before posting.", "warning")]
+    return [_issue("token_expired", f"The {name} connection has expired. Reconnect the account to post.")]
+
+
+def preflight(db: Session, user_id: int, items: List[dict]) -> List[dict]:
+    """
+    Checks each item ({"content", "account_ids", "channels", "media_ids"}) for each of its target
+    accounts, loading the user's accounts and every referenced media asset once for the whole
+    batch. A channel named without an account id targets the user's first account on it.
+    """
+    accounts: Dict[int, SocialAccount] = {
+        account.id: account
+        for account in db.query(SocialAccount).filter(SocialAccount.user_id == user_id).order_by(SocialAccount.id)
+    }
+    default_accounts: Dict[str, SocialAccount] = {}
+    for account in accounts.values():
+        if account.parent_id is None:
+            default_accounts.setdefault(account.provider, account)
+    media_ids = {media_id for item in items for media_id in item.get("media_ids") or []}
+    media: Dict[int, MediaAsset] = {}
+    if media_ids:
+        media = {
+            asset.id: asset
+            for asset in db.query(MediaAsset).filter(MediaAsset.id.in_(media_ids), MediaAsset.user_id == user_id)
+        }
+
+    results = []
+    for index, item in enumerate(items):
+        item_issues = []
+        item_media = []
+        for media_id in dict.fromkeys(item.get("media_ids") or []):
+            if media_id in media:
+                item_media.append(media[media_id])
+            else:
+                item_issues.append(_issue("media_not_found", f"Media attachment {media_id} was not found."))
+
+        # (channel, account or None, requested account id)
+        targets = []
+        for account_id in dict.fromkeys(item.get("account_ids") or []):
+            account = accounts.get(account_id)
+            targets.append((account.provider if account else None, account, account_id))
+        for channel in dict.fromkeys(item.get("channels") or []):
+            account = default_accounts.get(channel)
+            if not account or account.id not in {target[2] for target in targets}:
+                targets.append((channel, account, account.id if account else None))
+
+        channels = []
+        content_checks: Dict[str, Tuple[int, int, List[dict]]] = {}
+        for channel, account, account_id in targets:
+            entry = {"channel": channel, "account_id": account_id,
+                     "account_name": account.label if account else None, "length": 0, "limit": 0}
+            if channel is None:
+                issues = [_issue("account_not_found", f"Account {account_id} is not connected.")]
+            elif channel not in SUPPORTED_CHANNELS:
+                issues = [_issue("unsupported_channel", f"Posting to {channel} is not supported.")]
+            else:
+                if channel not in content_checks:
+                    content_checks[channel] = content_issues(channel, item["content"], item_media)
+                entry["length"], entry["limit"], content = content_checks[channel]
+                issues = content + account_issues(channel, account)
+            entry["ok"] = not any(issue["severity"] == "error" for issue in issues)
+            entry["issues"] = issues
+            channels.append(entry)
+        if not targets:
+            item_issues.append(_issue("no_targets", "Choose at least one account to post to."))
+        results.append({
+            "index": index,
+            "ok": not item_issues and all(channel["ok"] for channel in channels),
+            "issues": item_issues,
+            "channels": channels,
+        })
+    return results
+
+
+def first_error(result: dict) -> Optional[str]:
+    """
+    A one-line summary of what blocks a preflight result, for error responses.
+    """
+    for issue in result["issues"]:
+        if issue["severity"] == "error":
+            return issue["message"]
+    for channel in result["channels"]:
+        for issue in channel["issues"]:
+            if issue["severity"] == "error":
+                return issue["message"]
+    return None
@@ -0,0 +1,240 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Iterator, NamedTuple, Optional
+
+from app.core.config import settings
+from app.models.media import MediaAsset
+from app.services.storage import LocalStorage, get_storage
+
+# Derived variants per consumer. Each spec is part of the cache key, so changing a
+# spec produces new variants instead of serving stale ones.
+VARIANT_SPECS = {
+    "twitter": {"max_width": 4096, "max_height": 4096, "format": "JPEG", "quality": 85, "max_bytes": 5 * 1024 * 1024},
+    "linkedin": {"max_width": 2048, "max_height": 2048, "format": "JPEG", "quality": 85, "max_bytes": 5 * 1024 * 1024},
+    "thumbnail": {"max_width": 320, "max_height": 320, "format": "WEBP", "quality": 75},
+}
+
+FORMAT_CONTENT_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+# Animated GIFs would lose their frames, so they are passed through untouched
+RESIZABLE_CONTENT_TYPES = {"image/jpeg", "image/png", "image/webp"}
+
+# How often a process re-measures the cache directory, to account for files other
+# processes wrote or evicted since
+CACHE_RESCAN_SECONDS = 300
+
+
+class VariantNotReadyError(Exception):
+    """
+    A publish task needs a variant that is still being rendered on the `media` queue.
+    """
+
+
+class Variant(NamedTuple):
+    key: str
+    path: str
+    size: int
+    content_type: str
+
+
+class UploadSource(NamedTuple):
+    """
+    The bytes a publish task streams to a provider: a cached variant or the original.
+    """
+    size: int
+    content_type: str
+    iter_range: Callable[..., Iterator[bytes]]
+    original: bool
+
+
+def variant_key(source_sha256: str, spec: dict) -> str:
+    params = json.dumps(spec, sort_keys=True)
+    return hashlib.sha256(f"{source_sha256}:{params}".encode("utf-8")).hexdigest()
+
+
+class VariantCache:
+    """
+    On-disk cache of derived files with least-recently-used eviction by total size.
+    Reads refresh a file's mtime, and eviction removes the oldest files first.
+
+    The total size is tracked as files are written, so a write only walks the directory when
+    the cache is over its limit, or when the last measurement is older than CACHE_RESCAN_SECONDS.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.files = LocalStorage(root)
+        self.total_bytes: Optional[int] = None
+        self.scanned_at = 0.0
+
+    def relative_key(self, key: str) -> str:
+        return f"{key[:2]}/{key}"
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, self.relative_key(key))
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, data: bytes) -> str:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = 0
+        with tempfile.NamedTemporaryFile(delete=False, dir=os.path.dirname(path)) as tmp:
+            tmp.write(data)
+        os.replace(tmp.name, path)
+
+        if self.total_bytes is None or time.monotonic() - self.scanned_at > CACHE_RESCAN_SECONDS:
+            self.evict()
+        else:
+            self.total_bytes += len(data) - replaced
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+        return path
+
+    def _scan(self):
+        entries = []
+        for directory, _, filenames in os.walk(self.root):
+            if os.path.basename(directory) == ".staging":
+                continue
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """
+        Measures the cache and, if it is over its limit, removes the least recently used files.
+        """
+        entries = self._scan()
+        total = sum(size for _, size, _ in entries)
+        self.scanned_at = time.monotonic()
+        self.total_bytes = total
+        if total <= self.max_bytes:
+            return
+        # Evict down to 90% so a full cache does not rescan on every write
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        self.total_bytes = total
+
+
+_cache: Optional[VariantCache] = None
+
+
+def get_variant_cache() -> VariantCache:
+    global _cache
+    if _cache is None:
+        _cache = VariantCache(settings.MEDIA_VARIANT_CACHE_DIR, settings.MEDIA_VARIANT_CACHE_MAX_BYTES)
+    return _cache
+
+
+def render_variant(source: bytes, spec: dict) -> bytes:
+    """
+    Resizes an image to fit the spec and re-encodes it. If the result is over `max_bytes`,
+    the quality is lowered step by step.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(source)) as original:
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((spec["max_width"], spec["max_height"]), Image.LANCZOS)
+        if spec["format"] == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        quality = spec["quality"]
+        while True:
+            out = io.BytesIO()
+            image.save(out, format=spec["format"], quality=quality, optimize=True)
+            if "max_bytes" not in spec or out.tell() <= spec["max_bytes"] or quality <= 40:
+                return out.getvalue()
+            quality -= 10
+
+
+def cached_variant(asset: MediaAsset, name: str) -> Optional[Variant]:
+    """
+    Returns the `name` variant of `asset` if it is in the cache, without rendering it.
+    """
+    spec = VARIANT_SPECS[name]
+    key = variant_key(asset.sha256, spec)
+    path = get_variant_cache().get(key)
+    if path is None:
+        return None
+    return Variant(key=key, path=path, size=os.path.getsize(path), content_type=FORMAT_CONTENT_TYPES[spec["format"]])
+
+
+def ensure_variant(asset: MediaAsset, name: str) -> Optional[Variant]:
+    """
+    Returns the cached `name` variant of `asset`, rendering it on a cache miss.
+    Returns None for media that is not resized (videos, GIFs).
+    """
+    if asset.content_type not in RESIZABLE_CONTENT_TYPES:
+        return None
+    spec = VARIANT_SPECS[name]
+    key = variant_key(asset.sha256, spec)
+    cache = get_variant_cache()
+
+    path = cache.get(key)
+    if path is None:
+        source = get_storage().read_range(asset.storage_key, 0, asset.size_bytes)
+        path = cache.put(key, render_variant(source, spec))
+    return Variant(key=key, path=path, size=os.path.getsize(path), content_type=FORMAT_CONTENT_TYPES[spec["format"]])
+
+
+def upload_source(asset: MediaAsset, provider: str, original: bool = False) -> UploadSource:
+    """
+    Picks what to send a provider: its cached variant for images, the original otherwise.
+
+    Publish tasks run on gevent workers, so a missing variant is never rendered here. It is
+    queued on the `media` queue instead. Meanwhile an original within the provider's size
+    limit is sent as is; a larger one raises VariantNotReadyError so the task retries later.
+    `original` forces the original, for resuming an upload that was started with it.
+    """
+    variant = None
+    if asset.content_type in RESIZABLE_CONTENT_TYPES and not original:
+        variant = cached_variant(asset, provider)
+        if variant is None:
+            from app.worker.media_tasks import generate_media_variants
+
+            generate_media_variants.delay(asset.id)
+            max_bytes = VARIANT_SPECS[provider].get("max_bytes")
+            if max_bytes is not None and asset.size_bytes > max_bytes:
+                raise VariantNotReadyError(f"The {provider} variant of media asset {asset.id} is still being rendered.")
+    if variant is None:
+        storage = get_storage()
+        return UploadSource(
+            size=asset.size_bytes,
+            content_type=asset.content_type,
+            iter_range=lambda start=0, end=None: storage.iter_range(asset.storage_key, start, end),
+            original=True,
+        )
+    cache = get_variant_cache()
+    return UploadSource(
+        size=variant.size,
+        content_type=variant.content_type,
+        iter_range=lambda start=0, end=None: cache.files.iter_range(cache.relative_key(variant.key), start, end),
+        original=False,
+    )
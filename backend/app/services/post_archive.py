@@ -0,0 +1,259 @@
+"""
+Retention for the monthly partitions of posts and post_deliveries (see app/db/partitions.py).
+
+Archiving a month (`archive_month`), in one transaction:
+1. Export the month's finished posts to gzipped CSV under POST_ARCHIVE_DIR/<YYYY-MM>/.
+   Exported with them: their deliveries, media links and engagement rows.
+2. Detach the month's partitions, and delete the exported rows from the unpartitioned tables.
+3. Re-insert the posts that are still drafts, scheduled or retrying, with their deliveries.
+   Their month is gone, so they land in the DEFAULT partitions.
+4. Drop the detached tables.
+
+The files are written to `<YYYY-MM>.partial/` and renamed once the transaction commits, so a
+directory with a manifest.json is always a complete archive.
+
+Restoring a month (`restore_month`) recreates its partitions and moves back the posts kept in
+the DEFAULT partitions. It then loads the files. A restored month is marked, and the retention
+job leaves it attached; `archive` archives it again.
+
+Command line (in the backend or worker container):
+    python -m app.services.post_archive list
+    python -m app.services.post_archive ensure [YYYY-MM]
+    python -m app.services.post_archive archive 2024-01
+    python -m app.services.post_archive restore 2024-01
+"""
+import gzip
+import json
+import os
+import shutil
+import sys
+from datetime import date, datetime, timezone
+from typing import List, Optional, Set
+
+from sqlalchemy import Table, text
+
+from app.core.config import settings
+from app.db.partitions import add_months, attached_partitions, create_partitions, month_bounds, month_start, partition_name
+from app.db.session import engine
+from app.models.engagement import EngagementRollup, EngagementSample
+from app.models.media import post_media
+from app.models.post import Post, PostStatus
+from app.models.post_delivery import PostDelivery
+
+# Posts that may still change are never archived
+HELD_STATUSES = tuple(status.name for status in (PostStatus.DRAFT, PostStatus.SCHEDULED, PostStatus.RETRYING))
+# pg_advisory_xact_lock key: one archive or restore at a time
+ARCHIVE_LOCK_KEY = 4402
+RESTORED = "restored"
+MANIFEST = "manifest.json"
+
+
+def _columns(table: Table) -> List[str]:
+    # Generated columns (posts.search_vector) cannot be written; Postgres recomputes them
+    return [column.name for column in table.columns if column.computed is None]
+
+
+def _parse_month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def _begin(cursor):
+    cursor.execute("SELECT pg_advisory_xact_lock(%s)", (ARCHIVE_LOCK_KEY,))
+    cursor.execute("SET LOCAL lock_timeout = %s", (settings.POST_ARCHIVE_LOCK_TIMEOUT,))
+
+
+def _is_attached(cursor, name: str) -> bool:
+    cursor.execute("SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%s)", (name,))
+    return cursor.fetchone() is not None
+
+
+def ensure_partitions(first_month: Optional[date] = None) -> List[str]:
+    """
+    Creates this month's partitions and POST_PARTITION_MONTHS_AHEAD months of future ones, and
+    with `first_month` also every month from it onwards (for loading existing history).
+    """
+    this_month = month_start(datetime.now(timezone.utc).date())
+    first_month = min(first_month or this_month, this_month)
+    months_ahead = (this_month.year - first_month.year) * 12 + this_month.month - first_month.month + settings.POST_PARTITION_MONTHS_AHEAD
+    created = []
+    with engine.begin() as connection:
+        connection.execute(text("SELECT set_config('lock_timeout', :timeout, true)"), {"timeout": settings.POST_ARCHIVE_LOCK_TIMEOUT})
+        for table in ("posts", "post_deliveries"):
+            created += create_partitions(connection, table, first_month, months_ahead)
+    return created
+
+
+def restored_partitions() -> Set[str]:
+    with engine.connect() as connection:
+        rows = connection.execute(text(
+            "SELECT relname FROM pg_class WHERE relname LIKE 'posts\\_%' AND obj_description(oid, 'pg_class') = :marker"
+        ), {"marker": RESTORED}).fetchall()
+    return {name for (name,) in rows}
+
+
+def archive_month(month: date, directory: Optional[str] = None) -> dict:
+    """
+    Archives and drops one month of posts. Returns the archive's manifest.
+    """
+    directory = directory or settings.POST_ARCHIVE_DIR
+    label = f"{month:%Y-%m}"
+    target = os.path.join(directory, label)
+    if os.path.exists(os.path.join(target, MANIFEST)):
+        raise ValueError(f"{label} is already archived in {target}.")
+    staging = f"{target}.partial"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    posts, deliveries = partition_name("posts", month), partition_name("post_deliveries", month)
+    post_columns = ", ".join(_columns(Post.__table__))
+    delivery_columns = ", ".join(_columns(PostDelivery.__table__))
+    exports = [
+        ("posts", _columns(Post.__table__),
+         f"SELECT {post_columns} FROM {posts} WHERE id IN (SELECT id FROM archived_posts)"),
+        ("post_deliveries", _columns(PostDelivery.__table__),
+         f"SELECT {delivery_columns} FROM {deliveries} WHERE id IN (SELECT id FROM archived_deliveries)"),
+        ("post_media", _columns(post_media),
+         "SELECT {columns} FROM post_media WHERE post_id IN (SELECT id FROM archived_posts)"),
+        ("engagement_samples", _columns(EngagementSample.__table__),
+         "SELECT {columns} FROM engagement_samples WHERE delivery_id IN (SELECT id FROM archived_deliveries)"),
+        ("engagement_rollups", _columns(EngagementRollup.__table__),
+         "SELECT {columns} FROM engagement_rollups WHERE delivery_id IN (SELECT id FROM archived_deliveries)"),
+    ]
+
+    manifest = {"month": label, "archived_at": datetime.now(timezone.utc).isoformat(), "tables": {}}
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        _begin(cursor)
+        if not (_is_attached(cursor, posts) and _is_attached(cursor, deliveries)):
+            raise ValueError(f"There are no attached partitions for {label}.")
+        # Reads go on; writes to this month wait until the archive commits
+        cursor.execute(f"LOCK TABLE {posts}, {deliveries} IN SHARE MODE")
+        cursor.execute(f"CREATE TEMP TABLE archived_posts ON COMMIT DROP AS SELECT id FROM {posts} WHERE status NOT IN %s", (HELD_STATUSES,))
+        cursor.execute(f"CREATE TEMP TABLE archived_deliveries ON COMMIT DROP AS SELECT id FROM {deliveries} WHERE post_id IN (SELECT id FROM archived_posts)")
+
+        for name, columns, query in exports:
+            filename = f"{name}.csv.gz"
+            with gzip.open(os.path.join(staging, filename), "wb") as f:
+                cursor.copy_expert(f"COPY ({query.format(columns=', '.join(columns))}) TO STDOUT WITH (FORMAT csv, HEADER)", f)
+            manifest["tables"][name] = {"file": filename, "columns": columns, "rows": cursor.rowcount}
+
+        cursor.execute(f"ALTER TABLE post_deliveries DETACH PARTITION {deliveries}")
+        # The detached table keeps its foreign key to posts, which would block detaching the posts partition
+        cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'f'", (deliveries,))
+        for (constraint,) in cursor.fetchall():
+            cursor.execute(f'ALTER TABLE {deliveries} DROP CONSTRAINT "{constraint}"')
+        cursor.execute(f"ALTER TABLE posts DETACH PARTITION {posts}")
+
+        cursor.execute(f"INSERT INTO posts ({post_columns}) SELECT {post_columns} FROM {posts} WHERE id NOT IN (SELECT id FROM archived_posts)")
+        manifest["kept_posts"] = cursor.rowcount
+        cursor.execute(f"INSERT INTO post_deliveries ({delivery_columns}) SELECT {delivery_columns} FROM {deliveries} WHERE id NOT IN (SELECT id FROM archived_deliveries)")
+        cursor.execute("DELETE FROM post_media WHERE post_id IN (SELECT id FROM archived_posts)")
+        cursor.execute("DELETE FROM engagement_samples WHERE delivery_id IN (SELECT id FROM archived_deliveries)")
+        cursor.execute("DELETE FROM engagement_rollups WHERE delivery_id IN (SELECT id FROM archived_deliveries)")
+        cursor.execute(f"DROP TABLE {deliveries}, {posts}")
+
+        with open(os.path.join(staging, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    finally:
+        connection.close()
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+    return manifest
+
+
+def restore_month(month: date, directory: Optional[str] = None) -> dict:
+    """
+    Reattaches an archived month and loads its files back. Returns the archive's manifest.
+    """
+    directory = directory or settings.POST_ARCHIVE_DIR
+    label = f"{month:%Y-%m}"
+    source = os.path.join(directory, label)
+    try:
+        with open(os.path.join(source, MANIFEST)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise ValueError(f"No archive for {label} in {directory}.")
+
+    posts, deliveries = partition_name("posts", month), partition_name("post_deliveries", month)
+    post_columns = ", ".join(_columns(Post.__table__))
+    delivery_columns = ", ".join(_columns(PostDelivery.__table__))
+    start, end = month_bounds(month)
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        _begin(cursor)
+        if _is_attached(cursor, posts):
+            raise ValueError(f"{label} is already attached.")
+
+        # Posts kept back at archival wait in the DEFAULT partitions, which may not overlap a new partition
+        cursor.execute(f"CREATE TEMP TABLE kept_posts ON COMMIT DROP AS SELECT {post_columns} FROM posts_default WHERE created_at >= %s AND created_at < %s", (start, end))
+        cursor.execute(f"CREATE TEMP TABLE kept_deliveries ON COMMIT DROP AS SELECT {delivery_columns} FROM post_deliveries_default WHERE post_created_at >= %s AND post_created_at < %s", (start, end))
+        cursor.execute("DELETE FROM post_deliveries_default WHERE post_created_at >= %s AND post_created_at < %s", (start, end))
+        cursor.execute("DELETE FROM posts_default WHERE created_at >= %s AND created_at < %s", (start, end))
+
+        cursor.execute(f"CREATE TABLE {posts} PARTITION OF posts FOR VALUES FROM (%s) TO (%s)", (start, end))
+        cursor.execute(f"CREATE TABLE {deliveries} PARTITION OF post_deliveries FOR VALUES FROM (%s) TO (%s)", (start, end))
+        cursor.execute(f"INSERT INTO posts ({post_columns}) SELECT {post_columns} FROM kept_posts")
+        cursor.execute(f"INSERT INTO post_deliveries ({delivery_columns}) SELECT {delivery_columns} FROM kept_deliveries")
+
+        # In export order: posts before the deliveries that reference them
+        for name, table in manifest["tables"].items():
+            with gzip.open(os.path.join(source, table["file"]), "rb") as f:
+                cursor.copy_expert(f"COPY {name} ({', '.join(table['columns'])}) FROM STDIN WITH (FORMAT csv, HEADER)", f)
+        cursor.execute(f"COMMENT ON TABLE {posts} IS %s", (RESTORED,))
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    return manifest
+
+
+def archive_expired(today: Optional[date] = None) -> List[date]:
+    """
+    Archives every month older than POST_RETENTION_MONTHS, except restored ones.
+    """
+    if settings.POST_RETENTION_MONTHS <= 0:
+        return []
+    cutoff = add_months(month_start(today or datetime.now(timezone.utc).date()), -settings.POST_RETENTION_MONTHS)
+    with engine.connect() as connection:
+        partitions = attached_partitions(connection, "posts")
+    restored = restored_partitions()
+    archived = []
+    for name, month in partitions:
+        if month < cutoff and name not in restored:
+            archive_month(month)
+            archived.append(month)
+    return archived
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    if command == "list":
+        with engine.connect() as connection:
+            attached = attached_partitions(connection, "posts")
+        restored = restored_partitions()
+        for name, month in attached:
+            print(f"{month:%Y-%m}  attached{'  (restored)' if name in restored else ''}")
+        if os.path.isdir(settings.POST_ARCHIVE_DIR):
+            for label in sorted(os.listdir(settings.POST_ARCHIVE_DIR)):
+                if os.path.exists(os.path.join(settings.POST_ARCHIVE_DIR, label, MANIFEST)):
+                    print(f"{label}  archived")
+    elif command == "ensure":
+        first_month = _parse_month(sys.argv[2]) if len(sys.argv) > 2 else None
+        print(f"[ARCHIVE] Created partitions: {', '.join(ensure_partitions(first_month)) or 'none'}.")
+    elif command in ("archive", "restore") and len(sys.argv) == 3:
+        month = _parse_month(sys.argv[2])
+        manifest = archive_month(month) if command == "archive" else restore_month(month)
+        rows = ", ".join(f"{name}: {table['rows']}" for name, table in manifest["tables"].items())
+        print(f"[ARCHIVE] {command.capitalize()}d {manifest['month']} ({rows}).")
+    else:
+        sys.exit("Usage: python -m app.services.post_archive list | ensure [YYYY-MM] | archive YYYY-MM | restore YYYY-MM")
@@ -0,0 +1,46 @@
+"""
+Per-user read models served through the Redis cache (see app/core/cache.py).
+
+Every write path that changes what a read model returns must call its `invalidate(user_id)`
+after committing.
+"""
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.cache import read_model
+from app.models.post import Post, PostStatus
+from app.models.social_account import SocialAccount
+from app.schemas.post import PostInDB
+
+
+@read_model("connected_accounts_v2")
+def connected_accounts(db: Session, user_id: int):
+    # Renamed with the change of shape, so entries cached before it are not served
+    accounts = (
+        db.query(SocialAccount)
+        .filter(SocialAccount.user_id == user_id)
+        .order_by(SocialAccount.provider, SocialAccount.parent_id.isnot(None), SocialAccount.id)
+        .all()
+    )
+    return [
+        {
+            "id": account.id,
+            "provider": account.provider,
+            "provider_user_id": account.provider_user_id,
+            "display_name": account.label,
+            "account_type": account.account_type,
+            "parent_id": account.parent_id,
+        }
+        for account in accounts
+    ]
+
+
+@read_model("draft_posts")
+def draft_posts(db: Session, user_id: int):
+    drafts = (
+        db.query(Post)
+        .options(selectinload(Post.media))
+        .filter(Post.user_id == user_id, Post.status == PostStatus.DRAFT)
+        .order_by(Post.created_at.desc())
+        .all()
+    )
+    return [PostInDB.model_validate(post).model_dump(mode="json") for post in drafts]
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from app.core.config import settings
+
+
+def content_key(sha256: str) -> str:
+    """
+    Storage key for a blob: its SHA-256, fanned out over two directory levels.
+    """
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+class MediaStorage(ABC):
+    """
+    Content-addressed blob storage for media attachments. Blobs are written once under
+    the hash of their bytes, so uploading the same file twice stores it once.
+    """
+
+    def put_stream(self, source: BinaryIO, max_bytes: Optional[int] = None) -> Tuple[str, int]:
+        """
+        Copies `source` into storage chunk by chunk, hashing as it goes.
+        Returns (sha256, size). Raises ValueError if the stream exceeds `max_bytes`.
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(delete=False, dir=self._staging_dir()) as staging:
+            try:
+                while True:
+                    chunk = source.read(settings.MEDIA_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise ValueError(f"File is larger than the {max_bytes} byte limit.")
+                    hasher.update(chunk)
+                    staging.write(chunk)
+                staging.flush()
+                sha256 = hasher.hexdigest()
+                self._commit(staging.name, content_key(sha256))
+            finally:
+                if os.path.exists(staging.name):
+                    os.unlink(staging.name)
+        return sha256, size
+
+    @abstractmethod
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Yields the bytes of [start, end) in chunks, never holding more than one chunk in memory.
+        """
+
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        return b"".join(self.iter_range(key, start, end))
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """
+        Whether a blob is stored under `key`.
+        """
+
+    def _staging_dir(self) -> Optional[str]:
+        return None
+
+    @abstractmethod
+    def _commit(self, staged_path: str, key: str) -> None:
+        """
+        Moves a fully written staging file into place under `key`.
+        """
+
+
+class LocalStorage(MediaStorage):
+    """
+    Stores blobs under a local directory. Used in development and tests, and in production
+    when the backend and workers share a volume.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(os.path.join(root, ".staging"), exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def iter_range(self, key, start=0, end=None, chunk_size=None):
+        chunk_size = chunk_size or settings.MEDIA_CHUNK_BYTES
+        with open(self.path(key), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def _staging_dir(self):
+        return os.path.join(self.root, ".staging")
+
+    def _commit(self, staged_path, key):
+        target = self.path(key)
+        if os.path.exists(target):
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(staged_path, target)
+
+
+class S3Storage(MediaStorage):
+    """
+    Stores blobs in an S3-compatible bucket (AWS S3, MinIO, R2...). Requires boto3.
+    """
+
+    def __init__(self):
+        try:
+            import boto3
+        except ImportError as exc:
+            raise RuntimeError("MEDIA_STORAGE_BACKEND=s3 requires the boto3 package.") from exc
+        self.bucket = settings.S3_BUCKET
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region_name=settings.S3_REGION,
+            aws_access_key_id=settings.S3_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+        )
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError:
+            return False
+
+    def iter_range(self, key, start=0, end=None, chunk_size=None):
+        byte_range = f"bytes={start}-" if end is None else f"bytes={start}-{end - 1}"
+        body = self.client.get_object(Bucket=self.bucket, Key=key, Range=byte_range)["Body"]
+        yield from body.iter_chunks(chunk_size or settings.MEDIA_CHUNK_BYTES)
+
+    def _commit(self, staged_path, key):
+        if self.exists(key):
+            return
+        # upload_file switches to multipart uploads for large files on its own
+        self.client.upload_file(staged_path, self.bucket, key)
+
+
+_storage: Optional[MediaStorage] = None
+
+
+def get_storage() -> MediaStorage:
+    global _storage
+    if _storage is None:
+        if settings.MEDIA_STORAGE_BACKEND == "s3":
+            _storage = S3Storage()
+        else:
+            _storage = LocalStorage(settings.MEDIA_ROOT)
+    return _storage
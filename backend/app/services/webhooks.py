@@ -0,0 +1,90 @@
+"""
+Recording publish events for webhook delivery.
+
+Worker tasks call `record_event` before committing a status change. The event row and one
+pending delivery per subscribed endpoint are written in that same transaction (an outbox).
+Nothing is sent from the task itself: the webhook dispatcher (app/worker/webhook_dispatcher.py)
+delivers them, so a slow or broken receiver can never hold up publishing.
+"""
+import hashlib
+import hmac
+import ipaddress
+import secrets
+import socket
+from urllib.parse import urlparse
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.webhook import WebhookDelivery, WebhookEndpoint, WebhookEvent
+
+POST_PUBLISHED = "post.published"
+POST_RETRYING = "post.retrying"
+POST_FAILED = "post.failed"
+EVENT_TYPES = (POST_PUBLISHED, POST_RETRYING, POST_FAILED)
+
+
+def new_secret() -> str:
+    return f"whsec_{secrets.token_urlsafe(32)}"
+
+
+def sign(secret: str, timestamp: int, body: bytes) -> str:
+    """
+    Hex HMAC-SHA256 of "<timestamp>.<body>". Receivers recompute it to authenticate a request
+    and reject stale timestamps to stop replays.
+    """
+    return hmac.new(secret.encode("utf-8"), f"{timestamp}.".encode("utf-8") + body, hashlib.sha256).hexdigest()
+
+
+def is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address)
+    return not (
+        ip.is_private or ip.is_loopback or ip.is_link_local or ip.is_reserved
+        or ip.is_multicast or ip.is_unspecified
+    )
+
+
+def validate_endpoint_url(url: str):
+    """
+    Raises ValueError for URLs the dispatcher must not call: non-HTTPS, or hosts resolving to
+    loopback, private or link-local addresses (our own services), unless explicitly allowed.
+    A host can resolve differently later, so the dispatcher checks the address again each
+    time it connects.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("https", "http") or not parsed.hostname:
+        raise ValueError("Webhook URL must be an absolute http(s) URL.")
+    if settings.WEBHOOK_ALLOW_PRIVATE_TARGETS:
+        return
+    if parsed.scheme != "https":
+        raise ValueError("Webhook URL must use https.")
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(parsed.hostname, parsed.port or 443)}
+    except socket.gaierror:
+        raise ValueError(f"Cannot resolve {parsed.hostname}.")
+    if not all(is_public_address(address) for address in addresses):
+        raise ValueError("Webhook URL must point to a public address.")
+
+
+def record_event(db: Session, user_id: int, event_type: str, payload: dict):
+    """
+    Adds an event and its pending deliveries to the session; the caller commits. It runs in a
+    savepoint and only logs its own errors, so webhooks can never fail a publish task.
+    """
+    try:
+        with db.begin_nested():
+            endpoints = (
+                db.query(WebhookEndpoint.id, WebhookEndpoint.event_types)
+                .filter(WebhookEndpoint.user_id == user_id, WebhookEndpoint.is_active.is_(True))
+                .all()
+            )
+            subscribed = [endpoint_id for endpoint_id, types in endpoints if not types or event_type in types]
+            if not subscribed:
+                return
+            event = WebhookEvent(user_id=user_id, event_type=event_type, payload=payload)
+            db.add(event)
+            db.flush()
+            db.add_all([WebhookDelivery(endpoint_id=endpoint_id, event_id=event.id) for endpoint_id in subscribed])
+    except SQLAlchemyError as exc:
+        print(f"[WEBHOOKS] Could not record {event_type} for user {user_id}: {exc}")
@@ -1,9 +1,72 @@
 from celery import Celery
+from celery.signals import celeryd_init
 from app.core.config import settings
+from .routing import DEFAULT_QUEUE, TASK_ROUTES, build_task_queues
 
 celery_app = Celery(
     "worker",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
-    include=["app.worker.tasks"]
-)
\ No newline at end of file
+    include=["app.worker.tasks", "app.worker.media_tasks", "app.worker.metrics_tasks", "app.worker.feed_tasks", "app.worker.partition_tasks"]
+)
+
+celery_app.conf.update(
+    # Routing: one queue per provider and lane, so a slow provider only backs up its own queues.
+    task_queues=build_task_queues(),
+    task_default_queue=DEFAULT_QUEUE,
+    task_routes=TASK_ROUTES,
+    # Serialization: compact binary payloads, compressed on the wire.
+    task_serializer=settings.CELERY_TASK_SERIALIZER,
+    accept_content=["msgpack", "json"],
+    task_compression=settings.CELERY_TASK_COMPRESSION,
+    # Delivery: ack after the task finishes, and requeue it if the worker dies mid-task.
+    task_acks_late=settings.CELERY_TASK_ACKS_LATE,
+    task_reject_on_worker_lost=settings.CELERY_TASK_REJECT_ON_WORKER_LOST,
+    worker_prefetch_multiplier=settings.CELERY_WORKER_PREFETCH_MULTIPLIER,
+    # Publish tasks are fire-and-forget; nothing reads their return values.
+    task_ignore_result=settings.CELERY_TASK_IGNORE_RESULT,
+    broker_transport_options={
+        "visibility_timeout": settings.CELERY_VISIBILITY_TIMEOUT,
+        # Consume queues in the order given to `-Q`, so the now lane always goes first.
+        "queue_order_strategy": settings.CELERY_QUEUE_ORDER_STRATEGY,
+    },
+    # Periodic jobs, run by the `beat` service
+    beat_schedule={
+        "ingest-engagement-metrics": {
+            "task": "app.worker.metrics_tasks.schedule_engagement_ingestion",
+            "schedule": settings.METRICS_INGEST_INTERVAL_SECONDS,
+        },
+        "sync-inbound-feeds": {
+            "task": "app.worker.feed_tasks.schedule_feed_sync",
+            "schedule": settings.FEED_SCHEDULER_TICK_SECONDS,
+        },
+        "ensure-post-partitions": {
+            "task": "app.worker.partition_tasks.ensure_post_partitions",
+            "schedule": settings.POST_PARTITION_JOB_INTERVAL_SECONDS,
+        },
+        "archive-expired-post-partitions": {
+            "task": "app.worker.partition_tasks.archive_expired_post_partitions",
+            "schedule": settings.POST_PARTITION_JOB_INTERVAL_SECONDS,
+        },
+    },
+)
+
+
+@celeryd_init.connect
+def configure_green_worker(**kwargs):
+    """
+    When the worker runs with the gevent pool (`-P gevent`), Celery has already
+    monkey-patched sockets, so httpx cooperates with the event loop. psycopg2 is
+    a C extension and needs its own wait callback, otherwise every query would
+    block the whole process instead of just the calling greenlet.
+    """
+    try:
+        from gevent import monkey
+    except ImportError:
+        return
+    if not monkey.is_module_patched("socket"):
+        return
+
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+    print("[CELERY WORKER] gevent pool detected, psycopg2 patched for cooperative I/O.")
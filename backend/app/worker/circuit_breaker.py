@@ -0,0 +1,221 @@
+import random
+import threading
+import time
+from typing import Callable, Dict, Tuple
+
+import httpx
+import redis
+
+from app.core.config import settings
+from app.core.redis import redis_client
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker whose state lives in Redis, so every worker process
+    sees the same state.
+
+    - closed: calls go through. Outcomes are counted in fixed windows, and the current and
+      previous windows are evaluated together. Enough failures (5xx, timeouts) or slow
+      calls open the circuit.
+    - open: calls are held until `open_until`.
+    - half_open: once `open_until` has passed, a few probe calls go through. If they all
+      succeed, the circuit closes. A single failure reopens it. A task that takes a probe
+      slot and ends without calling the provider must give it back with release_probe().
+
+    Redis errors fail open: if the breaker cannot read its state, calls are allowed.
+    """
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.state_key = f"circuit:{provider}:state"
+        # The probe slot the current task holds; greenlet-local under the gevent pool
+        self._local = threading.local()
+
+    def _window_key(self, bucket: int) -> str:
+        return f"circuit:{self.provider}:window:{bucket}"
+
+    def _probe_key(self, open_until: str) -> str:
+        return f"circuit:{self.provider}:probes:{open_until}"
+
+    def _read_state(self) -> Tuple[str, float, str]:
+        data = redis_client.hgetall(self.state_key)
+        if data.get("state") != OPEN:
+            return CLOSED, 0.0, ""
+        open_until = data.get("open_until", "0")
+        if time.time() < float(open_until):
+            return OPEN, float(open_until), open_until
+        return HALF_OPEN, float(open_until), open_until
+
+    def allow_request(self) -> Tuple[bool, float]:
+        """
+        Returns (allowed, hold_seconds). When the call is not allowed, hold_seconds says
+        how long to hold the task. It includes a random share of the drain window, so held
+        work comes back gradually instead of all at once when the provider recovers.
+        """
+        self._local.probe_key = None
+        try:
+            state, open_until, raw_open_until = self._read_state()
+            if state == CLOSED:
+                return True, 0.0
+            drain = random.uniform(0, settings.CIRCUIT_DRAIN_SECONDS)
+            if state == OPEN:
+                return False, open_until - time.time() + drain
+
+            probe_key = self._probe_key(raw_open_until)
+            pipe = redis_client.pipeline()
+            pipe.hincrby(probe_key, "started", 1)
+            pipe.expire(probe_key, settings.CIRCUIT_OPEN_SECONDS * 10)
+            started, _ = pipe.execute()
+            if started <= settings.CIRCUIT_HALF_OPEN_PROBES:
+                self._local.probe_key = probe_key
+                return True, 0.0
+            # Over the limit: give the slot back, or released probes could never be reused
+            redis_client.hincrby(probe_key, "started", -1)
+            return False, drain
+        except redis.RedisError as exc:
+            print(f"[CELERY WORKER] Circuit breaker for {self.provider} unavailable ({exc}); allowing call.")
+            return True, 0.0
+
+    def release_probe(self):
+        """
+        Gives back the half-open probe slot taken by allow_request() if the task never
+        called the provider (post gone, already delivered, token expired, ...). Otherwise
+        the probe never reports and the circuit stays half-open. A no-op after call().
+        """
+        probe_key = getattr(self._local, "probe_key", None)
+        if probe_key is None:
+            return
+        self._local.probe_key = None
+        try:
+            redis_client.hincrby(probe_key, "started", -1)
+        except redis.RedisError as exc:
+            print(f"[CELERY WORKER] Could not release circuit probe for {self.provider}: {exc}")
+
+    def _open(self, reason: str):
+        open_until = time.time() + settings.CIRCUIT_OPEN_SECONDS
+        redis_client.hset(self.state_key, mapping={
+            "state": OPEN,
+            "open_until": f"{open_until:.3f}",
+            "opened_at": f"{time.time():.3f}",
+            "reason": reason,
+        })
+        print(f"[CELERY WORKER] Circuit for {self.provider} OPEN for {settings.CIRCUIT_OPEN_SECONDS}s: {reason}")
+
+    def _close(self):
+        redis_client.hset(self.state_key, mapping={"state": CLOSED, "closed_at": f"{time.time():.3f}"})
+        print(f"[CELERY WORKER] Circuit for {self.provider} CLOSED after successful probes.")
+
+    def _window_counts(self) -> Dict[str, int]:
+        bucket = int(time.time() // settings.CIRCUIT_WINDOW_SECONDS)
+        pipe = redis_client.pipeline()
+        pipe.hgetall(self._window_key(bucket))
+        pipe.hgetall(self._window_key(bucket - 1))
+        totals = {"calls": 0, "failures": 0, "slow": 0}
+        for window in pipe.execute():
+            for field in totals:
+                totals[field] += int(window.get(field, 0))
+        return totals
+
+    def record(self, success: bool, latency: float):
+        try:
+            slow = latency >= settings.CIRCUIT_SLOW_CALL_SECONDS
+            key = self._window_key(int(time.time() // settings.CIRCUIT_WINDOW_SECONDS))
+            pipe = redis_client.pipeline()
+            pipe.hincrby(key, "calls", 1)
+            if not success:
+                pipe.hincrby(key, "failures", 1)
+            if slow:
+                pipe.hincrby(key, "slow", 1)
+            pipe.expire(key, settings.CIRCUIT_WINDOW_SECONDS * 3)
+            pipe.execute()
+
+            state, _, raw_open_until = self._read_state()
+            if state == HALF_OPEN:
+                if not success:
+                    self._open("half-open probe failed")
+                    return
+                succeeded = redis_client.hincrby(self._probe_key(raw_open_until), "succeeded", 1)
+                if succeeded >= settings.CIRCUIT_HALF_OPEN_PROBES:
+                    self._close()
+                return
+
+            if state == CLOSED and (not success or slow):
+                counts = self._window_counts()
+                if counts["calls"] < settings.CIRCUIT_MIN_CALLS:
+                    return
+                if counts["failures"] / counts["calls"] >= settings.CIRCUIT_FAILURE_RATE:
+                    self._open(f"{counts['failures']}/{counts['calls']} calls failed")
+                elif counts["slow"] / counts["calls"] >= settings.CIRCUIT_SLOW_CALL_RATE:
+                    self._open(f"{counts['slow']}/{counts['calls']} calls slower than {settings.CIRCUIT_SLOW_CALL_SECONDS}s")
+        except redis.RedisError as exc:
+            print(f"[CELERY WORKER] Could not record circuit outcome for {self.provider}: {exc}")
+
+    def call(self, send: Callable[[], httpx.Response]) -> httpx.Response:
+        """
+        Runs a provider request and records its outcome. Only provider-side trouble
+        (transport errors, 5xx) counts as a failure. 4xx and 429 responses mean the
+        provider is up.
+        """
+        # The outcome recorded below is the probe's result
+        self._local.probe_key = None
+        started = time.monotonic()
+        try:
+            response = send()
+        except httpx.TransportError:
+            self.record(False, time.monotonic() - started)
+            raise
+        self.record(response.status_code < 500, time.monotonic() - started)
+        return response
+
+    def snapshot(self) -> dict:
+        try:
+            data = redis_client.hgetall(self.state_key)
+            state, open_until, _ = self._read_state()
+            counts = self._window_counts()
+        except redis.RedisError as exc:
+            print(f"[CELERY WORKER] Circuit breaker state for {self.provider} unavailable: {exc}")
+            return {
+                "provider": self.provider,
+                "state": "unknown",
+                "open_until": None,
+                "reason": f"Redis unavailable: {exc}",
+                "window_seconds": settings.CIRCUIT_WINDOW_SECONDS * 2,
+                "calls": 0, "failures": 0, "slow": 0,
+            }
+        return {
+            "provider": self.provider,
+            "state": state,
+            "open_until": open_until or None,
+            "reason": data.get("reason") if state != CLOSED else None,
+            "window_seconds": settings.CIRCUIT_WINDOW_SECONDS * 2,
+            **counts,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    if provider not in _breakers:
+        _breakers[provider] = CircuitBreaker(provider)
+    return _breakers[provider]
+
+
+def hold_task(task, countdown: float):
+    """
+    Puts a task back on its own queue to run after `countdown` seconds without using up
+    a retry, because the provider being down is not this task's failure.
+    """
+    queue = (task.request.delivery_info or {}).get("routing_key")
+    task.apply_async(
+        args=task.request.args,
+        kwargs=task.request.kwargs,
+        countdown=max(1.0, countdown),
+        retries=task.request.retries,
+        queue=queue,
+    )
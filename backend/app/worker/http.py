@@ -0,0 +1,25 @@
+import httpx
+from typing import Optional
+
+from app.core.config import settings
+
+_client: Optional[httpx.Client] = None
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Returns the process-wide HTTP client used by the publish tasks.
+
+    Sharing one client keeps TLS connections to the providers alive between tasks,
+    and its connection limit bounds how many provider calls are in flight at once.
+    """
+    global _client
+    if _client is None:
+        _client = httpx.Client(
+            timeout=httpx.Timeout(settings.WORKER_HTTP_TIMEOUT, pool=settings.WORKER_HTTP_POOL_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.WORKER_MAX_INFLIGHT_REQUESTS,
+                max_keepalive_connections=settings.WORKER_MAX_INFLIGHT_REQUESTS,
+            ),
+        )
+    return _client
@@ -0,0 +1,24 @@
+from .celery_app import celery_app
+from app.db.session import SessionLocal
+from app.models.media import MediaAsset
+from app.services.media_variants import VARIANT_SPECS, ensure_variant
+from sqlalchemy.orm import Session
+
+
+@celery_app.task
+def generate_media_variants(asset_id: int):
+    """
+    Celery task that pre-renders every variant of an uploaded image (provider sizes and the
+    thumbnail) into the variant cache. It is CPU-bound, so it runs on the `media` queue,
+    whose worker uses the prefork process pool rather than the gevent pool of the publish workers.
+    """
+    db: Session = SessionLocal()
+    try:
+        asset = db.query(MediaAsset).filter(MediaAsset.id == asset_id).first()
+        if not asset:
+            print(f"[CELERY WORKER] Media asset {asset_id} not found.")
+            return
+        rendered = [name for name in VARIANT_SPECS if ensure_variant(asset, name)]
+        print(f"[CELERY WORKER] Media asset {asset_id}: variants ready: {', '.join(rendered) or 'none'}.")
+    finally:
+        db.close()
@@ -0,0 +1,265 @@
+"""
+Streaming media uploads for the publish tasks.
+
+Attachments are read one chunk at a time (the provider's cached variant for images, the
+original otherwise) and sent with each provider's chunked upload protocol:
+
+- X: INIT, one APPEND per chunk, FINALIZE, then STATUS polling while a video is processed.
+- LinkedIn: registerUpload. Images and small videos are sent as a single streamed PUT.
+  Larger videos use the multipart mechanism, with one PUT per byte range LinkedIn hands back.
+
+Progress is stored on the asset's `MediaUpload` row after every chunk, so a retried task resumes
+an interrupted upload. An asset that is already READY for an account is never uploaded again.
+
+The session is committed before every provider call. With `expire_on_commit=False` the loaded
+rows stay usable, and the connection goes back to the pool while chunks are sent and while X
+processes a video, so concurrent media posts cannot use up the pool.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import httpx
+from sqlalchemy.orm import Session
+
+from .circuit_breaker import CircuitBreaker
+from .http import get_http_client
+from app.core.config import settings
+from app.models.media import MediaAsset, MediaUpload, MediaUploadState
+from app.models.social_account import SocialAccount
+from app.services.media_variants import upload_source
+
+X_MEDIA_UPLOAD_URL = "https://api.twitter.com/2/media/upload"
+LINKEDIN_ASSETS_URL = "https://api.linkedin.com/v2/assets"
+
+# LinkedIn's multipart mechanism is only offered for larger videos
+LINKEDIN_MULTIPART_MIN_BYTES = 200 * 1024 * 1024
+# How long to wait for a provider to finish processing a video before retrying the task
+MAX_PROCESSING_WAIT_SECONDS = 300
+
+
+class MediaProcessingError(Exception):
+    """
+    The provider accepted the upload but rejected the media itself.
+    """
+
+
+def get_upload(db: Session, asset: MediaAsset, account: SocialAccount) -> MediaUpload:
+    """
+    Loads (or creates) the upload row, then commits so no connection is held during the upload.
+    """
+    upload = db.query(MediaUpload).filter_by(media_asset_id=asset.id, social_account_id=account.id).first()
+    if not upload:
+        upload = MediaUpload(media_asset_id=asset.id, social_account_id=account.id, upload_state={})
+        db.add(upload)
+    db.commit()
+    return upload
+
+
+def _restart(upload: MediaUpload):
+    upload.state = MediaUploadState.UPLOADING
+    upload.provider_media_id = None
+    upload.upload_state = {}
+    upload.expires_at = None
+
+
+# --- X (Twitter) ---------------------------------------------------------------
+
+def _x_media_category(asset: MediaAsset) -> str:
+    if asset.is_video:
+        return "tweet_video"
+    if asset.content_type == "image/gif":
+        return "tweet_gif"
+    return "tweet_image"
+
+
+def ensure_twitter_media(db: Session, breaker: CircuitBreaker, account: SocialAccount, asset: MediaAsset) -> str:
+    """
+    Returns an X media_id for `asset`, uploading or resuming the upload as needed.
+    """
+    client = get_http_client()
+    headers = {"Authorization": f"Bearer {account.access_token}"}
+    upload = get_upload(db, asset, account)
+
+    if upload.expires_at and upload.expires_at < datetime.utcnow() + timedelta(minutes=5):
+        print(f"[CELERY WORKER] X media {upload.provider_media_id} for asset {asset.id} expired; uploading again.")
+        _restart(upload)
+    if upload.state == MediaUploadState.READY:
+        return upload.provider_media_id
+    if upload.state == MediaUploadState.FAILED:
+        _restart(upload)
+
+    # A resumed upload must send the same bytes it started with
+    source = upload_source(asset, "twitter", original=upload.upload_state.get("original", False))
+    if not upload.provider_media_id:
+        response = breaker.call(lambda: client.post(X_MEDIA_UPLOAD_URL, headers=headers, data={
+            "command": "INIT",
+            "total_bytes": source.size,
+            "media_type": source.content_type,
+            "media_category": _x_media_category(asset),
+        }))
+        response.raise_for_status()
+        data = response.json().get("data", response.json())
+        upload.provider_media_id = str(data.get("id") or data.get("media_id_string"))
+        upload.upload_state = {"next_segment": 0, "original": source.original}
+        expires_after = data.get("expires_after_secs")
+        upload.expires_at = datetime.utcnow() + timedelta(seconds=expires_after) if expires_after else None
+        db.commit()
+
+    if upload.state == MediaUploadState.UPLOADING:
+        chunk_size = settings.MEDIA_CHUNK_BYTES
+        segment = upload.upload_state.get("next_segment", 0)
+        if segment:
+            print(f"[CELERY WORKER] Resuming X upload of asset {asset.id} at segment {segment}.")
+        for chunk in source.iter_range(segment * chunk_size):
+            response = breaker.call(lambda: client.post(
+                X_MEDIA_UPLOAD_URL,
+                headers=headers,
+                data={"command": "APPEND", "media_id": upload.provider_media_id, "segment_index": segment},
+                files={"media": chunk},
+            ))
+            response.raise_for_status()
+            segment += 1
+            upload.upload_state = {**upload.upload_state, "next_segment": segment}
+            db.commit()
+
+        response = breaker.call(lambda: client.post(X_MEDIA_UPLOAD_URL, headers=headers, data={
+            "command": "FINALIZE", "media_id": upload.provider_media_id,
+        }))
+        response.raise_for_status()
+        upload.state = MediaUploadState.PROCESSING
+        db.commit()
+        processing_info = response.json().get("data", response.json()).get("processing_info")
+    else:
+        processing_info = {"state": "pending", "check_after_secs": 0}
+
+    waited = 0
+    while processing_info and processing_info.get("state") in ("pending", "in_progress"):
+        if waited >= MAX_PROCESSING_WAIT_SECONDS:
+            # Leave the row in PROCESSING; the retried task picks up the STATUS polling
+            raise httpx.TimeoutException(f"X is still processing media {upload.provider_media_id}.")
+        delay = processing_info.get("check_after_secs", 5)
+        time.sleep(delay)
+        waited += delay
+        response = breaker.call(lambda: client.get(X_MEDIA_UPLOAD_URL, headers=headers, params={
+            "command": "STATUS", "media_id": upload.provider_media_id,
+        }))
+        response.raise_for_status()
+        processing_info = response.json().get("data", response.json()).get("processing_info")
+
+    if processing_info and processing_info.get("state") == "failed":
+        upload.state = MediaUploadState.FAILED
+        db.commit()
+        raise MediaProcessingError(f"X could not process media for asset {asset.id}: {processing_info.get('error')}")
+
+    upload.state = MediaUploadState.READY
+    db.commit()
+    return upload.provider_media_id
+
+
+# --- LinkedIn --------------------------------------------------------------------
+
+def _linkedin_headers(account: SocialAccount) -> dict:
+    return {
+        "Authorization": f"Bearer {account.access_token}",
+        "X-Restli-Protocol-Version": "2.0.0",
+        "LinkedIn-Version": "202309",
+    }
+
+
+def _register_linkedin_upload(breaker: CircuitBreaker, account: SocialAccount, asset: MediaAsset, size: int) -> dict:
+    recipe = "urn:li:digitalmediaRecipe:feedshare-video" if asset.is_video else "urn:li:digitalmediaRecipe:feedshare-image"
+    request = {
+        "recipes": [recipe],
+        "owner": account.provider_user_id,
+        "serviceRelationships": [{"relationshipType": "OWNER", "identifier": "urn:li:userGeneratedContent"}],
+    }
+    multipart = asset.is_video and size >= LINKEDIN_MULTIPART_MIN_BYTES
+    if multipart:
+        request["supportedUploadMechanism"] = ["MULTIPART_UPLOAD"]
+        request["fileSize"] = size
+
+    response = breaker.call(lambda: get_http_client().post(
+        LINKEDIN_ASSETS_URL, params={"action": "registerUpload"},
+        headers=_linkedin_headers(account), json={"registerUploadRequest": request},
+    ))
+    response.raise_for_status()
+    value = response.json()["value"]
+    mechanism = value["uploadMechanism"]
+
+    if "com.linkedin.digitalmedia.uploading.MultipartUpload" in mechanism:
+        multipart_info = mechanism["com.linkedin.digitalmedia.uploading.MultipartUpload"]
+        parts = [
+            {"url": part["url"], "start": part["byteRange"]["firstByte"], "end": part["byteRange"]["lastByte"] + 1, "etag": None}
+            for part in multipart_info["partUploadRequests"]
+        ]
+        return {"asset": value["asset"], "parts": parts, "metadata": multipart_info.get("metadata"), "media_artifact": value.get("mediaArtifact")}
+
+    single = mechanism["com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest"]
+    return {"asset": value["asset"], "upload_url": single["uploadUrl"]}
+
+
+def ensure_linkedin_asset(db: Session, breaker: CircuitBreaker, account: SocialAccount, asset: MediaAsset) -> str:
+    """
+    Returns a LinkedIn digital media asset URN for `asset`, uploading or resuming as needed.
+    """
+    client = get_http_client()
+    upload = get_upload(db, asset, account)
+
+    if upload.state == MediaUploadState.READY:
+        return upload.provider_media_id
+    if upload.state == MediaUploadState.FAILED:
+        _restart(upload)
+
+    # A resumed upload must send the same bytes it started with
+    source = upload_source(asset, "linkedin", original=upload.upload_state.get("original", False))
+
+    if not upload.provider_media_id:
+        registration = _register_linkedin_upload(breaker, account, asset, source.size)
+        upload.provider_media_id = registration.pop("asset")
+        upload.upload_state = {**registration, "original": source.original}
+        db.commit()
+
+    state = dict(upload.upload_state)
+    content_headers = {"Authorization": f"Bearer {account.access_token}", "Content-Type": source.content_type}
+
+    if "parts" in state:
+        parts: List[dict] = [dict(part) for part in state["parts"]]
+        for part in parts:
+            if part["etag"]:
+                continue
+            response = breaker.call(lambda: client.put(
+                part["url"],
+                headers={"Content-Type": "application/octet-stream", "Content-Length": str(part["end"] - part["start"])},
+                content=source.iter_range(part["start"], part["end"]),
+            ))
+            response.raise_for_status()
+            part["etag"] = response.headers.get("etag")
+            upload.upload_state = {**state, "parts": parts}
+            db.commit()
+
+        response = breaker.call(lambda: client.post(
+            LINKEDIN_ASSETS_URL, params={"action": "completeMultiPartUpload"},
+            headers=_linkedin_headers(account),
+            json={"completeMultipartUploadRequest": {
+                "mediaArtifact": state.get("media_artifact"),
+                "metadata": state.get("metadata"),
+                "partUploadResponses": [{"httpStatusCode": 200, "headers": {"ETag": part["etag"]}} for part in parts],
+            }},
+        ))
+        response.raise_for_status()
+    elif not state.get("uploaded"):
+        # LinkedIn's single-request upload cannot resume mid-file, but a retry reuses the
+        # registration and streams the file again without holding it in memory.
+        response = breaker.call(lambda: client.put(
+            state["upload_url"],
+            headers={**content_headers, "Content-Length": str(source.size)},
+            content=source.iter_range(),
+        ))
+        response.raise_for_status()
+        upload.upload_state = {**state, "uploaded": True}
+        db.commit()
+
+    upload.state = MediaUploadState.READY
+    db.commit()
+    return upload.provider_media_id
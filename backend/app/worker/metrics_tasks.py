@@ -0,0 +1,201 @@
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+from urllib.parse import quote
+
+import httpx
+from sqlalchemy import insert, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from .celery_app import celery_app
+from .circuit_breaker import get_breaker
+from .http import get_http_client
+from .retry_policy import ErrorKind, classify_error, retry_delay
+from .tokens import ensure_fresh_token
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.engagement import EngagementRollup, EngagementSample, ROLLUP_GRANULARITIES
+from app.models.post import Post
+from app.models.post_delivery import PostDelivery, DeliveryStatus
+from app.models.social_account import SocialAccount
+
+# Largest number of posts each provider returns per lookup request
+BATCH_SIZES = {"twitter": 100, "linkedin": 50}
+
+
+@celery_app.task
+def schedule_engagement_ingestion():
+    """
+    Periodic task (Celery beat): batches every recently delivered post by account and enqueues
+    one ingestion task per batch. Each account's batches are spaced to respect
+    METRICS_REQUESTS_PER_MINUTE.
+    """
+    db: Session = SessionLocal()
+    try:
+        since = datetime.now(timezone.utc) - timedelta(days=settings.METRICS_LOOKBACK_DAYS)
+        rows = (
+            db.query(PostDelivery.id, PostDelivery.channel, SocialAccount.id)
+            .join(Post, (Post.id == PostDelivery.post_id) & (Post.created_at == PostDelivery.post_created_at))
+            .join(SocialAccount, or_(
+                SocialAccount.id == PostDelivery.social_account_id,
+                # Deliveries from before per-account targets went to the member account
+                PostDelivery.social_account_id.is_(None)
+                & (SocialAccount.user_id == Post.user_id)
+                & (SocialAccount.provider == PostDelivery.channel)
+                & SocialAccount.parent_id.is_(None),
+            ))
+            .filter(
+                PostDelivery.status == DeliveryStatus.DELIVERED,
+                PostDelivery.provider_post_id.isnot(None),
+                PostDelivery.delivered_at >= since,
+            )
+            .all()
+        )
+    finally:
+        db.close()
+
+    by_account: Dict[tuple, List[int]] = defaultdict(list)
+    for delivery_id, channel, account_id in rows:
+        by_account[(account_id, channel)].append(delivery_id)
+
+    spacing = 60.0 / max(1, settings.METRICS_REQUESTS_PER_MINUTE)
+    batches = 0
+    for (account_id, channel), delivery_ids in by_account.items():
+        size = BATCH_SIZES.get(channel)
+        if not size:
+            continue
+        # A random start per account spreads the load across the interval
+        offset = random.uniform(0, min(settings.METRICS_INGEST_INTERVAL_SECONDS / 2, 300))
+        for index in range(0, len(delivery_ids), size):
+            ingest_engagement_batch.apply_async(
+                (account_id, channel, delivery_ids[index:index + size]),
+                countdown=offset + (index // size) * spacing,
+            )
+            batches += 1
+    print(f"[CELERY WORKER] Scheduled {batches} engagement batches for {len(by_account)} accounts.")
+
+
+def _fetch_twitter_metrics(account: SocialAccount, deliveries: List[PostDelivery]) -> Dict[str, dict]:
+    response = get_breaker("twitter").call(lambda: get_http_client().get(
+        "https://api.twitter.com/2/tweets",
+        headers={"Authorization": f"Bearer {account.access_token}"},
+        params={"ids": ",".join(d.provider_post_id for d in deliveries), "tweet.fields": "public_metrics"},
+    ))
+    response.raise_for_status()
+    metrics = {}
+    for tweet in response.json().get("data", []):
+        public = tweet.get("public_metrics", {})
+        metrics[tweet["id"]] = {
+            "likes": public.get("like_count"),
+            "reposts": (public.get("retweet_count") or 0) + (public.get("quote_count") or 0),
+            "replies": public.get("reply_count"),
+            "impressions": public.get("impression_count"),
+        }
+    return metrics
+
+
+def _fetch_linkedin_metrics(account: SocialAccount, deliveries: List[PostDelivery]) -> Dict[str, dict]:
+    # Rest.li batch GET: one request for the whole batch of share URNs
+    ids = ",".join(quote(d.provider_post_id, safe="") for d in deliveries)
+    response = get_breaker("linkedin").call(lambda: get_http_client().get(
+        f"https://api.linkedin.com/v2/socialActions?ids=List({ids})",
+        headers={
+            "Authorization": f"Bearer {account.access_token}",
+            "X-Restli-Protocol-Version": "2.0.0",
+            "LinkedIn-Version": "202309",
+        },
+    ))
+    response.raise_for_status()
+    metrics = {}
+    for urn, actions in response.json().get("results", {}).items():
+        metrics[urn] = {
+            "likes": actions.get("likesSummary", {}).get("totalLikes"),
+            "reposts": None,
+            "replies": actions.get("commentsSummary", {}).get("aggregatedTotalComments"),
+            # Member shares expose no impression counts
+            "impressions": None,
+        }
+    return metrics
+
+
+FETCHERS = {"twitter": _fetch_twitter_metrics, "linkedin": _fetch_linkedin_metrics}
+
+
+def _bucket_start(moment: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+@celery_app.task(bind=True, max_retries=3)
+def ingest_engagement_batch(self, account_id: int, channel: str, delivery_ids: List[int]):
+    """
+    Celery task that fetches engagement for up to one provider batch of posts in a single
+    request. It appends the raw samples and upserts the hourly and daily rollups.
+    """
+    breaker = get_breaker(channel)
+    allowed, _ = breaker.allow_request()
+    if not allowed:
+        print(f"[CELERY WORKER] {channel} circuit is open; skipping engagement batch until the next run.")
+        return
+
+    db: Session = SessionLocal(expire_on_commit=False)
+    try:
+        account = db.query(SocialAccount).filter(SocialAccount.id == account_id).first()
+        deliveries = db.query(PostDelivery).filter(PostDelivery.id.in_(delivery_ids)).all()
+        db.commit()
+        if not account or not deliveries:
+            return
+
+        try:
+            ensure_fresh_token(db, breaker, account)
+            try:
+                metrics = FETCHERS[channel](account, deliveries)
+            except httpx.HTTPStatusError as exc:
+                if exc.response.status_code != 401:
+                    raise
+                # Revoked or rotated early: refresh once and try again
+                ensure_fresh_token(db, breaker, account, force=True)
+                metrics = FETCHERS[channel](account, deliveries)
+        except Exception as exc:
+            if classify_error(exc) == ErrorKind.RETRYABLE and self.request.retries < self.max_retries:
+                raise self.retry(exc=exc, countdown=retry_delay(exc, self.request.retries))
+            print(f"[CELERY WORKER] Engagement ingestion for account {account_id} on {channel} failed: {exc}")
+            return
+
+        now = datetime.now(timezone.utc)
+        samples = []
+        for delivery in deliveries:
+            values = metrics.get(delivery.provider_post_id)
+            if values:
+                samples.append({"delivery_id": delivery.id, "sampled_at": now, **values})
+        if not samples:
+            return
+
+        db.execute(insert(EngagementSample), samples)
+        rollups = [
+            {**sample, "granularity": granularity, "bucket_start": _bucket_start(now, granularity), "samples": 1}
+            for sample in samples
+            for granularity in ROLLUP_GRANULARITIES
+        ]
+        for sample in rollups:
+            sample.pop("sampled_at")
+        statement = pg_insert(EngagementRollup).values(rollups)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["delivery_id", "granularity", "bucket_start"],
+            set_={
+                "likes": statement.excluded.likes,
+                "reposts": statement.excluded.reposts,
+                "replies": statement.excluded.replies,
+                "impressions": statement.excluded.impressions,
+                "samples": EngagementRollup.samples + 1,
+                "updated_at": now,
+            },
+        ))
+        db.commit()
+        print(f"[CELERY WORKER] Stored engagement for {len(samples)} {channel} posts of account {account_id}.")
+    finally:
+        breaker.release_probe()
+        db.close()
@@ -0,0 +1,33 @@
+import psycopg2
+from sqlalchemy.exc import OperationalError
+
+from .celery_app import celery_app
+from app.services.post_archive import archive_expired, ensure_partitions
+
+
+@celery_app.task
+def ensure_post_partitions():
+    """
+    Periodic task (Celery beat): creates the months of posts/post_deliveries partitions
+    ahead of time, so rows never fall into the DEFAULT partition for lack of one.
+    """
+    try:
+        created = ensure_partitions()
+    except OperationalError as exc:
+        print(f"[CELERY WORKER] Could not create post partitions, retrying next run: {exc}")
+        return
+    print(f"[CELERY WORKER] Post partitions created: {', '.join(created) or 'none'}.")
+
+
+@celery_app.task
+def archive_expired_post_partitions():
+    """
+    Periodic task (Celery beat): archives and drops the months older than POST_RETENTION_MONTHS.
+    A month whose tables are busy (lock timeout) is left for the next run.
+    """
+    try:
+        archived = archive_expired()
+    except (OperationalError, psycopg2.OperationalError) as exc:
+        print(f"[CELERY WORKER] Post archival stopped, retrying next run: {exc}")
+        return
+    print(f"[CELERY WORKER] Archived post months: {', '.join(f'{month:%Y-%m}' for month in archived) or 'none'}.")
@@ -0,0 +1,89 @@
+import enum
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+from app.services.media_variants import VariantNotReadyError
+
+
+class ErrorKind(str, enum.Enum):
+    RETRYABLE = "retryable"        # transient: timeouts, 5xx, 429
+    PERMANENT = "permanent"        # retrying cannot help: 4xx validation errors, bugs
+    AUTH_EXPIRED = "auth_expired"  # the user must reconnect the account first
+
+
+class AuthExpiredError(Exception):
+    """
+    Raised when a provider account is missing or its token can no longer be used.
+    """
+
+
+RETRYABLE_STATUS_CODES = {408, 425, 429}
+
+
+def classify_error(exc: Exception) -> ErrorKind:
+    if isinstance(exc, AuthExpiredError):
+        return ErrorKind.AUTH_EXPIRED
+    if isinstance(exc, httpx.HTTPStatusError):
+        code = exc.response.status_code
+        if code == 401:
+            return ErrorKind.AUTH_EXPIRED
+        if code in RETRYABLE_STATUS_CODES or code >= 500:
+            return ErrorKind.RETRYABLE
+        return ErrorKind.PERMANENT
+    if isinstance(exc, (httpx.TransportError, OperationalError, VariantNotReadyError)):
+        return ErrorKind.RETRYABLE
+    return ErrorKind.PERMANENT
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """
+    Reads how long the provider asked us to wait, from `Retry-After` (seconds or an
+    HTTP date) or X's `x-rate-limit-reset` (epoch seconds). Returns None if absent.
+    """
+    value = response.headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(value)
+                return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+
+    reset = response.headers.get("x-rate-limit-reset")
+    if reset:
+        try:
+            return max(0.0, float(reset) - datetime.now(timezone.utc).timestamp())
+        except ValueError:
+            pass
+    return None
+
+
+def backoff_delay(retries: int) -> float:
+    """
+    Exponential backoff with full jitter: a uniform delay in [0, min(cap, base * 2^retries)].
+    Spreading retries over the whole window keeps failed tasks from retrying in lockstep.
+    """
+    ceiling = min(settings.PUBLISH_RETRY_MAX_DELAY, settings.PUBLISH_RETRY_BASE_DELAY * (2 ** retries))
+    return random.uniform(0, ceiling)
+
+
+def retry_delay(exc: Exception, retries: int) -> float:
+    """
+    Returns the countdown for the next attempt. A provider's Retry-After is a floor;
+    jitter on top of it stops every held task from coming back in the same second.
+    Never longer than PUBLISH_RETRY_MAX_DELAY: a countdown past the broker's visibility
+    timeout would get the late-acked task redelivered, and the post published twice.
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        wait = retry_after_seconds(exc.response)
+        if wait is not None:
+            return min(settings.PUBLISH_RETRY_MAX_DELAY, wait + random.uniform(0, settings.PUBLISH_RETRY_BASE_DELAY))
+    return backoff_delay(retries)
@@ -0,0 +1,36 @@
+from kombu import Queue
+
+# Publish lanes. "now" carries user-initiated "Post now" work; "bulk" carries
+# scheduled and batch work. Workers list the now lane first so it drains first.
+LANE_NOW = "now"
+LANE_BULK = "bulk"
+
+PUBLISH_PROVIDERS = ("linkedin", "twitter")
+
+DEFAULT_QUEUE = "default"
+# CPU-bound media preprocessing, consumed by a prefork (process pool) worker
+MEDIA_QUEUE = "media"
+
+
+def publish_queue(provider: str, lane: str = LANE_BULK) -> str:
+    """
+    Returns the queue name for a provider's publish lane, e.g. 'linkedin.now'.
+    """
+    return f"{provider}.{lane}"
+
+
+def build_task_queues():
+    queues = [Queue(DEFAULT_QUEUE), Queue(MEDIA_QUEUE)]
+    for provider in PUBLISH_PROVIDERS:
+        for lane in (LANE_NOW, LANE_BULK):
+            queues.append(Queue(publish_queue(provider, lane)))
+    return queues
+
+
+# Tasks without an explicit queue land in their provider's bulk lane.
+# Callers pick the now lane with `apply_async(queue=publish_queue(provider, LANE_NOW))`.
+TASK_ROUTES = {
+    "app.worker.tasks.publish_to_linkedin": {"queue": publish_queue("linkedin")},
+    "app.worker.tasks.publish_to_twitter": {"queue": publish_queue("twitter")},
+    "app.worker.media_tasks.generate_media_variants": {"queue": MEDIA_QUEUE},
+}
@@ -1,38 +1,159 @@
 from .celery_app import celery_app
+from .http import get_http_client
+from .circuit_breaker import get_breaker, hold_task
+from .media_upload import ensure_linkedin_asset, ensure_twitter_media
+from .retry_policy import AuthExpiredError, ErrorKind, classify_error, retry_delay
+from .routing import LANE_NOW, publish_queue
+from .tokens import ensure_fresh_token
+from app.core.config import settings
+from app.db.partitions import recent_first
 from app.db.session import SessionLocal
+from app.models.dead_letter import DeadLetter
 from app.models.post import Post, PostStatus
+from app.models.post_delivery import PostDelivery, DeliveryStatus
 from app.models.social_account import SocialAccount
+from app.services.read_models import draft_posts
+from app.services import webhooks
+from app.core.status_events import publish_post_status
 from sqlalchemy.orm import Session
+from celery import group
 import httpx
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import List, Optional, Tuple
 
-@celery_app.task(bind=True, max_retries=3, default_retry_delay=300)
-def publish_to_linkedin(self, post_id: int):
+
+def find_post(db: Session, post_id: int) -> Optional[Post]:
+    return recent_first(db.query(Post).filter(Post.id == post_id), Post.created_at)
+
+
+def find_delivery(db: Session, post: Post, channel: str, account_id: Optional[int]) -> Optional[PostDelivery]:
+    # The post's creation time is the deliveries' partition key: only its month is searched
+    query = db.query(PostDelivery).filter_by(post_id=post.id, post_created_at=post.created_at, channel=channel)
+    if account_id is not None:
+        return query.filter_by(social_account_id=account_id).first()
+    return query.order_by(PostDelivery.id).first()
+
+
+def get_delivery(db: Session, post: Post, channel: str, account_id: Optional[int] = None) -> PostDelivery:
     """
-    Celery task to publish a post to LinkedIn using the UGC Posts API.
+    Returns the ledger row for (post, account), creating it for tasks enqueued without one.
     """
+    delivery = find_delivery(db, post, channel, account_id)
+    if not delivery:
+        delivery = PostDelivery(post_id=post.id, post_created_at=post.created_at, channel=channel, social_account_id=account_id)
+        db.add(delivery)
+        db.flush()
+    return delivery
+
+
+def get_target_account(db: Session, user_id: int, provider: str, account_id: Optional[int]) -> Optional[SocialAccount]:
+    query = db.query(SocialAccount).filter_by(user_id=user_id, provider=provider)
+    if account_id is not None:
+        return query.filter(SocialAccount.id == account_id).first()
+    # Tasks enqueued before per-account targets carry only the post id: use the member account
+    return query.filter(SocialAccount.parent_id.is_(None)).order_by(SocialAccount.id).first()
+
+
+def handle_publish_error(task, post_id: int, channel: str, provider: str, exc: Exception, account_id: Optional[int] = None):
+    """
+    Shared failure path for the publish tasks.
+
+    Retryable errors are retried with jittered exponential backoff (or the provider's
+    Retry-After) and the post is left in RETRYING. Anything else, including a retryable
+    error that ran out of attempts, marks the delivery FAILED and is dead-lettered for replay.
+    A post that already went out to another account stays PUBLISHED.
+    """
+    kind = classify_error(exc)
+    retries = task.request.retries
     db: Session = SessionLocal()
     try:
-        post = db.query(Post).filter(Post.id == post_id).first()
+        post = find_post(db, post_id)
+        delivery = find_delivery(db, post, channel, account_id) if post else None
+        if delivery:
+            delivery.last_error = str(exc)
+
+        if kind == ErrorKind.RETRYABLE and retries < task.max_retries:
+            countdown = retry_delay(exc, retries)
+            if post and post.status != PostStatus.PUBLISHED:
+                post.status = PostStatus.RETRYING
+            if delivery:
+                delivery.status = DeliveryStatus.RETRYING
+            if post:
+                webhooks.record_event(db, post.user_id, webhooks.POST_RETRYING, {
+                    "post_id": post_id, "channel": channel, "account_id": account_id, "attempt": retries + 1,
+                    "retry_in_seconds": round(countdown), "error": str(exc),
+                })
+            db.commit()
+            if post:
+                draft_posts.invalidate(post.user_id)
+                publish_post_status(post.user_id, post_id, channel, DeliveryStatus.RETRYING.value, post.status.value, f"Retrying in {countdown:.0f}s: {exc}", account_id)
+            print(f"[CELERY WORKER] {provider} publish of post {post_id} failed ({exc!r}); retry {retries + 1}/{task.max_retries} in {countdown:.0f}s.")
+            raise task.retry(exc=exc, countdown=countdown)
+
         if not post:
-            print(f"[CELERY WORKER] Post {post_id} not found.")
+            print(f"[CELERY WORKER] Post {post_id} no longer exists; dropping failed {provider} publish.")
             return
 
-        social_account = db.query(SocialAccount).filter_by(
-            user_id=post.user_id, provider='linkedin'
-        ).first()
-
-        if not social_account:
+        if post.status != PostStatus.PUBLISHED:
             post.status = PostStatus.FAILED
-            db.commit()
-            print(f"[CELERY WORKER] No LinkedIn account for user {post.user_id}. Failing post {post.id}.")
+        if delivery:
+            delivery.status = DeliveryStatus.FAILED
+        db.add(DeadLetter(
+            user_id=post.user_id,
+            post_id=post_id,
+            task_name=task.name,
+            task_args=[post_id, account_id] if account_id is not None else [post_id],
+            error_kind=kind.value,
+            error=str(exc),
+            retries=retries,
+        ))
+        webhooks.record_event(db, post.user_id, webhooks.POST_FAILED, {
+            "post_id": post_id, "channel": channel, "account_id": account_id, "error_kind": kind.value, "error": str(exc),
+        })
+        db.commit()
+        draft_posts.invalidate(post.user_id)
+        publish_post_status(post.user_id, post_id, channel, DeliveryStatus.FAILED.value, post.status.value, str(exc), account_id)
+        print(f"[CELERY WORKER] {provider} publish of post {post_id} dead-lettered as {kind.value}: {exc}")
+        return f"Post {post_id} failed on {provider}: {kind.value}."
+    finally:
+        db.close()
+
+
+@celery_app.task(bind=True, max_retries=settings.PUBLISH_MAX_RETRIES)
+def publish_to_linkedin(self, post_id: int, account_id: Optional[int] = None):
+    """
+    Celery task to publish a post to LinkedIn using the UGC Posts API.
+    """
+    breaker = get_breaker("linkedin")
+    allowed, hold_for = breaker.allow_request()
+    if not allowed:
+        print(f"[CELERY WORKER] LinkedIn circuit is open; holding post {post_id} for {hold_for:.0f}s.")
+        hold_task(self, hold_for)
+        return
+
+    # expire_on_commit=False keeps the loaded rows usable after we hand the
+    # connection back to the pool, so a slow provider call never pins a DB connection.
+    db: Session = SessionLocal(expire_on_commit=False)
+    try:
+        post = find_post(db, post_id)
+        if not post:
+            print(f"[CELERY WORKER] Post {post_id} not found.")
             return
 
-        if social_account.expires_at and social_account.expires_at < datetime.utcnow() + timedelta(minutes=5):
-            post.status = PostStatus.FAILED
+        delivery = get_delivery(db, post, "linkedin", account_id)
+        if delivery.status == DeliveryStatus.DELIVERED:
+            print(f"[CELERY WORKER] Post {post_id} already delivered to LinkedIn as {delivery.provider_post_id}; skipping.")
             db.commit()
-            print(f"[CELERY WORKER] LinkedIn token for user {post.user_id} is expired. Post {post.id} failed.")
-            return f"Post {post_id} failed: LinkedIn token expired."
+            return f"Post {post_id} already published to LinkedIn."
+
+        social_account = get_target_account(db, post.user_id, "linkedin", account_id)
+
+        if not social_account:
+            raise AuthExpiredError(f"No LinkedIn account connected for user {post.user_id}.")
+        if delivery.social_account_id is None:
+            delivery.social_account_id = social_account.id
+
+        ensure_fresh_token(db, breaker, social_account)
 
         api_url = "https://api.linkedin.com/v2/ugcPosts"
         headers = {
@@ -41,134 +162,159 @@ def publish_to_linkedin(self, post_id: int):
             "X-Restli-Protocol-Version": "2.0.0",
             # --- THIS HEADER IS THE FIX ---
             # LinkedIn's newer APIs require a version header.
-            "LinkedIn-Version": "202309" 
+            "LinkedIn-Version": "202309"
         }
-        
+
+        share_content = {
+            "shareCommentary": {
+                "text": post.content
+            },
+            "shareMediaCategory": "NONE"
+        }
+        if post.media:
+            media_urns = [ensure_linkedin_asset(db, breaker, social_account, asset) for asset in post.media]
+            share_content["shareMediaCategory"] = "VIDEO" if any(asset.is_video for asset in post.media) else "IMAGE"
+            share_content["media"] = [{"status": "READY", "media": urn} for urn in media_urns]
+
         post_body = {
             "author": social_account.provider_user_id,
             "lifecycleState": "PUBLISHED",
             "specificContent": {
-                "com.linkedin.ugc.ShareContent": {
-                    "shareCommentary": {
-                        "text": post.content
-                    },
-                    "shareMediaCategory": "NONE"
-                }
+                "com.linkedin.ugc.ShareContent": share_content
             },
             "visibility": {
-                "com.linkedin.ugc.MemberNetworkVisibility": "CONNECTIONS"
+                # Organization pages only publish publicly
+                "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC" if social_account.account_type == "organization" else "CONNECTIONS"
             }
         }
+        delivery.attempts += 1
+        db.commit()
+
+        client = get_http_client()
+        print(f"[CELERY WORKER] Posting to LinkedIn for post ID: {post.id}")
+        print(f"[CELERY WORKER] Using author URN: {social_account.provider_user_id}")
+        response = breaker.call(lambda: client.post(api_url, headers=headers, json=post_body))
+        print(f"[CELERY WORKER] LinkedIn API response status: {response.status_code}")
+        print(f"[CELERY WORKER] LinkedIn API response body: {response.text}")
+        response.raise_for_status()
 
-        with httpx.Client() as client:
-            print(f"[CELERY WORKER] Posting to LinkedIn for post ID: {post.id}")
-            print(f"[CELERY WORKER] Using author URN: {social_account.provider_user_id}")
-            response = client.post(api_url, headers=headers, json=post_body)
-            print(f"[CELERY WORKER] LinkedIn API response status: {response.status_code}")
-            print(f"[CELERY WORKER] LinkedIn API response body: {response.text}")
-            response.raise_for_status()
-        
         print(f"[CELERY WORKER] Successfully published Post ID {post.id} to LinkedIn.")
+        # Record the delivery first thing, so a retry of this task can never post twice
+        delivery.status = DeliveryStatus.DELIVERED
+        delivery.provider_post_id = response.headers.get("x-restli-id") or response.json().get("id")
+        delivery.delivered_at = datetime.utcnow()
+        delivery.last_error = None
         post.status = PostStatus.PUBLISHED
+        webhooks.record_event(db, post.user_id, webhooks.POST_PUBLISHED, {
+            "post_id": post_id, "channel": "linkedin", "account_id": delivery.social_account_id,
+            "provider_post_id": delivery.provider_post_id,
+        })
         db.commit()
+        draft_posts.invalidate(post.user_id)
+        publish_post_status(post.user_id, post_id, "linkedin", delivery.status.value, post.status.value, account_id=delivery.social_account_id)
         return f"Post {post_id} published to LinkedIn."
 
-    except httpx.HTTPStatusError as exc:
-        print(f"[CELERY WORKER] HTTP error for post {post_id}: {exc.response.text}")
-        post.status = PostStatus.FAILED
-        db.commit()
-        if 500 <= exc.response.status_code <= 599 or exc.response.status_code == 429:
-            raise self.retry(exc=exc)
     except Exception as exc:
-        print(f"[CELERY WORKER] Unexpected error for post {post_id}: {exc}")
-        post.status = PostStatus.FAILED
-        db.commit()
-        raise self.retry(exc=exc)
+        db.rollback()
+        if isinstance(exc, httpx.HTTPStatusError):
+            print(f"[CELERY WORKER] HTTP error for post {post_id}: {exc.response.text}")
+        return handle_publish_error(self, post_id, "linkedin", "LinkedIn", exc, account_id)
     finally:
+        breaker.release_probe()
         db.close()
 
-@celery_app.task(bind=True, max_retries=3, default_retry_delay=300)
-def publish_to_twitter(self, post_id: int):
+@celery_app.task(bind=True, max_retries=settings.PUBLISH_MAX_RETRIES)
+def publish_to_twitter(self, post_id: int, account_id: Optional[int] = None):
     """
     Celery task to publish a post (Tweet) to X (Twitter) using the v2 API.
     Handles token refresh automatically.
     """
-    db: Session = SessionLocal()
+    breaker = get_breaker("twitter")
+    allowed, hold_for = breaker.allow_request()
+    if not allowed:
+        print(f"[CELERY WORKER] X circuit is open; holding post {post_id} for {hold_for:.0f}s.")
+        hold_task(self, hold_for)
+        return
+
+    # expire_on_commit=False keeps the loaded rows usable after we hand the
+    # connection back to the pool, so a slow provider call never pins a DB connection.
+    db: Session = SessionLocal(expire_on_commit=False)
     try:
-        post = db.query(Post).filter(Post.id == post_id).first()
+        post = find_post(db, post_id)
         if not post:
             print(f"[CELERY WORKER] Post {post_id} not found.")
             return
 
-        social_account = db.query(SocialAccount).filter_by(
-            user_id=post.user_id, provider='twitter'
-        ).first()
+        delivery = get_delivery(db, post, "twitter", account_id)
+        if delivery.status == DeliveryStatus.DELIVERED:
+            print(f"[CELERY WORKER] Post {post_id} already delivered to X as {delivery.provider_post_id}; skipping.")
+            db.commit()
+            return f"Post {post_id} already published to X."
+
+        social_account = get_target_account(db, post.user_id, "twitter", account_id)
 
         if not social_account:
-            post.status = PostStatus.FAILED
-            db.commit()
-            print(f"[CELERY WORKER] No X/Twitter account for user {post.user_id}. Failing post {post.id}.")
-            return
+            raise AuthExpiredError(f"No X/Twitter account connected for user {post.user_id}.")
+        if delivery.social_account_id is None:
+            delivery.social_account_id = social_account.id
 
-        # --- X Refresh Token Logic ---
-        # Check if the token is expired or close to expiring (within 5 mins)
-        if social_account.expires_at and social_account.expires_at < datetime.utcnow() + timedelta(minutes=5):
-            print(f"[CELERY WORKER] X token for user {post.user_id} is expired. Attempting refresh.")
-            
-            with httpx.Client() as client:
-                refresh_response = client.post(
-                    "https://api.twitter.com/2/oauth2/token",
-                    data={
-                        "grant_type": "refresh_token",
-                        "refresh_token": social_account.refresh_token,
-                        "client_id": settings.X_CLIENT_ID,
-                    },
-                    auth=(settings.X_CLIENT_ID, settings.X_CLIENT_SECRET)
-                )
-            
-            if refresh_response.status_code != 200:
-                print(f"[CELERY WORKER] X token refresh failed: {refresh_response.text}")
-                post.status = PostStatus.FAILED
-                db.commit()
-                # Do not retry, user needs to reconnect
-                return f"Post {post_id} failed: X token refresh failed."
-            
-            # Update the stored tokens in the database
-            new_token_data = refresh_response.json()
-            social_account.access_token = new_token_data["access_token"]
-            social_account.refresh_token = new_token_data["refresh_token"]
-            social_account.expires_at = datetime.utcnow() + timedelta(seconds=new_token_data["expires_in"])
-            db.commit()
-            print(f"[CELERY WORKER] X token successfully refreshed for user {post.user_id}.")
+        # X tokens last about two hours; refresh one that is expired or close to it
+        ensure_fresh_token(db, breaker, social_account)
 
         # --- Post the Tweet ---
         api_url = "https://api.twitter.com/2/tweets"
         headers = {"Authorization": f"Bearer {social_account.access_token}"}
         tweet_body = {"text": post.content}
+        if post.media:
+            tweet_body["media"] = {"media_ids": [ensure_twitter_media(db, breaker, social_account, asset) for asset in post.media]}
+        delivery.attempts += 1
+        db.commit()
+
+        client = get_http_client()
+        print(f"[CELERY WORKER] Posting to X for post ID: {post.id}")
+        response = breaker.call(lambda: client.post(api_url, headers=headers, json=tweet_body))
+        print(f"[CELERY WORKER] X API response status: {response.status_code}")
+        print(f"[CELERY WORKER] X API response body: {response.text}")
+        response.raise_for_status()
 
-        with httpx.Client() as client:
-            print(f"[CELERY WORKER] Posting to X for post ID: {post.id}")
-            response = client.post(api_url, headers=headers, json=tweet_body)
-            print(f"[CELERY WORKER] X API response status: {response.status_code}")
-            print(f"[CELERY WORKER] X API response body: {response.text}")
-            response.raise_for_status()
-        
         print(f"[CELERY WORKER] Successfully published Post ID {post.id} to X.")
-        # We can update the main post status if needed, but for now we assume it's published if one channel succeeds
-        # post.status = PostStatus.PUBLISHED 
+        # Record the delivery first thing, so a retry of this task can never post twice
+        delivery.status = DeliveryStatus.DELIVERED
+        delivery.provider_post_id = response.json().get("data", {}).get("id")
+        delivery.delivered_at = datetime.utcnow()
+        delivery.last_error = None
+        # We assume the post is published if one channel succeeds; this also clears RETRYING
+        post.status = PostStatus.PUBLISHED
+        webhooks.record_event(db, post.user_id, webhooks.POST_PUBLISHED, {
+            "post_id": post_id, "channel": "twitter", "account_id": delivery.social_account_id,
+            "provider_post_id": delivery.provider_post_id,
+        })
         db.commit()
+        draft_posts.invalidate(post.user_id)
+        publish_post_status(post.user_id, post_id, "twitter", delivery.status.value, post.status.value, account_id=delivery.social_account_id)
         return f"Post {post_id} published to X."
 
-    except httpx.HTTPStatusError as exc:
-        print(f"[CELERY WORKER] HTTP error for post {post_id} on X: {exc.response.text}")
-        post.status = PostStatus.FAILED
-        db.commit()
-        if 500 <= exc.response.status_code <= 599 or exc.response.status_code == 429:
-            raise self.retry(exc=exc)
     except Exception as exc:
-        print(f"[CELERY WORKER] Unexpected error for post {post_id} on X: {exc}")
-        post.status = PostStatus.FAILED
-        db.commit()
-        raise self.retry(exc=exc)
+        db.rollback()
+        if isinstance(exc, httpx.HTTPStatusError):
+            print(f"[CELERY WORKER] HTTP error for post {post_id} on X: {exc.response.text}")
+        return handle_publish_error(self, post_id, "twitter", "X", exc, account_id)
     finally:
-        db.close()
\ No newline at end of file
+        breaker.release_probe()
+        db.close()
+
+
+PUBLISH_TASKS = {"linkedin": publish_to_linkedin, "twitter": publish_to_twitter}
+
+
+def enqueue_publish(post_id: int, targets: List[Tuple[str, int]], lane: str = LANE_NOW):
+    """
+    Enqueues one publish task per (provider, account id). Tasks are sent as groups of
+    PUBLISH_ENQUEUE_BATCH_SIZE, and each group reuses one producer connection.
+    """
+    signatures = [
+        PUBLISH_TASKS[provider].si(post_id, account_id).set(queue=publish_queue(provider, lane))
+        for provider, account_id in targets
+    ]
+    for start in range(0, len(signatures), settings.PUBLISH_ENQUEUE_BATCH_SIZE):
+        group(signatures[start:start + settings.PUBLISH_ENQUEUE_BATCH_SIZE]).apply_async()
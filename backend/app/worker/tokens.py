@@ -0,0 +1,93 @@
+"""
+Access tokens for the worker tasks that call providers with a stored account.
+
+X OAuth2 access tokens last about two hours, so every task that calls X with an account's token
+(publishing, feed sync, metrics) refreshes it here first. X rotates the refresh token on every
+use, so refreshes of one account are serialized with a Redis lock, and a task that waited for
+the lock reuses the token the holder stored instead of refreshing again. LinkedIn tokens cannot
+be refreshed: an expired one means the user must reconnect.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import redis
+from sqlalchemy.orm import Session
+
+from .circuit_breaker import CircuitBreaker
+from .http import get_http_client
+from .retry_policy import AuthExpiredError
+from app.core.config import settings
+from app.core.redis import redis_client
+from app.models.social_account import SocialAccount
+
+X_TOKEN_URL = "https://api.twitter.com/2/oauth2/token"
+# Tokens this close to expiry are refreshed before use
+EXPIRY_MARGIN = timedelta(minutes=5)
+REFRESH_LOCK_SECONDS = 30
+
+
+def token_expiring(account: SocialAccount) -> bool:
+    return bool(account.expires_at and account.expires_at < datetime.utcnow() + EXPIRY_MARGIN)
+
+
+@contextmanager
+def _refresh_lock(account: SocialAccount):
+    try:
+        lock = redis_client.lock(f"token-refresh:{account.id}", timeout=REFRESH_LOCK_SECONDS, blocking_timeout=REFRESH_LOCK_SECONDS)
+        acquired = lock.acquire()
+    except redis.RedisError as exc:
+        print(f"[CELERY WORKER] Token refresh lock for account {account.id} unavailable ({exc}); refreshing without it.")
+        lock, acquired = None, False
+    try:
+        yield
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except redis.RedisError as exc:
+                print(f"[CELERY WORKER] Could not release token refresh lock for account {account.id}: {exc}")
+
+
+def ensure_fresh_token(db: Session, breaker: CircuitBreaker, account: SocialAccount, force: bool = False):
+    """
+    Makes sure `account.access_token` is usable, refreshing an X token that is expired or about
+    to expire (or, with `force`, one the provider just rejected). Raises AuthExpiredError when the
+    token cannot be refreshed, and HTTPStatusError when X is rate limiting or unavailable.
+    """
+    if not force and not token_expiring(account):
+        return
+    if account.provider != "twitter" or not account.refresh_token:
+        raise AuthExpiredError(f"{account.provider} token for account {account.id} is expired.")
+
+    rejected_token = account.access_token
+    with _refresh_lock(account):
+        # Another task may have refreshed it while this one waited for the lock
+        db.refresh(account)
+        if account.access_token != rejected_token and not token_expiring(account):
+            db.commit()
+            return
+        db.commit()
+
+        print(f"[CELERY WORKER] Refreshing X token for account {account.id}.")
+        response = breaker.call(lambda: get_http_client().post(
+            X_TOKEN_URL,
+            data={
+                "grant_type": "refresh_token",
+                "refresh_token": account.refresh_token,
+                "client_id": settings.X_CLIENT_ID,
+            },
+            auth=(settings.X_CLIENT_ID, settings.X_CLIENT_SECRET),
+        ))
+        if response.status_code != 200:
+            print(f"[CELERY WORKER] X token refresh failed: {response.text}")
+            if response.status_code == 429 or response.status_code >= 500:
+                response.raise_for_status()
+            # The refresh token itself was rejected; the user needs to reconnect
+            raise AuthExpiredError(f"X token refresh failed for account {account.id}.")
+
+        token_data = response.json()
+        account.access_token = token_data["access_token"]
+        account.refresh_token = token_data.get("refresh_token", account.refresh_token)
+        account.expires_at = datetime.utcnow() + timedelta(seconds=token_data["expires_in"])
+        db.commit()
+        print(f"[CELERY WORKER] X token refreshed for account {account.id}.")
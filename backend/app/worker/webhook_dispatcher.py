@@ -0,0 +1,358 @@
+"""
+Webhook dispatcher: delivers recorded publish events to users' endpoints.
+
+Run it as its own process (`python -m app.worker.webhook_dispatcher`). It is a single asyncio
+loop around one pooled `httpx.AsyncClient`:
+
+1. Claim due deliveries with `FOR UPDATE SKIP LOCKED`. Endpoints already at their
+   `max_concurrency`, or backing off after failures, are skipped. Each claimed row is leased
+   by pushing `next_attempt_at` forward, so a crashed dispatcher's work is picked up again
+   once the lease runs out.
+2. Group the claimed rows per endpoint into batches of up to WEBHOOK_BATCH_SIZE events. Send
+   each batch as one signed POST, without waiting for other endpoints.
+   Connections are only opened to public addresses, checked when they are opened (see
+   PublicAddressBackend), so an endpoint's host cannot be re-pointed at internal services.
+3. On a 2xx response, mark the batch delivered. Otherwise reschedule it with jittered
+   exponential backoff (a Retry-After header counts as a floor), and back the whole endpoint
+   off too. Give up after WEBHOOK_MAX_ATTEMPTS.
+
+Database calls are blocking psycopg2 calls, so they run in the default thread pool.
+"""
+import asyncio
+import json
+import random
+import signal
+import socket
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import httpcore
+import httpx
+from sqlalchemy import or_
+
+from .retry_policy import retry_after_seconds
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.webhook import WebhookDelivery, WebhookDeliveryStatus, WebhookEndpoint, WebhookEvent
+from app.services.webhooks import is_public_address, sign
+
+# Claimed rows are not offered again for this long; it covers the request and its bookkeeping
+LEASE_SECONDS = settings.WEBHOOK_TIMEOUT_SECONDS * 2 + 30
+CLAIM_LIMIT = 1000
+
+
+def _backoff(attempt: int, retry_after: Optional[float] = None) -> float:
+    ceiling = min(settings.WEBHOOK_RETRY_MAX_DELAY, settings.WEBHOOK_RETRY_BASE_DELAY * (2 ** max(0, attempt - 1)))
+    delay = random.uniform(ceiling / 2, ceiling)
+    # A receiver's Retry-After is a floor, but never beyond the cap: an absurd value
+    # (1e300, inf) would overflow timedelta and fail the batch on every attempt
+    return max(delay, min(retry_after or 0, settings.WEBHOOK_RETRY_MAX_DELAY))
+
+
+class PublicAddressBackend(httpcore.AsyncNetworkBackend):
+    """
+    Resolves the host each time a connection is opened, refuses it unless every address is
+    public, and connects to the address it checked. Endpoint URLs are validated when they are
+    registered, but a host can re-resolve to an internal address afterwards (DNS rebinding).
+    TLS still verifies the certificate against the host name.
+    """
+
+    def __init__(self):
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except socket.gaierror as exc:
+            raise httpcore.ConnectError(f"Cannot resolve {host}: {exc}")
+        addresses = [info[4][0] for info in infos]
+        if not addresses or not all(is_public_address(address) for address in addresses):
+            raise httpcore.ConnectError(f"{host} does not resolve to a public address.")
+        return await self._backend.connect_tcp(
+            addresses[0], port, timeout=timeout, local_address=local_address, socket_options=socket_options,
+        )
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        raise httpcore.ConnectError("Webhooks cannot be delivered to unix sockets.")
+
+    async def sleep(self, seconds):
+        await self._backend.sleep(seconds)
+
+
+# httpcore errors and the httpx errors callers handle, most specific first
+_MAPPED_ERRORS = (
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+)
+
+
+@contextmanager
+def _httpx_errors(request: httpx.Request):
+    try:
+        yield
+    except Exception as exc:
+        for core_error, httpx_error in _MAPPED_ERRORS:
+            if isinstance(exc, core_error):
+                raise httpx_error(str(exc), request=request) from exc
+        raise
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream, request: httpx.Request):
+        self._stream = stream
+        self._request = request
+
+    async def __aiter__(self):
+        with _httpx_errors(self._request):
+            async for part in self._stream:
+                yield part
+
+    async def aclose(self):
+        await self._stream.aclose()
+
+
+class PublicAddressTransport(httpx.AsyncBaseTransport):
+    """
+    An httpx transport over an httpcore connection pool that connects through
+    PublicAddressBackend. httpx's own transport has no way to set the network backend.
+    """
+
+    def __init__(self, limits: httpx.Limits):
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            network_backend=PublicAddressBackend(),
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _httpx_errors(request):
+            core_response = await self._pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=core_response.status,
+            headers=core_response.headers,
+            stream=_ResponseStream(core_response.stream, request),
+            extensions=core_response.extensions,
+        )
+
+    async def aclose(self):
+        await self._pool.aclose()
+
+
+def http_transport(limits: httpx.Limits) -> httpx.AsyncBaseTransport:
+    if settings.WEBHOOK_ALLOW_PRIVATE_TARGETS:
+        return httpx.AsyncHTTPTransport(limits=limits)
+    return PublicAddressTransport(limits)
+
+
+def claim_batches(in_flight: Dict[int, int], capacity: int) -> List[dict]:
+    """
+    Claims due deliveries for endpoints with free concurrency and returns them as batches:
+    [{"endpoint_id", "url", "secret", "delivery_ids", "events"}].
+    """
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        # Leave saturated endpoints out of the claim, so their backlog cannot crowd out others
+        busy = [
+            endpoint_id for endpoint_id, max_concurrency in
+            db.query(WebhookEndpoint.id, WebhookEndpoint.max_concurrency)
+            .filter(WebhookEndpoint.id.in_([eid for eid, count in in_flight.items() if count > 0]))
+            if in_flight[endpoint_id] >= max_concurrency
+        ]
+        rows = (
+            db.query(WebhookDelivery.id, WebhookDelivery.endpoint_id, WebhookDelivery.event_id)
+            .join(WebhookEndpoint, WebhookEndpoint.id == WebhookDelivery.endpoint_id)
+            .filter(
+                WebhookDelivery.status == WebhookDeliveryStatus.PENDING,
+                WebhookDelivery.next_attempt_at <= now,
+                WebhookEndpoint.is_active.is_(True),
+                or_(WebhookEndpoint.next_attempt_at.is_(None), WebhookEndpoint.next_attempt_at <= now),
+                WebhookDelivery.endpoint_id.notin_(busy),
+            )
+            .order_by(WebhookDelivery.id)
+            .limit(CLAIM_LIMIT)
+            .with_for_update(skip_locked=True, of=WebhookDelivery)
+            .all()
+        )
+        if not rows:
+            db.commit()
+            return []
+
+        endpoints = {
+            endpoint.id: endpoint
+            for endpoint in db.query(WebhookEndpoint).filter(WebhookEndpoint.id.in_({row.endpoint_id for row in rows}))
+        }
+        per_endpoint = defaultdict(list)
+        for row in rows:
+            per_endpoint[row.endpoint_id].append(row)
+
+        batches = []
+        for endpoint_id, endpoint_rows in per_endpoint.items():
+            endpoint = endpoints[endpoint_id]
+            free = endpoint.max_concurrency - in_flight.get(endpoint_id, 0)
+            for start in range(0, len(endpoint_rows), settings.WEBHOOK_BATCH_SIZE):
+                if free <= 0 or len(batches) >= capacity:
+                    break
+                chunk = endpoint_rows[start:start + settings.WEBHOOK_BATCH_SIZE]
+                batches.append({
+                    "endpoint_id": endpoint_id,
+                    "url": endpoint.url,
+                    "secret": endpoint.secret,
+                    "delivery_ids": [row.id for row in chunk],
+                    "event_ids": [row.event_id for row in chunk],
+                })
+                free -= 1
+        if not batches:
+            db.commit()
+            return []
+
+        lease_until = now + timedelta(seconds=LEASE_SECONDS)
+        claimed = [delivery_id for batch in batches for delivery_id in batch["delivery_ids"]]
+        db.query(WebhookDelivery).filter(WebhookDelivery.id.in_(claimed)).update(
+            {WebhookDelivery.next_attempt_at: lease_until}, synchronize_session=False
+        )
+        events = {
+            event.id: event
+            for event in db.query(WebhookEvent).filter(WebhookEvent.id.in_({e for b in batches for e in b["event_ids"]}))
+        }
+        for batch in batches:
+            batch["events"] = [
+                {
+                    "id": event_id,
+                    "type": events[event_id].event_type,
+                    "created_at": events[event_id].created_at.isoformat(),
+                    "data": events[event_id].payload,
+                }
+                for event_id in batch.pop("event_ids")
+            ]
+        db.commit()
+        return batches
+    finally:
+        db.close()
+
+
+def record_result(batch: dict, status_code: Optional[int], error: Optional[str], retry_after: Optional[float]):
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        endpoint = db.query(WebhookEndpoint).filter(WebhookEndpoint.id == batch["endpoint_id"]).first()
+        deliveries = db.query(WebhookDelivery).filter(WebhookDelivery.id.in_(batch["delivery_ids"])).all()
+        succeeded = status_code is not None and 200 <= status_code < 300
+
+        for delivery in deliveries:
+            delivery.attempts += 1
+            delivery.last_status_code = status_code
+            if succeeded:
+                delivery.status = WebhookDeliveryStatus.DELIVERED
+                delivery.delivered_at = now
+                delivery.last_error = None
+            elif delivery.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+                delivery.status = WebhookDeliveryStatus.FAILED
+                delivery.last_error = error
+            else:
+                delivery.last_error = error
+                delivery.next_attempt_at = now + timedelta(seconds=_backoff(delivery.attempts, retry_after))
+
+        if endpoint:
+            if succeeded:
+                endpoint.failure_count = 0
+                endpoint.next_attempt_at = None
+            else:
+                # Hold everything for this endpoint, not just this batch, while it is failing
+                endpoint.failure_count += 1
+                endpoint.next_attempt_at = now + timedelta(seconds=_backoff(endpoint.failure_count, retry_after))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def deliver(client: httpx.AsyncClient, batch: dict):
+    body = json.dumps({"events": batch["events"]}, separators=(",", ":")).encode("utf-8")
+    timestamp = int(time.time())
+    headers = {
+        "Content-Type": "application/json",
+        "User-Agent": "SocialAggregator-Webhooks/1.0",
+        "X-Webhook-Timestamp": str(timestamp),
+        "X-Webhook-Signature": f"v1={sign(batch['secret'], timestamp, body)}",
+    }
+    status_code, error, retry_after = None, None, None
+    try:
+        response = await client.post(batch["url"], content=body, headers=headers)
+        status_code = response.status_code
+        if not 200 <= status_code < 300:
+            error = f"HTTP {status_code}: {response.text[:500]}"
+            retry_after = retry_after_seconds(response)
+    except httpx.HTTPError as exc:
+        error = f"{type(exc).__name__}: {exc}"
+    await asyncio.to_thread(record_result, batch, status_code, error, retry_after)
+    if error:
+        print(f"[WEBHOOKS] Endpoint {batch['endpoint_id']}: {len(batch['events'])} events failed ({error}).")
+
+
+async def run():
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    in_flight: Dict[int, int] = defaultdict(int)
+    tasks = set()
+
+    def finished(task, endpoint_id):
+        tasks.discard(task)
+        in_flight[endpoint_id] -= 1
+        if task.exception():
+            print(f"[WEBHOOKS] Delivery to endpoint {endpoint_id} crashed: {task.exception()!r}")
+
+    limits = httpx.Limits(max_connections=settings.WEBHOOK_MAX_IN_FLIGHT, max_keepalive_connections=settings.WEBHOOK_MAX_IN_FLIGHT)
+    async with httpx.AsyncClient(timeout=settings.WEBHOOK_TIMEOUT_SECONDS, transport=http_transport(limits)) as client:
+        print("[WEBHOOKS] Dispatcher started.")
+        while not stopping.is_set():
+            capacity = settings.WEBHOOK_MAX_IN_FLIGHT - len(tasks)
+            batches = await asyncio.to_thread(claim_batches, dict(in_flight), capacity) if capacity > 0 else []
+            for batch in batches:
+                in_flight[batch["endpoint_id"]] += 1
+                task = asyncio.create_task(deliver(client, batch))
+                tasks.add(task)
+                task.add_done_callback(lambda t, endpoint_id=batch["endpoint_id"]: finished(t, endpoint_id))
+            if not batches:
+                try:
+                    await asyncio.wait_for(stopping.wait(), timeout=settings.WEBHOOK_POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+        if tasks:
+            print(f"[WEBHOOKS] Waiting for {len(tasks)} in-flight deliveries.")
+            await asyncio.wait(tasks, timeout=settings.WEBHOOK_TIMEOUT_SECONDS + 5)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
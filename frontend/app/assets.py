@@ -0,0 +1,164 @@
+"""
+Static assets and template compilation.
+
+Build step (`python -m app.assets`, run by the Dockerfile):
+- Copies every file under app/static to app/static/dist/ under a content-hashed name
+  (`icons/x.png` -> `dist/icons/x.3f9a0c1d2e4b.png`) and records the mapping in
+  dist/manifest.json.
+- Writes `.gz` (and `.br`, when the brotli package is installed) next to each text asset, so
+  nothing is compressed per request.
+- Compiles every template into the Jinja bytecode cache, so the first request after a deploy
+  skips parsing as well.
+
+Runtime: templates call `asset_url(path)`. `PrecompressedStaticFiles` serves fingerprinted
+files with immutable cache headers, picking the smallest encoding the browser accepts.
+Without a build (a plain dev checkout), `asset_url` falls back to the original files.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import stat
+from mimetypes import guess_type
+from typing import Dict, Optional
+
+import anyio
+from jinja2 import Environment, FileSystemBytecodeCache
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # .gz only
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+DIST = "dist"
+MANIFEST_PATH = os.path.join(STATIC_DIR, DIST, "manifest.json")
+JINJA_CACHE_DIR = os.getenv("JINJA_CACHE_DIR", "/tmp/jinja-cache")
+TEMPLATE_AUTO_RELOAD = os.getenv("TEMPLATE_AUTO_RELOAD", "true").lower() == "true"
+
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_manifest: Optional[Dict[str, str]] = None
+
+
+def _load_manifest() -> Dict[str, str]:
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH) as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def has_asset(path: str) -> bool:
+    return path in _load_manifest()
+
+
+def asset_url(path: str) -> str:
+    """
+    URL of a static file, fingerprinted when the asset build has run.
+    """
+    return f"/static/{_load_manifest().get(path, path)}"
+
+
+def configure_templates(env: Environment):
+    env.globals["asset_url"] = asset_url
+    env.globals["has_asset"] = has_asset
+    # Without auto-reload, a template is not re-checked on disk each time it is rendered
+    env.auto_reload = TEMPLATE_AUTO_RELOAD
+    try:
+        os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+        env.bytecode_cache = FileSystemBytecodeCache(JINJA_CACHE_DIR)
+    except OSError as exc:
+        print(f"[TEMPLATES] Bytecode cache disabled, {JINJA_CACHE_DIR} is not writable: {exc}")
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves the prebuilt `.br`/`.gz` of a fingerprinted file when the client
+    accepts it. Fingerprinted files never change, so they may be cached indefinitely.
+    Everything else is revalidated.
+    """
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if not path.startswith(f"{DIST}/"):
+            response = await super().get_response(path, scope)
+            response.headers.setdefault("Cache-Control", "no-cache")
+            return response
+
+        accepted = Headers(scope=scope).get("accept-encoding", "")
+        response = None
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                response = FileResponse(
+                    full_path,
+                    stat_result=stat_result,
+                    media_type=guess_type(path)[0] or "application/octet-stream",
+                    headers={"Content-Encoding": encoding},
+                )
+                break
+        if response is None:
+            response = await super().get_response(path, scope)
+        response.headers["Cache-Control"] = IMMUTABLE
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+def _write_compressed(target: str, data: bytes):
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli:
+        variants.append((".br", brotli.compress(data, quality=11)))
+    for suffix, compressed in variants:
+        # Not worth a second file (or the decoding) when it barely shrinks
+        if len(compressed) < len(data) * 0.9:
+            with open(target + suffix, "wb") as f:
+                f.write(compressed)
+
+
+def build_static(static_dir: str = STATIC_DIR) -> Dict[str, str]:
+    dist_dir = os.path.join(static_dir, DIST)
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist_dir]
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            logical = os.path.relpath(source, static_dir).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+            stem, ext = os.path.splitext(logical)
+            fingerprinted = f"{DIST}/{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+            target = os.path.join(static_dir, fingerprinted)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(data)
+            if ext.lower() in COMPRESSIBLE:
+                _write_compressed(target, data)
+            manifest[logical] = fingerprinted
+    with open(os.path.join(dist_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def compile_templates(env: Environment) -> int:
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+if __name__ == "__main__":
+    manifest = build_static()
+    print(f"[ASSETS] Fingerprinted {len(manifest)} static files into app/static/{DIST}/.")
+    from app.main import templates
+    print(f"[ASSETS] Compiled {compile_templates(templates.env)} templates into {JINJA_CACHE_DIR}.")
@@ -1,9 +1,9 @@
 from fastapi import FastAPI, Request, Depends, Form
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
 from datetime import datetime
 from typing import Optional, List
+from urllib.parse import quote, urlencode
 import os
 import secrets
 import hashlib  
@@ -11,11 +11,40 @@ import base64
 
 from .dependencies import get_current_user_from_cookie
 from .services import api_client
-from .models import User, Post
+from .models import User, Post, FeedItem
+from .assets import PrecompressedStaticFiles, configure_templates
 
 app = FastAPI(title="Social Media Aggregator - Frontend")
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates", context_processors=[lambda request: {"now": datetime.utcnow}])
+configure_templates(templates.env)
+
+CHANNELS = [
+    ('X (Twitter)', 'icons/x.png', 'twitter'),
+    ('LinkedIn', 'icons/linkedin.png', 'linkedin'),
+    ('Instagram', 'icons/instagram.png', 'instagram'),
+    ('Facebook', 'icons/facebook.png', 'facebook'),
+]
+
+def channel_cards(connected_accounts: List[dict]) -> List[dict]:
+    cards = []
+    for name, icon_path, provider in CHANNELS:
+        accounts = [account for account in connected_accounts if account['provider'] == provider]
+        cards.append({'name': name, 'icon_path': icon_path, 'provider': provider, 'connected': bool(accounts), 'accounts': accounts})
+    return cards
+
+def is_fragment_request(request: Request) -> bool:
+    # Set by the fragment script in base.html; plain form posts still get a full page
+    return request.headers.get("x-fragment") == "1"
+
+def fragment_response(request: Request, partials: List[str], context: dict, message: Optional[str] = None, status_code: int = 200) -> HTMLResponse:
+    """
+    Renders only the given partials. The page replaces each top-level element of the response
+    with the element of the same id, and shows `message` as a toast.
+    """
+    html = "".join(templates.get_template(name).render({"request": request, **context}) for name in partials)
+    headers = {"X-Toast": quote(message)} if message else None
+    return HTMLResponse(html, status_code=status_code, headers=headers)
 
 async def user_to_context(request: Request, current_user: Optional[User] = Depends(get_current_user_from_cookie)):
     return {"current_user": current_user}
@@ -31,9 +60,9 @@ async def login_page(request: Request, context: dict = Depends(user_to_context))
     return templates.TemplateResponse("login.html", {"request": request, "msg": request.query_params.get('msg'), "error": request.query_params.get('error'), **context})
 
 @app.post("/login")
-async def handle_login(username: str = Form(...), password: str = Form(...)):
-    token_data = await api_client.login_for_token(username, password)
-    if not token_data: return RedirectResponse(url="/login?error=Invalid credentials", status_code=303)
+async def handle_login(request: Request, username: str = Form(...), password: str = Form(...)):
+    token_data, error = await api_client.login_for_token(username, password, request.client.host if request.client else None)
+    if not token_data: return RedirectResponse(url=f"/login?error={error}", status_code=303)
     response = RedirectResponse(url="/dashboard", status_code=303)
     response.set_cookie(key="access_token", value=f"Bearer {token_data['access_token']}", httponly=True)
     return response
@@ -46,7 +75,7 @@ async def register_page(request: Request, context: dict = Depends(user_to_contex
 async def handle_registration(request: Request, username: str = Form(...), email: str = Form(...), password: str = Form(...), confirm_password: str = Form(...), context: dict = Depends(user_to_context)):
     if password != confirm_password:
         return templates.TemplateResponse("register.html", {"request": request, "error": "Passwords do not match", **context})
-    success, detail = await api_client.register_user(username, email, password)
+    success, detail = await api_client.register_user(username, email, password, request.client.host if request.client else None)
     if not success:
         return templates.TemplateResponse("register.html", {"request": request, "error": detail, **context})
     return RedirectResponse(url="/login?msg=Registration successful!", status_code=303)
@@ -89,11 +118,19 @@ async def handle_linkedin_callback(request: Request):
         return RedirectResponse(url=f"/dashboard?error={detail}", status_code=303)
 
 @app.post("/auth/disconnect")
-async def handle_disconnect(request: Request, provider: str = Form(...)):
+async def handle_disconnect(request: Request, provider: str = Form(...), account_id: Optional[int] = Form(None)):
     token = request.cookies.get("access_token")
     if not token:
         return RedirectResponse(url="/login?error=Authentication session has expired.", status_code=303)
-    success, detail = await api_client.disconnect_social_account(token, provider)
+    success, detail = await api_client.disconnect_social_account(token, provider, account_id)
+    if is_fragment_request(request):
+        if not success:
+            return fragment_response(request, [], {}, detail, status_code=400)
+        # The channel card and the composer's channel choices are all that changed
+        connected_accounts_data = await api_client.get_connected_accounts(token)
+        channels = channel_cards(connected_accounts_data)
+        channel = next((c for c in channels if c['provider'] == provider), None)
+        return fragment_response(request, ["partials/_social_channel.html", "partials/_composer_channels.html"], {"channel": channel, "channels": channels}, detail)
     if success:
         return RedirectResponse(url=f"/dashboard?msg={detail}", status_code=303)
     else:
@@ -107,43 +144,83 @@ async def dashboard(request: Request, context: dict = Depends(user_to_context)):
     
     token = request.cookies.get("access_token")
     connected_accounts_data = await api_client.get_connected_accounts(token)
-    connected_providers = [acc['provider'] for acc in connected_accounts_data]
-    channels = [
-        {'name': 'X (Twitter)', 'icon_path': 'icons/x.png', 'provider': 'twitter', 'connected': 'twitter' in connected_providers},
-        {'name': 'LinkedIn', 'icon_path': 'icons/linkedin.png', 'provider': 'linkedin', 'connected': 'linkedin' in connected_providers},
-        {'name': 'Instagram', 'icon_path': 'icons/instagram.png', 'provider': 'instagram', 'connected': 'instagram' in connected_providers},
-        {'name': 'Facebook', 'icon_path': 'icons/facebook.png', 'provider': 'facebook', 'connected': 'facebook' in connected_providers}
-    ]
-    
-    context["channels"] = channels
+    context["channels"] = channel_cards(connected_accounts_data)
+    # One key per rendered composer: submitting the same form twice creates one post
+    context["idempotency_key"] = secrets.token_urlsafe(16)
     context["msg"] = request.query_params.get("msg")
     context["error"] = request.query_params.get("error")
+    post_id = request.query_params.get("post_id")
+    if post_id and post_id.isdigit():
+        context["post_id"] = post_id
+        context["deliveries"] = await api_client.get_post_deliveries(token, int(post_id))
     return templates.TemplateResponse("dashboard.html", {"request": request, **context})
 
 @app.post("/dashboard/posts/create")
-async def handle_post_creation(request: Request, content: str = Form(...), channels: Optional[List[str]] = Form(None), action: str = Form(...)):
+async def handle_post_creation(request: Request, content: str = Form(...), account_ids: Optional[List[int]] = Form(None), action: str = Form(...), idempotency_key: Optional[str] = Form(None)):
     token = request.cookies.get("access_token")
     if not token:
         return RedirectResponse(url="/login?error=Authentication session has expired.", status_code=303)
-    if action == 'post_now' and not channels:
-        return RedirectResponse(url=f"/dashboard?error=Please select at least one channel to post to.", status_code=303)
-    success, detail = await api_client.create_post(token, content, channels or [], action)
+    if action == 'post_now' and not account_ids:
+        if is_fragment_request(request):
+            return fragment_response(request, [], {}, "Please select at least one account to post to.", status_code=422)
+        return RedirectResponse(url=f"/dashboard?error=Please select at least one account to post to.", status_code=303)
+    success, detail, post = await api_client.create_post(token, content, account_ids or [], action, idempotency_key)
+    if is_fragment_request(request):
+        if not success:
+            return fragment_response(request, [], {}, detail, status_code=422)
+        return fragment_response(request, ["partials/_composer_result.html"], {
+            "post_id": post["id"] if action == 'post_now' else None,
+            "deliveries": post.get("deliveries", []) if action == 'post_now' else [],
+            "idempotency_key": secrets.token_urlsafe(16),
+        }, detail)
     if success:
+        if action == 'post_now' and post:
+            # The dashboard follows this post's accounts live (see /events/posts)
+            query = urlencode([("msg", detail), ("post_id", post["id"])])
+            return RedirectResponse(url=f"/dashboard?{query}", status_code=303)
         return RedirectResponse(url=f"/dashboard?msg={detail}", status_code=303)
     else:
         return RedirectResponse(url=f"/dashboard?error={detail}", status_code=303)
 
+@app.post("/dashboard/posts/preflight")
+async def handle_post_preflight(request: Request, content: str = Form(""), account_ids: Optional[List[int]] = Form(None)):
+    token = request.cookies.get("access_token")
+    if not token or not account_ids:
+        return fragment_response(request, ["partials/_preflight.html"], {"channel_results": []})
+    results = await api_client.preflight_posts(token, [{"content": content, "account_ids": account_ids}])
+    return fragment_response(request, ["partials/_preflight.html"], {"channel_results": results[0]["channels"] if results else []})
+
+@app.get("/events/posts")
+async def post_status_events(request: Request):
+    """
+    Relays the backend's server-sent events to the browser's EventSource, which can only send
+    cookies. Last-Event-ID is passed on, so a reconnecting page receives what it missed.
+    """
+    token = request.cookies.get("access_token")
+    if not token:
+        return Response(status_code=401)
+    chunks, status_code = await api_client.open_post_events(token, request.headers.get("last-event-id"))
+    if chunks is None:
+        return Response(status_code=status_code)
+    return StreamingResponse(chunks, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.get("/drafts", response_class=HTMLResponse)
-async def drafts_page(request: Request, context: dict = Depends(user_to_context)):
+async def drafts_page(request: Request, q: Optional[str] = None, before: Optional[str] = None, context: dict = Depends(user_to_context)):
     current_user = context.get("current_user")
     if not current_user:
         return RedirectResponse(url="/login?error=Please log in", status_code=307)
     
     token = request.cookies.get("access_token")
-    drafts_data = await api_client.get_drafts(token)
+    if q or before:
+        page = await api_client.search_posts(token, q=q, status="draft", before=before)
+        drafts_data = page["items"]
+        context["next_cursor"] = page.get("next_cursor")
+    else:
+        drafts_data = await api_client.get_drafts(token)
     drafts = [Post(**draft) for draft in drafts_data]
     
     context["drafts"] = drafts
+    context["q"] = q
     context["msg"] = request.query_params.get("msg")
     context["error"] = request.query_params.get("error")
     return templates.TemplateResponse("drafts.html", {"request": request, **context})
@@ -155,15 +232,59 @@ async def handle_delete_draft(request: Request, post_id: int):
         return RedirectResponse(url="/login?error=Authentication session has expired.", status_code=303)
     
     success, detail = await api_client.delete_post(token, post_id)
-    
+    if is_fragment_request(request):
+        # An empty body tells the page to remove the draft's row
+        return fragment_response(request, [], {}, detail, status_code=200 if success else 400)
+
     if success:
         return RedirectResponse(url=f"/drafts?msg={detail}", status_code=303)
     else:
         return RedirectResponse(url=f"/drafts?error={detail}", status_code=303)
 
+@app.get("/media/{media_id}/thumbnail")
+async def media_thumbnail(request: Request, media_id: int):
+    token = request.cookies.get("access_token")
+    if not token:
+        return Response(status_code=401)
+    thumbnail = await api_client.get_media_thumbnail(token, media_id)
+    if not thumbnail:
+        return Response(status_code=404)
+    content, media_type = thumbnail
+    # Thumbnails are derived from immutable, content-addressed media, so browsers can keep them
+    return Response(content=content, media_type=media_type, headers={"Cache-Control": "private, max-age=31536000, immutable"})
+
+@app.get("/feed", response_class=HTMLResponse)
+async def feed_page(request: Request, before: Optional[str] = None, provider: Optional[str] = None, q: Optional[str] = None, context: dict = Depends(user_to_context)):
+    if not context.get("current_user"): return RedirectResponse(url="/login?error=Please log in", status_code=307)
+    token = request.cookies.get("access_token")
+    page = await api_client.get_feed(token, before, provider, q)
+    context["items"] = [FeedItem(**item) for item in page["items"]]
+    context["next_cursor"] = page.get("next_cursor")
+    context["provider"] = provider
+    context["q"] = q
+    context["msg"] = request.query_params.get("msg")
+    context["error"] = request.query_params.get("error")
+    return templates.TemplateResponse("feed.html", {"request": request, **context})
+
+@app.post("/feed/refresh")
+async def handle_feed_refresh(request: Request):
+    token = request.cookies.get("access_token")
+    if not token:
+        return RedirectResponse(url="/login?error=Authentication session has expired.", status_code=303)
+    success, detail = await api_client.refresh_feed(token)
+    if success:
+        return RedirectResponse(url=f"/feed?msg={detail}", status_code=303)
+    else:
+        return RedirectResponse(url=f"/feed?error={detail}", status_code=303)
+
 @app.get("/history", response_class=HTMLResponse)
-async def history_page(request: Request, context: dict = Depends(user_to_context)):
+async def history_page(request: Request, q: Optional[str] = None, before: Optional[str] = None, context: dict = Depends(user_to_context)):
     if not context.get("current_user"): return RedirectResponse(url="/login?error=Please log in", status_code=307)
+    token = request.cookies.get("access_token")
+    page = await api_client.search_posts(token, q=q, status="published", before=before)
+    context["posts"] = [Post(**post) for post in page["items"]]
+    context["next_cursor"] = page.get("next_cursor")
+    context["q"] = q
     return templates.TemplateResponse("history.html", {"request": request, **context})
 
 @app.get("/auth/twitter/start")
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
+from typing import List, Optional
 
 # The User model is already correct
 class User(BaseModel):
@@ -8,6 +9,14 @@ class User(BaseModel):
     email: EmailStr
     is_active: bool
 
+class Media(BaseModel):
+    id: int
+    content_type: str
+
+    @property
+    def has_thumbnail(self) -> bool:
+        return self.content_type in ("image/jpeg", "image/png", "image/webp")
+
 # New Post model for the frontend
 class Post(BaseModel):
     id: int
@@ -15,6 +24,18 @@ class Post(BaseModel):
     status: str
     created_at: datetime
     user_id: int
+    media: List[Media] = []
+    published_at: Optional[datetime] = None
+    channels: List[str] = []
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class FeedItem(BaseModel):
+    id: int
+    provider: str
+    kind: str
+    author_name: Optional[str] = None
+    content: Optional[str] = None
+    url: Optional[str] = None
+    posted_at: datetime
\ No newline at end of file
@@ -1,17 +1,27 @@
 import httpx
 import os
-from typing import Dict, Any, Tuple, Optional, List
+from typing import Dict, Any, Tuple, Optional, List, AsyncIterator
 
 API_BASE_URL = os.getenv("API_BASE_URL", "http://backend:8000/api")
 
-async def login_for_token(username: str, password: str) -> Optional[Dict[str, Any]]:
+def _forwarded_for(client_ip: Optional[str]) -> Dict[str, str]:
+    # The backend rate-limits auth per client IP; without this every request would come from us
+    return {"X-Forwarded-For": client_ip} if client_ip else {}
+
+def _throttled_detail(response: httpx.Response) -> str:
+    retry_after = response.headers.get("retry-after")
+    if response.status_code == 503:
+        return "Sign-in is busy right now. Please try again in a moment."
+    return f"Too many attempts. Please try again in {retry_after} seconds." if retry_after else "Too many attempts. Please try again later."
+
+async def login_for_token(username: str, password: str, client_ip: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
     async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(f"{API_BASE_URL}/auth/token", data={"username": username, "password": password})
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError:
-            return None
+        response = await client.post(f"{API_BASE_URL}/auth/token", data={"username": username, "password": password}, headers=_forwarded_for(client_ip))
+        if response.status_code == 200:
+            return response.json(), None
+        if response.status_code in (429, 503):
+            return None, _throttled_detail(response)
+        return None, "Invalid credentials"
 
 async def get_current_user(token: str) -> Optional[Dict[str, Any]]:
     headers = {"Authorization": token}
@@ -23,11 +33,13 @@ async def get_current_user(token: str) -> Optional[Dict[str, Any]]:
         except httpx.HTTPStatusError:
             return None
 
-async def register_user(username: str, email: str, password: str) -> Tuple[bool, str]:
+async def register_user(username: str, email: str, password: str, client_ip: Optional[str] = None) -> Tuple[bool, str]:
     async with httpx.AsyncClient() as client:
-        response = await client.post(f"{API_BASE_URL}/auth/register", json={"username": username, "email": email, "password": password})
+        response = await client.post(f"{API_BASE_URL}/auth/register", json={"username": username, "email": email, "password": password}, headers=_forwarded_for(client_ip))
         if response.status_code == 200:
             return True, "Success"
+        elif response.status_code in (429, 503):
+            return False, _throttled_detail(response)
         else:
             return False, response.json().get("detail", "Registration failed")
 
@@ -64,26 +76,51 @@ async def connect_twitter_account(token: str, code: str, code_verifier: str) ->
             detail = response.json().get("detail", "Failed to connect X account.")
             return False, detail
 
-async def disconnect_social_account(token: str, provider: str) -> Tuple[bool, str]:
+async def disconnect_social_account(token: str, provider: str, account_id: Optional[int] = None) -> Tuple[bool, str]:
     headers = {"Authorization": token}
     async with httpx.AsyncClient() as client:
-        response = await client.post(f"{API_BASE_URL}/linkedin/disconnect", json={"provider": provider}, headers=headers)
+        response = await client.post(f"{API_BASE_URL}/linkedin/disconnect", json={"provider": provider, "account_id": account_id}, headers=headers)
         if response.status_code == 200:
             return True, response.json().get("detail", f"Successfully disconnected {provider}.")
         else:
             return False, response.json().get("detail", "Failed to disconnect account.")
 
-async def create_post(token: str, content: str, channels: list[str], action: str) -> Tuple[bool, str]:
+async def create_post(token: str, content: str, account_ids: list[int], action: str, idempotency_key: Optional[str] = None) -> Tuple[bool, str, Optional[dict]]:
+    """
+    Returns (success, message, created post); the post includes its per-account deliveries.
+    """
     headers = {"Authorization": token}
-    json_payload = {"content": content, "channels": channels}
+    if idempotency_key:
+        headers["Idempotency-Key"] = idempotency_key
+    json_payload = {"content": content, "account_ids": account_ids}
     params = {"action": action}
     async with httpx.AsyncClient() as client:
         response = await client.post(f"{API_BASE_URL}/posts/", json=json_payload, headers=headers, params=params)
         if response.status_code == 201:
             msg = "Post submitted for publishing!" if action == "post_now" else "Draft saved successfully."
-            return True, msg
+            return True, msg, response.json()
         else:
-            return False, response.json().get("detail", "Failed to create post.")
+            return False, response.json().get("detail", "Failed to create post."), None
+
+async def preflight_posts(token: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    headers = {"Authorization": token}
+    async with httpx.AsyncClient() as client:
+        try:
+            response = await client.post(f"{API_BASE_URL}/posts/preflight", json={"items": items}, headers=headers)
+            response.raise_for_status()
+            return response.json()["results"]
+        except httpx.HTTPStatusError:
+            return []
+
+async def get_post_deliveries(token: str, post_id: int) -> List[Dict[str, Any]]:
+    headers = {"Authorization": token}
+    async with httpx.AsyncClient() as client:
+        try:
+            response = await client.get(f"{API_BASE_URL}/posts/{post_id}/deliveries", headers=headers)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError:
+            return []
 
 async def get_drafts(token: str) -> List[Dict[str, Any]]:
     headers = {"Authorization": token}
@@ -104,4 +141,74 @@ async def delete_post(token: str, post_id: int) -> Tuple[bool, str]:
         elif response.status_code == 404:
             return False, "Draft not found."
         else:
-            return False, response.json().get("detail", "Failed to delete draft.")
\ No newline at end of file
+            return False, response.json().get("detail", "Failed to delete draft.")
+
+async def get_media_thumbnail(token: str, media_id: int) -> Optional[Tuple[bytes, str]]:
+    headers = {"Authorization": token}
+    async with httpx.AsyncClient() as client:
+        response = await client.get(f"{API_BASE_URL}/media/{media_id}/thumbnail", headers=headers)
+        if response.status_code == 200:
+            return response.content, response.headers.get("content-type", "image/webp")
+        return None
+
+async def search_posts(token: str, q: Optional[str] = None, status: Optional[str] = None, before: Optional[str] = None) -> Dict[str, Any]:
+    headers = {"Authorization": token}
+    params = {k: v for k, v in {"q": q, "status": status, "before": before}.items() if v}
+    async with httpx.AsyncClient() as client:
+        try:
+            response = await client.get(f"{API_BASE_URL}/posts/search", headers=headers, params=params)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError:
+            return {"items": [], "next_cursor": None}
+
+async def get_feed(token: str, before: Optional[str] = None, provider: Optional[str] = None, q: Optional[str] = None) -> Dict[str, Any]:
+    headers = {"Authorization": token}
+    params = {k: v for k, v in {"before": before, "provider": provider, "q": q}.items() if v}
+    async with httpx.AsyncClient() as client:
+        try:
+            response = await client.get(f"{API_BASE_URL}/feed/", headers=headers, params=params)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError:
+            return {"items": [], "next_cursor": None}
+
+async def refresh_feed(token: str) -> Tuple[bool, str]:
+    headers = {"Authorization": token}
+    async with httpx.AsyncClient() as client:
+        response = await client.post(f"{API_BASE_URL}/feed/refresh", headers=headers)
+        if response.status_code == 202:
+            return True, response.json().get("detail", "Feed refresh requested.")
+        else:
+            return False, response.json().get("detail", "Failed to refresh feed.")
+
+async def open_post_events(token: str, last_event_id: Optional[str] = None) -> Tuple[Optional[AsyncIterator[bytes]], int]:
+    """
+    Opens the backend's live post status stream. Returns (chunks, 200), or (None, status) when
+    the backend refused or could not be reached. The connection closes when iteration stops.
+    """
+    headers = {"Authorization": token, "Accept": "text/event-stream"}
+    if last_event_id:
+        headers["Last-Event-ID"] = last_event_id
+    # The backend sends a heartbeat every few seconds, so a long silence means it is gone
+    client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=60.0))
+    try:
+        response = await client.send(client.build_request("GET", f"{API_BASE_URL}/events/posts", headers=headers), stream=True)
+    except httpx.HTTPError:
+        await client.aclose()
+        return None, 502
+    if response.status_code != 200:
+        await response.aclose()
+        await client.aclose()
+        return None, response.status_code
+
+    async def relay() -> AsyncIterator[bytes]:
+        try:
+            async for chunk in response.aiter_raw():
+                yield chunk
+        except httpx.HTTPError:
+            pass
+        finally:
+            await response.aclose()
+            await client.aclose()
+    return relay(), 200
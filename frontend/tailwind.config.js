@@ -0,0 +1,9 @@
+// Builds app/static/css/app.css (see Dockerfile). Only classes found in the templates,
+// including those set from their inline scripts, end up in the bundle.
+module.exports = {
+  content: ["./app/templates/**/*.html"],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};